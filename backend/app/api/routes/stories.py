@@ -1,11 +1,14 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import uuid
 import logging
 
 from app.models.story_request import StoryRequest
 from app.services.story_service import StoryGenerationService
 from app.services.session_manager import SessionManager
+from app.services.job_queue import job_queue
+from app.services.tracing import get_session_waterfall, inject_context, session_span
+from app.config import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -23,7 +26,8 @@ async def generate_story(
     """
     Generate a literary story using multi-agent system.
 
-    The generation happens asynchronously. Use the session_id to track progress
+    The generation happens asynchronously, in a worker process when the job
+    queue is enabled. Use the session_id to track progress
     via WebSocket connection or polling the /stories/{session_id} endpoint.
 
     Args:
@@ -36,15 +40,27 @@ async def generate_story(
         # Create unique session ID
         session_id = str(uuid.uuid4())
 
-        # Initialize session in Redis
-        await session_manager.create_session(session_id, request.dict())
-
-        # Start story generation in background
-        background_tasks.add_task(
-            story_service.generate_story,
-            request=request,
-            session_id=session_id
-        )
+        with session_span("POST /stories/generate", session_id):
+            # Initialize session in Redis
+            request_data = request.dict()
+            await session_manager.create_session(session_id, request_data)
+
+            # The generation continues this trace, in this process or a worker
+            trace_context = inject_context()
+
+            if settings.job_queue_enabled:
+                # Hand the generation to a worker process (python -m app.worker)
+                await job_queue.enqueue(
+                    session_id, {"request": request_data, "trace_context": trace_context}
+                )
+            else:
+                # Start story generation in background
+                background_tasks.add_task(
+                    story_service.generate_story,
+                    request=request,
+                    session_id=session_id,
+                    trace_context=trace_context
+                )
 
         logger.info(f"Started story generation for session {session_id}")
 
@@ -127,11 +143,127 @@ async def get_current_draft(session_id: str) -> Dict[str, Any]:
         )
 
 
+@router.get("/stories/{session_id}/trace")
+async def get_story_trace(session_id: str) -> Dict[str, Any]:
+    """
+    Get the trace waterfall of a story generation.
+
+    Spans cover the request, each phase, each validation iteration and
+    each agent and LLM call, whichever process ran them.
+
+    Args:
+        session_id: Unique session identifier
+
+    Returns:
+        Spans with their offset, duration and nesting depth, and the
+        total time per span name
+    """
+    try:
+        waterfall = await get_session_waterfall(session_id)
+
+        if not waterfall:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No trace found for session {session_id}"
+            )
+
+        return waterfall
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving trace for {session_id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve trace: {str(e)}"
+        )
+
+
+@router.post("/stories/{session_id}/resume")
+async def resume_generation(
+    session_id: str,
+    background_tasks: BackgroundTasks
+) -> Dict[str, Any]:
+    """
+    Resume an interrupted or failed story generation from its last checkpoint.
+
+    Sessions with a generation job still queued or running cannot be
+    resumed; interrupted jobs are redelivered to another worker anyway.
+
+    Agent outputs already produced (planning, drafts, validation reports)
+    are reused; only the remaining steps are run.
+
+    Args:
+        session_id: Unique session identifier
+
+    Returns:
+        Session information with session_id for tracking
+    """
+    try:
+        session = await session_manager.get_session_fields(session_id, "status", "request")
+
+        if not session or not session["request"]:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Session {session_id} not found"
+            )
+
+        if session["status"] in ("completed", "cancelled"):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Session {session_id} is {session['status']} and cannot be resumed"
+            )
+
+        # A second run would race the live one on the same checkpoints and
+        # drafts: only a session without a job left (or, in-process, without
+        # a run) is resumed. Jobs of crashed workers are redelivered anyway.
+        with session_span("POST /stories/resume", session_id):
+            trace_context = inject_context()
+
+            if settings.job_queue_enabled:
+                started = await job_queue.enqueue(
+                    session_id, {"request": session["request"], "trace_context": trace_context}
+                )
+            else:
+                started = story_service.reserve_run(session_id)
+                if started:
+                    background_tasks.add_task(
+                        story_service.resume_story, session_id=session_id, trace_context=trace_context
+                    )
+
+        if not started:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Session {session_id} is still being generated"
+            )
+
+        logger.info(f"Resumed story generation for session {session_id}")
+
+        return {
+            "session_id": session_id,
+            "status": session["status"],
+            "message": "Story generation resumed. Connect to WebSocket for real-time updates.",
+            "websocket_url": f"/ws/{session_id}"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error resuming session {session_id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to resume session: {str(e)}"
+        )
+
+
 @router.delete("/stories/{session_id}")
 async def cancel_generation(session_id: str) -> Dict[str, str]:
     """
     Cancel an ongoing story generation.
 
+    The process running the generation is notified through the event bus
+    and stops immediately, aborting the agent calls in flight.
+
     Args:
         session_id: Unique session identifier
 
@@ -158,25 +290,35 @@ async def cancel_generation(session_id: str) -> Dict[str, str]:
 
 
 @router.get("/stories")
-async def list_sessions(limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+async def list_sessions(
+    limit: int = 10,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None
+) -> Dict[str, Any]:
     """
     List recent story generation sessions.
 
     Args:
         limit: Maximum number of sessions to return
         offset: Number of sessions to skip
+        cursor: Cursor from a previous page's next_cursor (preferred over offset)
+        status: Only return sessions with this status
 
     Returns:
         List of sessions with metadata
     """
     try:
-        sessions = await session_manager.list_sessions(limit=limit, offset=offset)
+        page = await session_manager.list_sessions(
+            limit=limit, offset=offset, cursor=cursor, status=status
+        )
 
         return {
-            "sessions": sessions,
-            "count": len(sessions),
+            "sessions": page["sessions"],
+            "count": len(page["sessions"]),
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": page["next_cursor"]
         }
 
     except Exception as e:
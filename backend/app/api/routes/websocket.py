@@ -1,21 +1,30 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict
+from typing import Dict, Optional, Tuple
 import logging
 import json
 import asyncio
 
-from app.services.session_manager import SessionManager
+from app.services.session_manager import SessionManager, TERMINAL_STATUSES
+from app.services.event_bus import event_bus
+from app.services.metrics import observe_websocket_send
+from app.services.draft_patch import text_delta
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Store active WebSocket connections
-active_connections: Dict[str, WebSocket] = {}
 session_manager = SessionManager()
 
+# Version of the message protocol: sequenced, replayable events (v2)
+PROTOCOL_VERSION = 2
+
+# Last text sent per session and base (draft, each agent's prompt) with the
+# seq of its update, for deltas
+_text_bases: Dict[str, Dict[str, Tuple[str, int]]] = {}
+_text_locks: Dict[str, asyncio.Lock] = {}
+
 
 @router.websocket("/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str):
+async def websocket_endpoint(websocket: WebSocket, session_id: str, last_seq: int = 0):
     """
     WebSocket endpoint for real-time story generation updates.
 
@@ -26,51 +35,108 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     - Draft versions
     - Completion notification
 
+    Updates are received from the session's event bus channel, so the
+    generation may run in any process or host.
+
+    Protocol (version 2): every update is sent as a "broadcast" message
+    with the event's sequence number (`seq`). On connect, the events after
+    `last_seq` still in the session's replay log are sent first, so a
+    client that connects late or reconnects with the last `seq` it
+    received misses nothing. If older events were trimmed from the log, a
+    "snapshot" message with the session state, latest draft and current
+    texts comes first. Drafts and repeated prompts may arrive as line
+    deltas (`partial_content_delta`, `prompt_delta`) or appends against the
+    previous text, identified by the `seq` that produced it (`base_seq`);
+    a client whose text does not match sends {"type": "resync"} and gets
+    a new snapshot.
+
     Args:
         websocket: WebSocket connection
         session_id: Unique session identifier
+        last_seq: Sequence number of the last event the client received
     """
     await websocket.accept()
-    active_connections[session_id] = websocket
 
-    logger.info(f"WebSocket connected for session {session_id}")
+    logger.info(f"WebSocket connected for session {session_id} (last_seq={last_seq})")
 
     try:
-        # Send initial connection confirmation
-        await websocket.send_json({
-            "type": "connection",
-            "status": "connected",
-            "session_id": session_id,
-            "message": "WebSocket connection established"
-        })
-
-        # Keep connection alive and wait for completion
-        # The actual updates are sent via broadcast_update function
-        # which is called by story_service
-        while True:
-            # Get latest session state from Redis to check completion
-            session = await session_manager.get_session(session_id)
-
-            if session:
-                # Check if story generation is complete
-                if session.get("status") in ["completed", "failed", "cancelled"]:
-                    await websocket.send_json({
-                        "type": "final",
-                        "status": session["status"],
-                        "message": f"Story generation {session['status']}",
-                        "data": session
-                    })
-                    break
-
-            # Wait before checking status again
-            await asyncio.sleep(2)
+        async with event_bus.subscribe(session_id) as events:
+            # Send initial connection confirmation
+            current_seq = await event_bus.last_seq(session_id)
+            await send_json(websocket, {
+                "type": "connection",
+                "status": "connected",
+                "protocol": PROTOCOL_VERSION,
+                "session_id": session_id,
+                "seq": current_seq,
+                "message": "WebSocket connection established"
+            })
+
+            # Read the session once, after subscribing, in case it already
+            # finished; from here on we only wake up on pushed events
+            state = await session_manager.get_session_fields(session_id, "status")
+            if state and state["status"] in TERMINAL_STATUSES:
+                await send_final(websocket, await session_manager.get_session(session_id), seq=current_seq)
+                return
+
+            # Catch up from the replay log; events published meanwhile are
+            # also queued live and skipped by sequence number
+            sent_seq = await send_replay(websocket, session_id, last_seq)
+
+            # Watch for the client going away while we wait for events
+            receive_task = asyncio.create_task(websocket.receive())
+            event_task = asyncio.create_task(events.get())
+            try:
+                while True:
+                    done, _ = await asyncio.wait(
+                        {event_task, receive_task},
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+
+                    if receive_task in done:
+                        message = receive_task.result()
+                        if message["type"] == "websocket.disconnect":
+                            raise WebSocketDisconnect()
+                        if client_message_type(message) == "resync":
+                            # The client lost track of a text: start it over
+                            sent_seq = max(sent_seq, await send_snapshot(websocket, session_id))
+                        receive_task = asyncio.create_task(websocket.receive())
+
+                    if event_task not in done:
+                        continue
+
+                    update = event_task.result()
+                    event_task = asyncio.create_task(events.get())
+
+                    seq = update.get("seq", 0)
+                    if seq > sent_seq + 1:
+                        # Dropped from a full queue: fetch the missing events
+                        sent_seq = await send_replay(websocket, session_id, sent_seq, until_seq=seq - 1)
+                    if seq <= sent_seq:
+                        continue
+
+                    # Terminal status pushed by the SessionManager
+                    if update.get("type") == "session_status":
+                        if update.get("status") in TERMINAL_STATUSES:
+                            session = await session_manager.get_session(session_id)
+                            if session:
+                                await send_final(websocket, session, seq=seq)
+                            break
+                        sent_seq = seq
+                        continue
+
+                    await send_event(websocket, update)
+                    sent_seq = seq
+            finally:
+                receive_task.cancel()
+                event_task.cancel()
 
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for session {session_id}")
     except Exception as e:
         logger.error(f"WebSocket error for session {session_id}: {e}", exc_info=True)
         try:
-            await websocket.send_json({
+            await send_json(websocket, {
                 "type": "error",
                 "error": str(e),
                 "message": "An error occurred in WebSocket connection"
@@ -78,44 +144,232 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         except:
             pass
     finally:
-        # Clean up connection
-        if session_id in active_connections:
-            del active_connections[session_id]
         try:
             await websocket.close()
         except:
             pass
 
 
-async def broadcast_update(session_id: str, update: Dict):
+async def send_replay(
+    websocket: WebSocket,
+    session_id: str,
+    after_seq: int,
+    until_seq: int = None
+) -> int:
+    """
+    Send a session's logged events after a sequence number.
+
+    If the log no longer holds every event after `after_seq`, a snapshot
+    is sent instead of the missing events, followed by the events after it.
+
+    Args:
+        websocket: WebSocket connection
+        session_id: Session identifier
+        after_seq: Last sequence number the client has
+        until_seq: Last sequence number to send (default: the latest)
+
+    Returns:
+        Sequence number of the last event sent or covered by the snapshot
+        (after_seq if none)
+    """
+    replay, oldest_seq = await event_bus.replay(session_id, after_seq, until_seq)
+
+    if oldest_seq > after_seq + 1:
+        after_seq = await send_snapshot(websocket, session_id)
+        replay = [update for update in replay if update["seq"] > after_seq]
+
+    for update in replay:
+        if update.get("type") == "session_status":
+            if update.get("status") in TERMINAL_STATUSES:
+                # Left for the caller, which ends the connection on it
+                break
+        else:
+            await send_event(websocket, update)
+        after_seq = update["seq"]
+
+    return after_seq
+
+
+async def send_snapshot(websocket: WebSocket, session_id: str) -> int:
+    """
+    Send the current state of a session for the client to start over from.
+
+    Besides the session and its latest stored draft, the snapshot has the
+    texts later deltas apply to (`texts`: the in-flight draft and each
+    agent's last prompt, with the `seq` that produced them).
+
+    Args:
+        websocket: WebSocket connection
+        session_id: Session identifier
+
+    Returns:
+        Sequence number the snapshot is current at
+    """
+    seq, texts = await event_bus.texts(session_id)
+    session = await session_manager.get_session(session_id, include_drafts=False)
+
+    await send_json(websocket, {
+        "type": "snapshot",
+        "seq": seq,
+        "data": session,
+        "draft": await session_manager.get_draft(session_id),
+        "texts": texts
+    })
+    return seq
+
+
+def client_message_type(message: Dict) -> str:
+    """Type of a JSON message received from a client (None if not JSON)"""
+    try:
+        return json.loads(message.get("text") or "").get("type")
+    except (ValueError, AttributeError):
+        return None
+
+
+async def send_json(websocket: WebSocket, message: Dict):
+    """
+    Send a JSON message to a WebSocket connection, timing the send.
+
+    Args:
+        websocket: WebSocket connection
+        message: Message to send
+    """
+    message_type = message.get("type")
+    if message_type == "broadcast":
+        message_type = message["data"].get("type")
+
+    with observe_websocket_send(message_type):
+        await websocket.send_json(message)
+
+
+async def send_event(websocket: WebSocket, update: Dict):
+    """
+    Send a session event to a WebSocket connection.
+
+    Args:
+        websocket: WebSocket connection
+        update: Event from the event bus (with its `seq`)
+    """
+    await send_json(websocket, {
+        "type": "broadcast",
+        "v": PROTOCOL_VERSION,
+        "seq": update.get("seq"),
+        "data": update
+    })
+
+
+async def send_final(websocket: WebSocket, session: Dict, seq: int = None):
+    """
+    Send the final session state to a WebSocket connection.
+
+    Args:
+        websocket: WebSocket connection
+        session: Session data in a terminal status
+        seq: Sequence number of the terminal status event, if known
+    """
+    await send_json(websocket, {
+        "type": "final",
+        "seq": seq,
+        "status": session["status"],
+        "message": f"Story generation {session['status']}",
+        "data": session
+    })
+
+
+async def broadcast_update(
+    session_id: str,
+    update: Dict,
+    text_base: str = None,
+    text: str = "",
+    append: bool = False
+) -> Optional[int]:
     """
-    Broadcast an update to the WebSocket connection for a session.
+    Broadcast an update to every WebSocket connection for a session.
+
+    The update is published on the session's event bus channel and
+    delivered by whichever process holds the connections.
 
     Args:
         session_id: Session to send update to
         update: Update data to send
+        text_base: Name of the text the update changes, recorded for
+            snapshots along with `text` and `append` (see EventBus.publish)
+
+    Returns:
+        Sequence number of the update, or None if it was not published
+        (and logged for replay)
     """
-    if session_id in active_connections:
-        try:
-            websocket = active_connections[session_id]
-            # Check if websocket is still open before sending
-            if websocket.client_state.name == "CONNECTED":
-                await websocket.send_json({
-                    "type": "broadcast",
-                    "data": update
-                })
-                logger.debug(f"Broadcast sent to {session_id}: {update.get('type', 'unknown')}")
+    try:
+        seq, receivers = await event_bus.publish(session_id, update, text_base, text, append)
+        logger.debug(f"Broadcast sent to {session_id} ({receivers} receivers): {update.get('type', 'unknown')}")
+        return seq
+    except Exception as e:
+        logger.warning(f"Error broadcasting to session {session_id}: {e}")
+        return None
+
+
+async def broadcast_text(
+    session_id: str,
+    base: str,
+    update: Dict,
+    field: str,
+    text: str,
+    append: bool = False
+):
+    """
+    Broadcast an update carrying a large text, as a delta when smaller.
+
+    The text of the previous update with the same base (e.g. the draft, or
+    an agent's prompt) and its `seq` are remembered by this process.
+    Appended text is sent as is; other text is sent as `<field>_delta`, a
+    line delta against the previous text (see draft_patch.text_delta),
+    unless the full text is shorter. Appends and deltas carry the `seq` of
+    the text they apply to in `base_seq`, so clients holding another text
+    (e.g. from a snapshot taken mid-stream) notice and resync.
+
+    Args:
+        session_id: Session to send update to
+        base: Name of the sequence of texts the update belongs to
+        update: Update data to send
+        field: Field of the update holding the text
+        text: Full text, or the text to append to the previous one
+        append: Whether `text` extends the previous text
+    """
+    # Updates of a session are serialized so clients see deltas in the
+    # order their bases were recorded
+    async with _text_locks.setdefault(session_id, asyncio.Lock()):
+        bases = _text_bases.setdefault(session_id, {})
+        previous, base_seq = bases.get(base, (None, None))
+
+        if append and previous is not None:
+            update[field] = text
+            update["base_seq"] = base_seq
+            current = previous + text
+        else:
+            current = text
+            delta = text_delta(previous, text) if previous is not None else None
+            if delta is not None and len(json.dumps(delta)) < len(text):
+                update[f"{field}_delta"] = delta
+                update["base_seq"] = base_seq
             else:
-                logger.warning(f"WebSocket for session {session_id} is not connected (state: {websocket.client_state.name})")
-                # Remove disconnected websocket
-                del active_connections[session_id]
-        except Exception as e:
-            logger.warning(f"Error broadcasting to session {session_id}: {e}")
-            # Remove failed connection
-            if session_id in active_connections:
-                del active_connections[session_id]
-    else:
-        logger.debug(f"No active WebSocket connection for session {session_id}")
+                update[field] = text
+                if append:
+                    # Nothing to append to: the text starts a new base
+                    update["append"] = False
+                    append = False
+
+        seq = await broadcast_update(session_id, update, text_base=base, text=text, append=append)
+        if seq is not None:
+            bases[base] = (current, seq)
+        else:
+            # Clients never saw this text: the next one is sent in full
+            bases.pop(base, None)
+
+
+def forget_session(session_id: str):
+    """Drop the texts remembered for a session's deltas (once its run ends)"""
+    _text_bases.pop(session_id, None)
+    _text_locks.pop(session_id, None)
 
 
 async def send_agent_update(
@@ -220,12 +474,12 @@ async def send_agent_prompt(
     update = {
         "type": "agent_prompt",
         "agent": agent_name,
-        "prompt": prompt,
         "reasoning": reasoning,
         "timestamp": asyncio.get_event_loop().time()
     }
 
-    await broadcast_update(session_id, update)
+    # Prompts of later iterations embed the revised draft: send the change
+    await broadcast_text(session_id, f"prompt:{agent_name}", update, "prompt", prompt)
 
 
 async def send_agent_response(
@@ -258,7 +512,8 @@ async def send_partial_draft(
     session_id: str,
     partial_content: str,
     word_count: int,
-    progress_message: str = None
+    progress_message: str = None,
+    append: bool = False
 ):
     """
     Send partial draft content as it's being written.
@@ -268,16 +523,19 @@ async def send_partial_draft(
         partial_content: Partial story content
         word_count: Current word count
         progress_message: Optional progress message
+        append: If True, partial_content is a delta to append to the
+            draft the client already has; otherwise it replaces it (sent
+            as partial_content_delta against the previous draft if smaller)
     """
     update = {
         "type": "partial_draft",
-        "partial_content": partial_content,
         "word_count": word_count,
+        "append": append,
         "message": progress_message,
         "timestamp": asyncio.get_event_loop().time()
     }
 
-    await broadcast_update(session_id, update)
+    await broadcast_text(session_id, "draft", update, "partial_content", partial_content, append=append)
 
 
 async def send_validation_issue(
@@ -298,3 +556,35 @@ async def send_validation_issue(
     }
 
     await broadcast_update(session_id, update)
+
+
+async def send_agent_usage(
+    session_id: str,
+    agent_name: str,
+    usage: Dict,
+    model: str = None,
+    cost_usd: float = None,
+    session_cost_usd: float = None
+):
+    """
+    Send token usage of an agent call, including prompt-cache hits.
+
+    Args:
+        session_id: Session identifier
+        agent_name: Name of the agent
+        usage: Token counts (input, output, cache read/creation)
+        model: Model that served the call
+        cost_usd: Cost of the call
+        session_cost_usd: Cost of the session so far
+    """
+    update = {
+        "type": "agent_usage",
+        "agent": agent_name,
+        "usage": usage,
+        "model": model,
+        "cost_usd": cost_usd,
+        "session_cost_usd": session_cost_usd,
+        "timestamp": asyncio.get_event_loop().time()
+    }
+
+    await broadcast_update(session_id, update)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Any, Dict, List
 import os
 
 
@@ -36,6 +36,112 @@ class Settings(BaseSettings):
     agent_timeout_seconds: int = 1800  # 30 minutes
     min_critic_score: float = 8.0
 
+    # LLM Transport
+    llm_transport: str = "anthropic"  # "anthropic" or "fake" (offline)
+    llm_http2: bool = True
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry_seconds: float = 30.0
+    llm_connect_timeout_seconds: float = 10.0
+    fake_llm_latency_seconds: float = 0.0
+    fake_llm_token_latency_seconds: float = 0.0
+
+    # Model routing
+    llm_default_model: str = "claude-sonnet-4-20250514"
+    # Per-agent overrides: {"<agent>": {"model", "max_tokens", "timeout_seconds", "escalate_to"}}
+    # JSON-only agents run on a faster model and escalate when its output is unusable
+    agent_model_routes: Dict[str, Dict[str, Any]] = {
+        "character-designer": {
+            "model": "claude-3-5-haiku-20241022",
+            "escalate_to": "claude-sonnet-4-20250514"
+        },
+        "consistency-validator": {
+            "model": "claude-3-5-haiku-20241022",
+            "escalate_to": "claude-sonnet-4-20250514"
+        }
+    }
+
+    # Rate limiting (shared by all workers through Redis; 0 = unlimited)
+    llm_rate_limit_enabled: bool = True
+    llm_requests_per_minute: int = 50
+    llm_tokens_per_minute: int = 400000  # reserved as prompt estimate + max_tokens per call
+    llm_max_in_flight: int = 16
+    llm_rate_limit_priority_headroom: float = 0.1  # share of each limit kept free per priority level
+    llm_rate_limit_max_wait_seconds: float = 600  # give up waiting for capacity (0 = wait forever)
+    llm_rate_limit_lease_seconds: float = 60  # in-flight slot expiry, renewed while the call runs
+
+    # Resilience (retries, hedging and circuit breaking of LLM calls)
+    llm_max_attempts: int = 4
+    llm_retry_base_delay_seconds: float = 1.0  # backoff is random up to base * 2^retry...
+    llm_retry_max_delay_seconds: float = 30.0  # ...capped at this
+    llm_retry_after_max_seconds: float = 120.0  # longest server retry-after honoured
+    # Short JSON agents race a second request when slower than the latency quantile
+    llm_hedge_agents: List[str] = ["plot-architect", "character-designer", "consistency-validator", "literary-critic"]
+    llm_hedge_quantile: float = 0.95
+    llm_hedge_min_delay_seconds: float = 5.0
+    llm_hedge_default_delay_seconds: float = 30.0  # until enough latencies are observed
+    llm_circuit_window: int = 20  # recent calls considered by the circuit breaker
+    llm_circuit_min_calls: int = 5
+    llm_circuit_failure_ratio: float = 0.5
+    llm_circuit_cooldown_seconds: float = 30.0  # new sessions wait this long once it opens
+
+    # Metrics (Prometheus)
+    metrics_enabled: bool = True  # /metrics on the API; also times every Redis command
+    worker_metrics_port: int = 9100  # workers serve their metrics here (0 = disabled)
+
+    # Tracing (OpenTelemetry)
+    tracing_enabled: bool = True  # spans per request, phase, validation iteration and agent call
+    tracing_file: str = "traces.jsonl"  # JSON Lines span log ("" = disabled)
+    tracing_otlp_endpoint: str = ""  # OTLP/HTTP collector, e.g. http://localhost:4318/v1/traces
+
+    # Streaming
+    stream_drafts: bool = True  # stream writer/editor output as partial_draft deltas
+
+    # Writer
+    writer_mode: str = "single"  # "single" (one call) or "sharded" (acts written concurrently)
+
+    # Editor
+    editor_mode: str = "patch"  # "patch" (paragraph edits) or "rewrite" (full draft)
+
+    # Validation
+    incremental_validation: bool = True  # re-validate only the paragraphs changed by the editor
+    incremental_validation_max_changed_ratio: float = 0.4  # above this share, validate the full draft
+    incremental_validation_context_paragraphs: int = 1
+
+    # Convergence (early stopping of the validation loop)
+    convergence_plateau_window: int = 2  # stop when the last N iterations did not improve...
+    convergence_min_score_delta: float = 0.25  # ...the critic's min score by at least this much
+    session_token_budget: int = 0  # stop refining after this many tokens (0 = unlimited)
+    session_time_budget_seconds: float = 0  # stop refining after this long (0 = unlimited)
+
+    # Cost accounting (USD per million tokens) and budgets
+    llm_model_prices: Dict[str, Dict[str, float]] = {
+        "claude-sonnet-4-20250514": {"input": 3.0, "output": 15.0, "cache_read": 0.3, "cache_write": 3.75},
+        "claude-3-5-haiku-20241022": {"input": 0.8, "output": 4.0, "cache_read": 0.08, "cache_write": 1.0}
+    }
+    session_cost_budget_usd: float = 0  # for requests without max_cost_usd (0 = unlimited)
+    budget_downgrade_ratio: float = 0.8  # past this share of the budget, agents use the fallback model...
+    budget_fallback_model: str = "claude-3-5-haiku-20241022"  # ...and stop escalating
+
+    # Event Bus
+    event_bus_queue_size: int = 1000  # per-websocket buffer of pending events
+    event_replay_max_events: int = 5000  # events kept per session for late or reconnecting clients
+
+    # Job Queue
+    job_queue_enabled: bool = True  # False runs generation in-process (BackgroundTasks)
+    job_queue_stream: str = "story-jobs"
+    job_queue_group: str = "story-workers"
+    job_visibility_timeout_seconds: int = 120  # redeliver jobs without a heartbeat for this long
+    job_heartbeat_seconds: int = 30
+    job_max_deliveries: int = 3
+    worker_concurrency: int = 4
+
+    # Response Cache
+    response_cache_enabled: bool = True
+    response_cache_ttl_seconds: int = 60 * 60 * 24 * 7  # 7 days
+    response_cache_local_max_entries: int = 256
+    response_cache_local_max_bytes: int = 16 * 1024 * 1024  # 16 MB
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,10 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import logging
 
 from app.config import settings
 from app.api.routes import stories, websocket
+from app.services.llm_client import close_transport
+from app.services.redis_client import close_redis
+from app.services.event_bus import event_bus
+from app.services.response_cache import response_cache
+from app.services.metrics import refresh_gauges
+from app.services.tracing import init_tracing, shutdown_tracing
 
 # Configure logging
 logging.basicConfig(
@@ -61,6 +68,22 @@ async def health_check():
     }
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Agent response cache hit/miss counters for this process"""
+    return response_cache.get_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics of this process (agents, tokens, Redis, websockets, queue depth)"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+
+    await refresh_gauges()
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
@@ -80,6 +103,7 @@ async def startup_event():
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Debug mode: {settings.debug}")
+    init_tracing("api")
     # TODO: Initialize database connection pool
     # TODO: Initialize Redis connection
 
@@ -88,5 +112,9 @@ async def startup_event():
 async def shutdown_event():
     """Run on application shutdown"""
     logger.info("Shutting down application")
+    await close_transport()
+    await event_bus.close()
+    await close_redis()
+    shutdown_tracing()
     # TODO: Close database connections
     # TODO: Close Redis connections
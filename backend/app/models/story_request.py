@@ -55,6 +55,11 @@ class StoryRequest(BaseModel):
         le=15000,
         description="Número alvo de palavras (5000-15000)"
     )
+    max_cost_usd: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Orçamento máximo da geração em USD (padrão: SESSION_COST_BUDGET_USD)"
+    )
 
     class Config:
         json_schema_extra = {
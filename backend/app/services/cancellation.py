@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Coroutine, Optional
+
+from app.services.event_bus import event_bus
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationCancelled(Exception):
+    """Raised when a session is cancelled while it is being generated"""
+
+
+class CancellationToken:
+    """
+    Cancellation signal for a single generation run.
+
+    The orchestrator checks the token between agent calls. Cancelling it
+    also cancels the task running the pipeline, so in-flight HTTP requests
+    and streams are aborted right away instead of running to completion.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.cancelled = False
+        self._task: Optional[asyncio.Task] = None
+
+    def cancel(self) -> None:
+        """Cancel the run (idempotent)"""
+        if self.cancelled:
+            return
+
+        self.cancelled = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+        logger.info(f"Cancellation requested for session {self.session_id}")
+
+    def raise_if_cancelled(self) -> None:
+        """Raise GenerationCancelled if the run was cancelled"""
+        if self.cancelled:
+            raise GenerationCancelled(f"Session {self.session_id} was cancelled")
+
+    async def run(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        """
+        Run the pipeline as a task that the token can cancel.
+
+        Args:
+            coro: Pipeline coroutine
+
+        Returns:
+            Result of the coroutine
+
+        Raises:
+            GenerationCancelled: If the token was cancelled while it ran
+        """
+        if self.cancelled:
+            coro.close()
+            self.raise_if_cancelled()
+
+        self._task = asyncio.create_task(coro)
+
+        try:
+            return await self._task
+        except asyncio.CancelledError:
+            if self.cancelled:
+                raise GenerationCancelled(f"Session {self.session_id} was cancelled") from None
+            raise
+
+
+@asynccontextmanager
+async def watch_cancellation(session_id: str) -> AsyncIterator[CancellationToken]:
+    """
+    Provide a token that is cancelled when the session is cancelled.
+
+    Listens on the session's event bus channel for the `cancelled` status
+    event published by SessionManager.cancel_session, from any process.
+
+    Args:
+        session_id: Session identifier
+
+    Yields:
+        CancellationToken for the run
+    """
+    token = CancellationToken(session_id)
+
+    async with event_bus.subscribe(session_id) as events:
+        async def listen() -> None:
+            while True:
+                event = await events.get()
+                if event.get("type") == "session_status" and event.get("status") == "cancelled":
+                    token.cancel()
+                    return
+
+        listener = asyncio.create_task(listen())
+        try:
+            yield token
+        finally:
+            listener.cancel()
@@ -0,0 +1,145 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+@dataclass
+class DraftScore:
+    """Quality of one validated draft version"""
+
+    version: int
+    min_score: float
+    average_score: float
+    issues: int
+
+    @property
+    def rank(self) -> Tuple[float, float, int]:
+        """Sort key: critic minimum first, then average, then fewer issues"""
+        return (self.min_score, self.average_score, -self.issues)
+
+
+class ConvergencePolicy:
+    """
+    Decides when the validation loop should stop refining a draft.
+
+    The loop stops early when the critic's minimum score has not improved
+    by at least `min_delta` over the last `window` iterations (plateau or
+    regression), or when the session's token, cost or time budget is spent.
+    Whatever the reason, the highest-scoring version seen is the one to
+    keep, not necessarily the latest.
+    """
+
+    def __init__(
+        self,
+        window: int = None,
+        min_delta: float = None,
+        token_budget: int = None,
+        time_budget_seconds: float = None,
+        cost_budget_usd: float = None,
+        elapsed_seconds: float = 0.0
+    ):
+        self.window = window if window is not None else settings.convergence_plateau_window
+        self.min_delta = min_delta if min_delta is not None else settings.convergence_min_score_delta
+        self.token_budget = token_budget if token_budget is not None else settings.session_token_budget
+        self.time_budget_seconds = (
+            time_budget_seconds if time_budget_seconds is not None
+            else settings.session_time_budget_seconds
+        )
+        self.cost_budget_usd = (
+            cost_budget_usd if cost_budget_usd is not None else settings.session_cost_budget_usd
+        )
+
+        # Time spent by earlier runs of a resumed session counts too
+        self.started_at = time.monotonic() - elapsed_seconds
+        self.history: List[DraftScore] = []
+        self.best: Optional[DraftScore] = None
+        self.best_draft: Optional[str] = None
+
+    def record(
+        self,
+        version: int,
+        draft: str,
+        validation_report: Dict,
+        critique_report: Dict
+    ) -> DraftScore:
+        """
+        Record the validation results of a draft version.
+
+        Args:
+            version: Draft version number
+            draft: Draft content
+            validation_report: Consistency Validator report
+            critique_report: Literary Critic report
+
+        Returns:
+            Score of the version
+        """
+        score = DraftScore(
+            version=version,
+            min_score=float(critique_report.get("min_score", 0) or 0),
+            average_score=float(critique_report.get("average_score", 0) or 0),
+            issues=len(validation_report.get("issues", []))
+        )
+        self.history.append(score)
+
+        if self.best is None or score.rank > self.best.rank:
+            self.best = score
+            self.best_draft = draft
+
+        return score
+
+    @property
+    def elapsed_seconds(self) -> float:
+        """Time spent on the session, including earlier runs"""
+        return time.monotonic() - self.started_at
+
+    def budget_reason(self, tokens_used: int = 0, cost_usd: float = 0.0) -> Optional[str]:
+        """
+        Check whether the session's token, cost or time budget is spent.
+
+        Args:
+            tokens_used: Tokens consumed by the session so far
+            cost_usd: Cost of the session so far
+
+        Returns:
+            Which budget is spent, or None
+        """
+        if self.token_budget and tokens_used >= self.token_budget:
+            return f"token budget spent ({tokens_used}/{self.token_budget} tokens)"
+
+        if self.cost_budget_usd and cost_usd >= self.cost_budget_usd:
+            return f"cost budget spent (${cost_usd:.2f}/${self.cost_budget_usd:.2f})"
+
+        elapsed = self.elapsed_seconds
+        if self.time_budget_seconds and elapsed >= self.time_budget_seconds:
+            return f"time budget spent ({elapsed:.0f}/{self.time_budget_seconds:.0f}s)"
+
+        return None
+
+    def stop_reason(self, tokens_used: int = 0, cost_usd: float = 0.0) -> Optional[str]:
+        """
+        Check whether another refinement cycle is worth running.
+
+        Args:
+            tokens_used: Tokens consumed by the session so far
+            cost_usd: Cost of the session so far
+
+        Returns:
+            Why the loop should stop, or None to keep going
+        """
+        reason = self.budget_reason(tokens_used, cost_usd)
+        if reason:
+            return reason
+
+        if self.window and len(self.history) > self.window:
+            before = max(s.min_score for s in self.history[:-self.window])
+            recent = max(s.min_score for s in self.history[-self.window:])
+            if recent < before + self.min_delta:
+                return (
+                    f"scores plateaued (best {recent:.1f} in the last {self.window} iterations "
+                    f"vs {before:.1f} before)"
+                )
+
+        return None
@@ -0,0 +1,53 @@
+import logging
+from typing import Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Usage keys of an LLM response and their price entry in settings.llm_model_prices
+USAGE_PRICES = {
+    "input_tokens": "input",
+    "output_tokens": "output",
+    "cache_read_input_tokens": "cache_read",
+    "cache_creation_input_tokens": "cache_write"
+}
+
+_unpriced_models = set()
+
+
+def usage_cost(model: str, usage: Dict[str, int]) -> float:
+    """
+    Cost in USD of one LLM call.
+
+    Args:
+        model: Model that served the call
+        usage: Token counts of the response
+
+    Returns:
+        Cost of the call (0 for models without a price)
+    """
+    prices = settings.llm_model_prices.get(model)
+    if prices is None:
+        if model not in _unpriced_models:
+            _unpriced_models.add(model)
+            logger.warning(f"No price configured for model {model}, its calls are not costed")
+        return 0.0
+
+    return sum(
+        (usage.get(key, 0) or 0) * prices.get(price, 0.0)
+        for key, price in USAGE_PRICES.items()
+    ) / 1_000_000
+
+
+def session_budget(max_cost_usd: Optional[float]) -> float:
+    """
+    Cost budget of a session.
+
+    Args:
+        max_cost_usd: Budget set on the request, if any
+
+    Returns:
+        Budget in USD (0 = unlimited)
+    """
+    return max_cost_usd or settings.session_cost_budget_usd
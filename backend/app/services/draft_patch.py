@@ -0,0 +1,248 @@
+import difflib
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+# The editor revises a draft with targeted edits instead of regenerating the
+# whole story. Paragraphs are numbered [P1], [P2], ... in the editor prompt
+# and edits refer to those ids:
+#
+#     {"edits": [
+#         {"paragraph": "P3", "action": "replace", "text": "..."},
+#         {"paragraph": "P7", "action": "insert_after", "text": "..."},
+#         {"paragraph": "P9", "action": "delete"}
+#     ]}
+#
+# "P0" is only valid with insert_after and inserts before the first paragraph.
+ACTIONS = ("replace", "insert_after", "delete")
+
+
+class PatchError(ValueError):
+    """Raised when an edit list cannot be applied to a draft"""
+
+
+@dataclass
+class DraftDiff:
+    """Paragraph-level difference between two draft versions"""
+
+    changed: List[int]  # 1-based ids of new, modified or deletion-adjacent paragraphs in the new draft
+    old_to_new: Dict[int, int]  # ids of unchanged paragraphs, old draft -> new draft
+    total: int  # number of paragraphs in the new draft
+    identical: bool  # the two drafts have the same paragraphs
+
+    @property
+    def changed_ratio(self) -> float:
+        """Share of the new draft's paragraphs that changed"""
+        return len(self.changed) / self.total if self.total else 1.0
+
+
+def split_paragraphs(draft: str) -> List[str]:
+    """
+    Split a draft into paragraphs (blocks separated by blank lines).
+
+    Args:
+        draft: Draft in Markdown
+
+    Returns:
+        Non-empty paragraphs, in order
+    """
+    return [p.strip() for p in re.split(r"\n\s*\n", draft) if p.strip()]
+
+
+def join_paragraphs(paragraphs: List[str]) -> str:
+    """Join paragraphs back into a draft"""
+    return "\n\n".join(paragraphs)
+
+
+def number_paragraphs(paragraphs: List[str]) -> str:
+    """
+    Render paragraphs prefixed with their ids, for the editor prompt.
+
+    Args:
+        paragraphs: Draft paragraphs
+
+    Returns:
+        Text with one "[P<n>] ..." block per paragraph
+    """
+    return "\n\n".join(f"[P{i}] {paragraph}" for i, paragraph in enumerate(paragraphs, start=1))
+
+
+def parse_paragraph_id(value: Any) -> int:
+    """
+    Parse a paragraph id ("P3", "[P3]", "3" or 3) into its number.
+
+    Raises:
+        PatchError: If the value is not a paragraph id
+    """
+    match = re.fullmatch(r"\[?P?(\d+)\]?", str(value).strip(), re.IGNORECASE)
+    if not match:
+        raise PatchError(f"Invalid paragraph id: {value!r}")
+    return int(match.group(1))
+
+
+def apply_edits(paragraphs: List[str], edits: List[Dict[str, Any]]) -> str:
+    """
+    Apply an edit list to a draft.
+
+    The whole list is validated before anything is applied, so a draft is
+    either fully patched or left untouched.
+
+    Args:
+        paragraphs: Paragraphs of the current draft
+        edits: Edits as returned by the editor
+
+    Returns:
+        Patched draft
+
+    Raises:
+        PatchError: If the edit list is empty, malformed, refers to unknown
+            paragraphs or edits the same paragraph twice
+    """
+    if not isinstance(edits, list) or not edits:
+        raise PatchError("No edits to apply")
+
+    replaced: Dict[int, str] = {}
+    deleted = set()
+    inserted: Dict[int, List[str]] = {}
+
+    for edit in edits:
+        if not isinstance(edit, dict):
+            raise PatchError(f"Invalid edit: {edit!r}")
+
+        action = edit.get("action")
+        if action not in ACTIONS:
+            raise PatchError(f"Unknown edit action: {action!r}")
+
+        index = parse_paragraph_id(edit.get("paragraph"))
+        lowest = 0 if action == "insert_after" else 1
+        if not lowest <= index <= len(paragraphs):
+            raise PatchError(f"Paragraph P{index} does not exist")
+
+        text = (edit.get("text") or "").strip()
+        if action != "delete" and not text:
+            raise PatchError(f"Edit {action} on P{index} has no text")
+
+        if action == "insert_after":
+            inserted.setdefault(index, []).append(text)
+            continue
+
+        if index in replaced or index in deleted:
+            raise PatchError(f"Paragraph P{index} is edited more than once")
+        if action == "replace":
+            replaced[index] = text
+        else:
+            deleted.add(index)
+
+    result = inserted.get(0, [])[:]
+    for index, paragraph in enumerate(paragraphs, start=1):
+        if index not in deleted:
+            result.append(replaced.get(index, paragraph))
+        result.extend(inserted.get(index, []))
+
+    return join_paragraphs(result)
+
+
+def diff_paragraphs(old: List[str], new: List[str]) -> DraftDiff:
+    """
+    Compare two drafts paragraph by paragraph.
+
+    A deletion leaves no paragraph behind in the new draft, so the
+    paragraphs on either side of the deletion point are marked as changed:
+    the text around the cut must be validated again.
+
+    Args:
+        old: Paragraphs of the previous draft
+        new: Paragraphs of the revised draft
+
+    Returns:
+        DraftDiff with the changed paragraphs of the new draft
+    """
+    matcher = difflib.SequenceMatcher(a=old, b=new, autojunk=False)
+    changed = set()
+    old_to_new: Dict[int, int] = {}
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                old_to_new[i1 + offset + 1] = j1 + offset + 1
+        elif tag == "delete":
+            # Neighbours of the deletion point: P{j1} before it, P{j1 + 1} after it
+            changed.update(i for i in (j1, j1 + 1) if 1 <= i <= len(new))
+        else:
+            changed.update(range(j1 + 1, j2 + 1))
+
+    return DraftDiff(changed=sorted(changed), old_to_new=old_to_new, total=len(new), identical=old == new)
+
+
+def render_excerpts(paragraphs: List[str], ids: List[int], context: int = 1) -> str:
+    """
+    Render selected paragraphs with their ids and surrounding context.
+
+    Runs of omitted paragraphs are shown as "[...]".
+
+    Args:
+        paragraphs: Draft paragraphs
+        ids: 1-based ids of the paragraphs to show
+        context: Number of neighbouring paragraphs to include on each side
+
+    Returns:
+        Text with one "[P<n>] ..." block per shown paragraph
+    """
+    shown = set()
+    for index in ids:
+        shown.update(range(max(1, index - context), min(len(paragraphs), index + context) + 1))
+
+    blocks = []
+    for index in range(1, len(paragraphs) + 1):
+        if index in shown:
+            blocks.append(f"[P{index}] {paragraphs[index - 1]}")
+        elif not blocks or blocks[-1] != "[...]":
+            blocks.append("[...]")
+
+    return "\n\n".join(blocks)
+
+
+def text_delta(old: str, new: str) -> List[List[Any]]:
+    """
+    Line-level delta turning one text into another.
+
+    Lines are split on "\\n" only, so any client can apply the delta with
+    the same split and join, whatever the characters in the text.
+
+    Args:
+        old: Previous text
+        new: Revised text
+
+    Returns:
+        Operations [start, end, lines], in ascending order: lines start to
+        end (exclusive) of the old text are replaced by `lines`
+    """
+    old_lines = old.split("\n")
+    new_lines = new.split("\n")
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+
+    return [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_text_delta(old: str, delta: List[List[Any]]) -> str:
+    """
+    Apply a delta produced by text_delta.
+
+    Reference for the client's applyTextDelta (frontend useWebSocket.ts),
+    which must follow the same steps.
+
+    Args:
+        old: Text the delta was computed against
+        delta: Operations [start, end, lines]
+
+    Returns:
+        Revised text
+    """
+    lines = old.split("\n")
+    for start, end, replacement in reversed(delta):
+        lines[start:end] = replacement
+    return "\n".join(lines)
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from redis.asyncio.client import PubSub
+
+from app.config import settings
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOG_TTL_SECONDS = 60 * 60 * 24  # same as the session itself
+
+# Number the event, append it to the session's replay log and publish it,
+# atomically: sequence numbers are gap-free and events reach subscribers
+# in sequence order, whichever process publishes them.
+#
+# The seq field is spliced into the JSON-encoded event, which is an object.
+# Log entries have the id "<seq>-0", so a range of sequence numbers is an
+# XRANGE.
+#
+# Events carrying a text (the draft, an agent's prompt) also record the
+# full text of their base and the seq that produced it, so a snapshot can
+# give clients the exact text later deltas apply to.
+# KEYS: sequence counter, replay log, texts hash
+# ARGV: event JSON, log max length, TTL, channel, text base ('' = none),
+#       text, '1' to append the text to the recorded one
+# Returns: {seq, number of receivers}
+_PUBLISH_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+local event
+if ARGV[1] == '{}' then
+    event = '{"seq": ' .. seq .. '}'
+else
+    event = '{"seq": ' .. seq .. ', ' .. string.sub(ARGV[1], 2)
+end
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], seq .. '-0', 'event', event)
+if ARGV[5] ~= '' then
+    local text = ARGV[6]
+    if ARGV[7] == '1' then
+        text = (redis.call('HGET', KEYS[3], ARGV[5]) or '') .. text
+    end
+    redis.call('HSET', KEYS[3], ARGV[5], text, ARGV[5] .. ':seq', seq)
+    redis.call('EXPIRE', KEYS[3], ARGV[3])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return {seq, redis.call('PUBLISH', ARGV[4], event)}
+"""
+
+class EventBus:
+    """
+    Per-session event fan-out over Redis pub/sub.
+
+    Story generation publishes updates to the `session-events:{session_id}`
+    channel from whichever process runs it; every websocket handler, in any
+    worker or host, subscribes to the channel of its session.
+
+    Each process holds a single pub/sub connection. A reader task dispatches
+    incoming messages to the local subscriber queues, so the number of Redis
+    connections does not grow with the number of open websockets.
+
+    Every event gets a per-session sequence number (`seq`) and is kept in a
+    bounded replay log (`session:{id}:events`), so subscribers that connect
+    late, reconnect or fall behind can fetch what they missed.
+    """
+
+    def __init__(self, prefix: str = "session-events"):
+        self.prefix = prefix
+        self._publish = None
+        self._pubsub: Optional[PubSub] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._lock = asyncio.Lock()
+
+    def channel(self, session_id: str) -> str:
+        """Redis channel name for a session"""
+        return f"{self.prefix}:{session_id}"
+
+    def _seq_key(self, session_id: str) -> str:
+        return f"session:{session_id}:seq"
+
+    def _log_key(self, session_id: str) -> str:
+        return f"session:{session_id}:events"
+
+    def _texts_key(self, session_id: str) -> str:
+        return f"session:{session_id}:texts"
+
+    async def publish(
+        self,
+        session_id: str,
+        event: Dict[str, Any],
+        text_base: Optional[str] = None,
+        text: str = "",
+        append: bool = False
+    ) -> Tuple[int, int]:
+        """
+        Publish an event to every subscriber of a session.
+
+        The event is delivered with its sequence number in a `seq` field.
+
+        Args:
+            session_id: Session identifier
+            event: JSON-serializable event payload
+            text_base: Name of the text the event changes (e.g. "draft"),
+                recorded for snapshots (see texts)
+            text: Full text of the base after the event, or the text
+                appended to it
+            append: Whether `text` extends the recorded text
+
+        Returns:
+            Tuple of (sequence number of the event, number of processes
+            that received it)
+        """
+        client = await get_redis()
+        if self._publish is None:
+            self._publish = client.register_script(_PUBLISH_SCRIPT)
+
+        seq, receivers = await self._publish(
+            keys=[self._seq_key(session_id), self._log_key(session_id), self._texts_key(session_id)],
+            args=[
+                json.dumps(event),
+                settings.event_replay_max_events,
+                EVENT_LOG_TTL_SECONDS,
+                self.channel(session_id),
+                text_base or "",
+                text,
+                "1" if append else "0"
+            ],
+            client=client
+        )
+        return int(seq), int(receivers)
+
+    async def last_seq(self, session_id: str) -> int:
+        """Sequence number of the last event published for a session"""
+        client = await get_redis()
+        return int(await client.get(self._seq_key(session_id)) or 0)
+
+    async def texts(self, session_id: str) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+        """
+        Read the texts recorded by a session's events.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Tuple of (sequence number of the last event, texts by base as
+            {"text": ..., "seq": seq of the event that produced it}); read
+            together, so events after that seq apply to these texts
+        """
+        client = await get_redis()
+
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.get(self._seq_key(session_id))
+            pipe.hgetall(self._texts_key(session_id))
+            seq, fields = await pipe.execute()
+
+        texts = {
+            base: {"text": text, "seq": int(fields.get(f"{base}:seq", 0))}
+            for base, text in fields.items()
+            if not base.endswith(":seq")
+        }
+        return int(seq or 0), texts
+
+    async def replay(
+        self,
+        session_id: str,
+        after_seq: int = 0,
+        until_seq: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Read past events of a session from its replay log.
+
+        Args:
+            session_id: Session identifier
+            after_seq: Return events with a greater sequence number
+            until_seq: Last sequence number to return (default: the latest)
+
+        Returns:
+            Tuple of (events in sequence order, oldest sequence number still
+            in the log or 0 if it is empty); events older than that were
+            trimmed and cannot be replayed
+        """
+        client = await get_redis()
+
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.xrange(self._log_key(session_id), "-", "+", count=1)
+            pipe.xrange(
+                self._log_key(session_id),
+                f"{after_seq + 1}-0",
+                f"{until_seq}-0" if until_seq is not None else "+"
+            )
+            oldest, entries = await pipe.execute()
+
+        oldest_seq = int(oldest[0][0].split("-")[0]) if oldest else 0
+        return [json.loads(fields["event"]) for _, fields in entries], oldest_seq
+
+    @asynccontextmanager
+    async def subscribe(self, session_id: str) -> AsyncIterator[asyncio.Queue]:
+        """
+        Subscribe to the events of a session.
+
+        Usage:
+            async with event_bus.subscribe(session_id) as events:
+                event = await events.get()
+
+        Args:
+            session_id: Session identifier
+
+        Yields:
+            Queue receiving the session's events (as dicts)
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.event_bus_queue_size)
+        await self._add_subscriber(session_id, queue)
+        try:
+            yield queue
+        finally:
+            await self._remove_subscriber(session_id, queue)
+
+    async def close(self) -> None:
+        """Stop the reader task and close the pub/sub connection"""
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+        self._subscribers.clear()
+
+    async def _add_subscriber(self, session_id: str, queue: asyncio.Queue) -> None:
+        async with self._lock:
+            if self._pubsub is None:
+                client = await get_redis()
+                self._pubsub = client.pubsub()
+
+            queues = self._subscribers.setdefault(session_id, set())
+            if not queues:
+                await self._pubsub.subscribe(self.channel(session_id))
+            queues.add(queue)
+
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read_loop())
+
+    async def _remove_subscriber(self, session_id: str, queue: asyncio.Queue) -> None:
+        async with self._lock:
+            queues = self._subscribers.get(session_id)
+            if not queues:
+                return
+
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[session_id]
+                try:
+                    await self._pubsub.unsubscribe(self.channel(session_id))
+                except Exception as e:
+                    logger.warning(f"Error unsubscribing from session {session_id}: {e}")
+
+    async def _read_loop(self) -> None:
+        """Dispatch pub/sub messages to local subscriber queues"""
+        channel_prefix = f"{self.prefix}:"
+
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Event bus read error, retrying: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            if not message or message.get("type") != "message":
+                continue
+
+            session_id = message["channel"][len(channel_prefix):]
+            try:
+                event = json.loads(message["data"])
+            except json.JSONDecodeError:
+                logger.warning(f"Dropping malformed event for session {session_id}")
+                continue
+
+            for queue in list(self._subscribers.get(session_id, ())):
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    logger.warning(f"Event queue full for session {session_id}, dropping event")
+
+
+event_bus = EventBus()
@@ -0,0 +1,218 @@
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+
+from app.config import settings
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Add a job unless its session already has one, atomically: concurrent
+# requests for the same session cannot enqueue two runs of it. The session
+# key holds the id of the session's job until the job is acked; a key whose
+# job is no longer in the stream (e.g. trimmed by hand) is stale.
+# KEYS: stream, session job key
+# ARGV: session id, payload JSON
+# Returns: job id, or false if the session already has a job
+_ENQUEUE_SCRIPT = """
+local current = redis.call('GET', KEYS[2])
+if current and #redis.call('XRANGE', KEYS[1], current, current) > 0 then
+    return false
+end
+local job_id = redis.call('XADD', KEYS[1], '*', 'session_id', ARGV[1], 'payload', ARGV[2])
+redis.call('SET', KEYS[2], job_id)
+return job_id
+"""
+
+
+@dataclass
+class Job:
+    """A story generation job claimed by a worker"""
+
+    id: str
+    session_id: str
+    payload: Dict[str, Any]
+    deliveries: int = 1
+
+
+class JobQueue:
+    """
+    Durable story generation queue backed by a Redis stream.
+
+    Jobs are appended with XADD and read by workers through a consumer
+    group. A job stays in the group's pending list until the worker acks it;
+    while running, the worker heartbeats by re-claiming it, which resets its
+    idle time. Jobs idle longer than the visibility timeout belong to a dead
+    worker and are claimed again by the next worker that asks for work.
+    """
+
+    def __init__(
+        self,
+        stream: str = None,
+        group: str = None
+    ):
+        self.stream = stream or settings.job_queue_stream
+        self.group = group or settings.job_queue_group
+        self._group_ready = False
+        self._enqueue = None
+
+    async def get_redis(self) -> redis.Redis:
+        """Get the shared Redis connection, creating the consumer group once"""
+        client = await get_redis()
+
+        if not self._group_ready:
+            try:
+                await client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            self._group_ready = True
+
+        return client
+
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.stream}:session:{session_id}"
+
+    async def enqueue(self, session_id: str, payload: Dict[str, Any]) -> Optional[str]:
+        """
+        Add a job to the queue, unless the session already has one.
+
+        A session's job stays in the queue until it is acked: while it is
+        waiting, running, or waiting to be redelivered after a worker
+        crash, no other job can be added for the session.
+
+        Args:
+            session_id: Session the job generates
+            payload: JSON-serializable job data
+
+        Returns:
+            Stream id of the job, or None if the session already has a job
+        """
+        client = await self.get_redis()
+        if self._enqueue is None:
+            self._enqueue = client.register_script(_ENQUEUE_SCRIPT)
+
+        job_id = await self._enqueue(
+            keys=[self.stream, self._session_key(session_id)],
+            args=[session_id, json.dumps(payload)],
+            client=client
+        )
+        if not job_id:
+            logger.info(f"Session {session_id} already has a queued job")
+            return None
+
+        logger.info(f"Enqueued job {job_id} for session {session_id}")
+        return job_id
+
+    async def claim(self, consumer: str, block_ms: int = 5000) -> Optional[Job]:
+        """
+        Claim the next job for a worker.
+
+        Jobs abandoned by dead workers are redelivered first; otherwise this
+        blocks for up to block_ms waiting for a new job.
+
+        Args:
+            consumer: Unique worker name
+            block_ms: Maximum time to wait for a new job
+
+        Returns:
+            Claimed job or None
+        """
+        client = await self.get_redis()
+
+        _, claimed, *_ = await client.xautoclaim(
+            self.stream,
+            self.group,
+            consumer,
+            min_idle_time=settings.job_visibility_timeout_seconds * 1000,
+            start_id="0-0",
+            count=1
+        )
+        if claimed:
+            job_id, fields = claimed[0]
+            pending = await client.xpending_range(
+                self.stream, self.group, min=job_id, max=job_id, count=1
+            )
+            deliveries = pending[0]["times_delivered"] if pending else 1
+            logger.warning(f"Redelivering job {job_id} (delivery {deliveries})")
+            return self._to_job(job_id, fields, deliveries)
+
+        response = await client.xreadgroup(
+            self.group,
+            consumer,
+            {self.stream: ">"},
+            count=1,
+            block=block_ms
+        )
+        if not response:
+            return None
+
+        _, messages = response[0]
+        job_id, fields = messages[0]
+        return self._to_job(job_id, fields)
+
+    async def heartbeat(self, job: Job, consumer: str) -> None:
+        """
+        Signal that a job is still being worked on.
+
+        Args:
+            job: Claimed job
+            consumer: Worker name that holds the job
+        """
+        client = await self.get_redis()
+        await client.xclaim(
+            self.stream,
+            self.group,
+            consumer,
+            min_idle_time=0,
+            message_ids=[job.id],
+            justid=True
+        )
+
+    async def ack(self, job: Job) -> None:
+        """
+        Mark a job as done and remove it from the stream.
+
+        Args:
+            job: Claimed job
+        """
+        client = await self.get_redis()
+
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.xack(self.stream, self.group, job.id)
+            pipe.xdel(self.stream, job.id)
+            pipe.delete(self._session_key(job.session_id))
+            await pipe.execute()
+
+    async def depth(self) -> Dict[str, int]:
+        """
+        Get queue depth.
+
+        Returns:
+            Number of jobs waiting for a worker and number claimed but not acked
+        """
+        client = await self.get_redis()
+
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.xlen(self.stream)
+            pipe.xpending(self.stream, self.group)
+            length, pending = await pipe.execute()
+
+        return {
+            "waiting": length - pending["pending"],
+            "pending": pending["pending"]
+        }
+
+    def _to_job(self, job_id: str, fields: Dict[str, str], deliveries: int = 1) -> Job:
+        return Job(
+            id=job_id,
+            session_id=fields["session_id"],
+            payload=json.loads(fields["payload"]),
+            deliveries=deliveries
+        )
+
+
+job_queue = JobQueue()
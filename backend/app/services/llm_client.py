@@ -0,0 +1,431 @@
+import asyncio
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple, Union
+
+import httpx
+from anthropic import AsyncAnthropic
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+
+
+@dataclass
+class LLMResponse:
+    """Normalized response returned by every LLM transport"""
+
+    text: str
+    model: str
+    usage: Dict[str, int] = field(default_factory=dict)
+    stop_reason: Optional[str] = None
+
+
+class LLMStream:
+    """
+    Async iterator over the text deltas of a streamed completion.
+
+    The final LLMResponse (full text and usage) is available in `response`
+    once the iteration has finished.
+    """
+
+    def __init__(self, events: AsyncIterator[Union[str, LLMResponse]]):
+        self._events = events
+        self.response: Optional[LLMResponse] = None
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        async for event in self._events:
+            if isinstance(event, LLMResponse):
+                self.response = event
+            else:
+                yield event
+
+
+class LLMTransport:
+    """
+    Base class for the transports used to talk to the LLM.
+
+    The story pipeline only depends on this interface, so the real Anthropic
+    client can be swapped for a local fake (tests, benchmarks, offline dev).
+    """
+
+    async def complete(
+        self,
+        prompt: str,
+        *,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = 4096,
+        timeout: Optional[float] = None,
+        context: Optional[str] = None
+    ) -> LLMResponse:
+        """
+        Run a single-turn completion.
+
+        Args:
+            prompt: User prompt
+            model: Model identifier
+            max_tokens: Maximum tokens in response
+            timeout: Per-call timeout in seconds
+            context: Stable prompt prefix (planning artifacts) shared across
+                calls; transports that support it mark it as cacheable
+
+        Returns:
+            LLMResponse with text and token usage
+        """
+        raise NotImplementedError
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = 4096,
+        timeout: Optional[float] = None,
+        context: Optional[str] = None
+    ) -> LLMStream:
+        """
+        Run a single-turn completion, yielding text as it is generated.
+
+        Transports without native streaming fall back to a single delta.
+
+        Returns:
+            LLMStream of text deltas
+        """
+        async def events():
+            response = await self.complete(
+                prompt, model=model, max_tokens=max_tokens, timeout=timeout, context=context
+            )
+            yield response.text
+            yield response
+
+        return LLMStream(events())
+
+    async def close(self) -> None:
+        """Release network resources held by the transport"""
+
+
+class AnthropicTransport(LLMTransport):
+    """
+    Async-native Anthropic transport.
+
+    All calls share a single pooled httpx client (HTTP/2 when available),
+    so concurrent sessions multiplex over a bounded set of connections
+    instead of each holding an executor thread.
+    """
+
+    def __init__(self):
+        self.http_client = httpx.AsyncClient(
+            http2=settings.llm_http2,
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+                keepalive_expiry=settings.llm_keepalive_expiry_seconds
+            ),
+            timeout=httpx.Timeout(
+                settings.agent_timeout_seconds,
+                connect=settings.llm_connect_timeout_seconds
+            )
+        )
+        # Retries are handled by the resilience layer (app.services.resilience)
+        self.client = AsyncAnthropic(
+            api_key=settings.anthropic_api_key,
+            http_client=self.http_client,
+            max_retries=0
+        )
+
+    async def complete(
+        self,
+        prompt: str,
+        *,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = 4096,
+        timeout: Optional[float] = None,
+        context: Optional[str] = None
+    ) -> LLMResponse:
+        messages, kwargs = self._request(prompt, model, max_tokens, timeout, context)
+        response = await messages.create(**kwargs)
+
+        return LLMResponse(
+            text=response.content[0].text,
+            model=response.model,
+            usage=_usage_dict(response.usage),
+            stop_reason=response.stop_reason
+        )
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = 4096,
+        timeout: Optional[float] = None,
+        context: Optional[str] = None
+    ) -> LLMStream:
+        async def events():
+            messages, kwargs = self._request(prompt, model, max_tokens, timeout, context)
+
+            async with messages.stream(**kwargs) as stream:
+                async for text in stream.text_stream:
+                    yield text
+
+                message = await stream.get_final_message()
+
+            yield LLMResponse(
+                text="".join(block.text for block in message.content if block.type == "text"),
+                model=message.model,
+                usage=_usage_dict(message.usage),
+                stop_reason=message.stop_reason
+            )
+
+        return LLMStream(events())
+
+    def _request(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        timeout: Optional[float],
+        context: Optional[str]
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Build the messages resource and arguments for a call.
+
+        When a context is given it is sent as a system block with a
+        cache-control breakpoint, so repeated calls over the same planning
+        artifacts are billed as cache reads instead of fresh input.
+        """
+        kwargs = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}],
+            "timeout": timeout or settings.agent_timeout_seconds
+        }
+
+        if not context:
+            return self.client.messages, kwargs
+
+        kwargs["system"] = [{
+            "type": "text",
+            "text": context,
+            "cache_control": {"type": "ephemeral"}
+        }]
+        return self.client.beta.prompt_caching.messages, kwargs
+
+    async def close(self) -> None:
+        await self.http_client.aclose()
+
+
+def _usage_dict(usage: Any) -> Dict[str, int]:
+    """Normalize an Anthropic usage object, including prompt-cache counters"""
+    return {
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0
+    }
+
+
+class FakeTransport(LLMTransport):
+    """
+    Offline transport that returns canned agent outputs.
+
+    Each agent is recognised from the "You are the <Name> Agent" opening of
+    its prompt. Outputs can be overridden per agent, or replaced entirely by
+    a custom responder callable.
+    """
+
+    def __init__(
+        self,
+        responses: Optional[Dict[str, str]] = None,
+        responder: Optional[Callable[[str, str], str]] = None,
+        latency_seconds: float = 0.0,
+        token_latency_seconds: float = 0.0
+    ):
+        self.responses = {**FAKE_RESPONSES, **(responses or {})}
+        self.responder = responder
+        self.latency_seconds = latency_seconds
+        self.token_latency_seconds = token_latency_seconds
+        self.calls = 0
+        self._seen_contexts = set()
+
+    def agent_for(self, prompt: str) -> str:
+        """Return the agent slug (e.g. "plot-architect") a prompt is addressed to"""
+        match = re.search(r"You are the ([\w ]+?) Agent", prompt)
+        if not match:
+            return "unknown"
+        return match.group(1).strip().lower().replace(" ", "-")
+
+    async def complete(
+        self,
+        prompt: str,
+        *,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = 4096,
+        timeout: Optional[float] = None,
+        context: Optional[str] = None
+    ) -> LLMResponse:
+        self.calls += 1
+        agent = self.agent_for(prompt)
+
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        if self.responder is not None:
+            text = self.responder(agent, prompt)
+        else:
+            text = self.responses.get(agent, "")
+            if agent == "writer":
+                text = _pad_story(text, prompt)
+
+        # Simulate prompt caching: the first call with a context writes it,
+        # later calls with the same context read it
+        context_tokens = len(context) // 4 if context else 0
+        cache_hit = bool(context) and hash(context) in self._seen_contexts
+        if context:
+            self._seen_contexts.add(hash(context))
+
+        return LLMResponse(
+            text=text,
+            model=model,
+            usage={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(text) // 4,
+                "cache_creation_input_tokens": 0 if cache_hit else context_tokens,
+                "cache_read_input_tokens": context_tokens if cache_hit else 0
+            },
+            stop_reason="end_turn"
+        )
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = 4096,
+        timeout: Optional[float] = None,
+        context: Optional[str] = None
+    ) -> LLMStream:
+        async def events():
+            response = await self.complete(
+                prompt, model=model, max_tokens=max_tokens, timeout=timeout, context=context
+            )
+            # Emit word-sized deltas, keeping the original whitespace
+            for token in re.findall(r"\S+\s*|\s+", response.text):
+                if self.token_latency_seconds:
+                    await asyncio.sleep(self.token_latency_seconds)
+                yield token
+            yield response
+
+        return LLMStream(events())
+
+
+FAKE_RESPONSES: Dict[str, str] = {
+    "plot-architect": json.dumps({
+        "title": "O Livro das Sombras",
+        "act_1": {
+            "setup": "Um bibliotecário encontra um livro antigo.",
+            "inciting_incident": "O livro revela um segredo."
+        },
+        "act_2": {"rising_action": "A cidade começa a mudar.", "midpoint": "O segredo tem um preço."},
+        "act_3": {"climax": "O confronto na biblioteca.", "resolution": "O livro é selado."}
+    }, ensure_ascii=False),
+    "character-designer": json.dumps({
+        "protagonist": {"name": "Tomás", "description": "Bibliotecário solitário e curioso."},
+        "antagonist": {"name": "Dona Helena", "description": "Guardiã do segredo da cidade."},
+        "supporting": [{"name": "Lia", "description": "Amiga de infância de Tomás."}]
+    }, ensure_ascii=False),
+    "style-master": "# Guia de Estilo\n\nProsa atmosférica, frases longas, narrador em primeira pessoa.",
+    "writer": "# O Livro das Sombras\n\nTomás abriu o livro e a cidade inteira prendeu a respiração.",
+    "consistency-validator": json.dumps({
+        "status": "PASSED",
+        "overall_score": 9.0,
+        "issues": [],
+        "summary": {"total_issues": 0, "critical": 0, "high": 0, "medium": 0, "low": 0}
+    }),
+    "literary-critic": json.dumps({
+        "scores": {
+            "prose_quality": 8.5,
+            "character_development": 8.5,
+            "narrative_structure": 8.5,
+            "style_adherence": 8.5,
+            "emotional_impact": 8.5,
+            "originality": 8.5
+        },
+        "average_score": 8.5,
+        "min_score": 8.5,
+        "overall_assessment": "PASSED"
+    }),
+    "editor": "# O Livro das Sombras\n\nTomás abriu o livro e a cidade inteira prendeu a respiração."
+}
+
+# Paragraphs the fake Writer cycles through to reach the requested length
+FAKE_STORY_PARAGRAPHS = [
+    "Tomás passava as noites entre as estantes da velha biblioteca, onde o silêncio tinha o peso "
+    "de um segredo guardado por gerações. Cada livro parecia respirar quando ele passava.",
+    "Dona Helena observava tudo da janela da casa em frente, com a paciência de quem sabe que "
+    "o tempo acaba sempre por entregar aquilo que se esconde entre as páginas.",
+    "Lia chegou numa tarde de chuva, trazendo nas mãos uma carta sem remetente e nos olhos a "
+    "mesma curiosidade que, anos antes, tinha levado os dois a explorar os porões da cidade."
+]
+
+
+def _pad_story(text: str, prompt: str) -> str:
+    """Extend a canned story to the word count requested in the prompt"""
+    match = re.search(r"Target Word Count:\s*(\d+)", prompt)
+    if not match:
+        return text
+
+    target = int(match.group(1))
+    paragraphs = [text]
+    words = len(text.split())
+    while words < target:
+        paragraph = FAKE_STORY_PARAGRAPHS[len(paragraphs) % len(FAKE_STORY_PARAGRAPHS)]
+        paragraphs.append(paragraph)
+        words += len(paragraph.split())
+
+    return "\n\n".join(paragraphs)
+
+
+_transport: Optional[LLMTransport] = None
+
+
+def get_transport() -> LLMTransport:
+    """
+    Get the process-wide LLM transport, creating it on first use.
+
+    The transport is selected by `settings.llm_transport` ("anthropic" or
+    "fake"). Sharing one instance keeps a single connection pool per process.
+    """
+    global _transport
+
+    if _transport is None:
+        if settings.llm_transport == "fake":
+            _transport = FakeTransport(
+                latency_seconds=settings.fake_llm_latency_seconds,
+                token_latency_seconds=settings.fake_llm_token_latency_seconds
+            )
+        else:
+            _transport = AnthropicTransport()
+
+        logger.info(f"Initialized LLM transport: {type(_transport).__name__}")
+
+    return _transport
+
+
+def set_transport(transport: Optional[LLMTransport]) -> None:
+    """Install a custom transport (e.g. a FakeTransport in tests or benchmarks)"""
+    global _transport
+    _transport = transport
+
+
+async def close_transport() -> None:
+    """Close the shared transport, if one was created"""
+    global _transport
+
+    if _transport is not None:
+        await _transport.close()
+        _transport = None
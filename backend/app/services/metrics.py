@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import redis.asyncio as redis
+from prometheus_client import Gauge, Histogram, start_http_server
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "literary_agent"
+
+# Pipeline phase each agent runs in
+AGENT_PHASES: Dict[str, str] = {
+    "plot-architect": "planning",
+    "character-designer": "planning",
+    "style-master": "planning",
+    "writer": "writing",
+    "consistency-validator": "validation",
+    "literary-critic": "validation",
+    "editor": "editing"
+}
+
+LLM_LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_seconds",
+    "Duration of LLM calls (one per attempt; streams until the last token)",
+    ["agent", "phase", "model", "outcome"],
+    namespace=NAMESPACE,
+    buckets=LLM_LATENCY_BUCKETS
+)
+LLM_TOKENS = Histogram(
+    "llm_tokens",
+    "Tokens per LLM call by kind (input, output, cache_read, cache_creation)",
+    ["agent", "phase", "model", "kind"],
+    namespace=NAMESPACE,
+    buckets=TOKEN_BUCKETS
+)
+PHASE_SECONDS = Histogram(
+    "pipeline_phase_seconds",
+    "Duration of the generation phases of a session (validation spans the whole loop, editing each revision)",
+    ["phase"],
+    namespace=NAMESPACE,
+    buckets=LLM_LATENCY_BUCKETS + (1200, 1800)
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_seconds",
+    "Duration of Redis commands and pipelines (blocking reads include their wait)",
+    ["command"],
+    namespace=NAMESPACE,
+    buckets=FAST_BUCKETS
+)
+WEBSOCKET_SEND_SECONDS = Histogram(
+    "websocket_send_seconds",
+    "Duration of websocket sends to clients",
+    ["type"],
+    namespace=NAMESPACE,
+    buckets=FAST_BUCKETS
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "job_queue_depth",
+    "Story generation jobs waiting for a worker or claimed but not acked",
+    ["state"],
+    namespace=NAMESPACE
+)
+LLM_CALLS_WAITING = Gauge(
+    "llm_calls_waiting",
+    "LLM calls of this process waiting for rate limit capacity",
+    namespace=NAMESPACE
+)
+
+USAGE_KINDS = {
+    "input_tokens": "input",
+    "output_tokens": "output",
+    "cache_read_input_tokens": "cache_read",
+    "cache_creation_input_tokens": "cache_creation"
+}
+
+
+def agent_phase(agent: Optional[str]) -> str:
+    """Phase label of an agent"""
+    return AGENT_PHASES.get(agent, "other")
+
+
+@contextmanager
+def observe_llm_call(agent: Optional[str], model: str) -> Iterator[None]:
+    """Time an LLM call, labelled with its outcome"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        LLM_CALL_SECONDS.labels(
+            agent=agent or "unknown", phase=agent_phase(agent), model=model, outcome=outcome
+        ).observe(time.perf_counter() - started)
+
+
+def observe_usage(agent: Optional[str], model: str, usage: Dict[str, int]) -> None:
+    """Record the token usage of an LLM call"""
+    for key, kind in USAGE_KINDS.items():
+        LLM_TOKENS.labels(
+            agent=agent or "unknown", phase=agent_phase(agent), model=model, kind=kind
+        ).observe(usage.get(key, 0) or 0)
+
+
+@contextmanager
+def observe_phase(phase: str) -> Iterator[None]:
+    """Time a generation phase"""
+    with PHASE_SECONDS.labels(phase=phase).time():
+        yield
+
+
+@contextmanager
+def observe_websocket_send(message_type: Optional[str]) -> Iterator[None]:
+    """Time a websocket send"""
+    with WEBSOCKET_SEND_SECONDS.labels(type=message_type or "unknown").time():
+        yield
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    """Pipeline that times each execute"""
+
+    async def execute(self, raise_on_error: bool = True):
+        with REDIS_COMMAND_SECONDS.labels(command="PIPELINE").time():
+            return await super().execute(raise_on_error)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that times every command (scripts show up as EVALSHA)"""
+
+    async def execute_command(self, *args, **options):
+        with REDIS_COMMAND_SECONDS.labels(command=str(args[0]).upper()).time():
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+async def refresh_gauges() -> None:
+    """Update the gauges sampled at scrape time"""
+    # Imported here: both modules use the instrumented Redis client
+    from app.services.job_queue import job_queue
+    from app.services.rate_limiter import rate_limiter
+
+    LLM_CALLS_WAITING.set(rate_limiter.waiting)
+
+    try:
+        depth = await job_queue.depth()
+    except redis.RedisError as e:
+        logger.warning(f"Could not read job queue depth: {e}")
+        return
+
+    for state, count in depth.items():
+        JOB_QUEUE_DEPTH.labels(state=state).set(count)
+
+
+def start_metrics_server(port: int = None) -> None:
+    """
+    Expose this process's metrics over HTTP (for workers, which have no API).
+
+    Args:
+        port: Port to listen on (defaults to settings.worker_metrics_port; 0 disables)
+    """
+    port = settings.worker_metrics_port if port is None else port
+    if not settings.metrics_enabled or not port:
+        return
+
+    try:
+        start_http_server(port)
+        logger.info(f"Serving metrics on port {port}")
+    except OSError as e:
+        logger.warning(f"Could not serve metrics on port {port}: {e}")
@@ -0,0 +1,56 @@
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+
+@dataclass
+class ModelRoute:
+    """Model and call parameters used for an agent"""
+
+    model: str
+    max_tokens: Optional[int] = None  # caps the max_tokens requested by the pipeline
+    timeout_seconds: Optional[float] = None
+    escalate_to: Optional[str] = None  # stronger model to retry with on unusable output
+
+
+class ModelRouter:
+    """
+    Per-agent model routing table.
+
+    Agents without an entry use the default model. Structured-output
+    agents can be served by a cheaper, faster model with `escalate_to`
+    naming the model to retry with when its output fails JSON parsing or
+    validation, so quality gates still get a usable answer.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, Dict[str, Any]] = None,
+        default_model: str = None
+    ):
+        self.default_model = default_model or settings.llm_default_model
+        routes = settings.agent_model_routes if routes is None else routes
+
+        known = {f.name for f in fields(ModelRoute)}
+        self.routes: Dict[str, ModelRoute] = {}
+        for agent, route in routes.items():
+            unknown = set(route) - known
+            if unknown:
+                raise ValueError(f"Unknown model route option(s) for {agent}: {sorted(unknown)}")
+            self.routes[agent] = ModelRoute(**{"model": self.default_model, **route})
+
+    def route(self, agent: Optional[str]) -> ModelRoute:
+        """
+        Get the route of an agent.
+
+        Args:
+            agent: Agent name (e.g. "consistency-validator")
+
+        Returns:
+            The agent's route, or the default model's
+        """
+        return self.routes.get(agent) or ModelRoute(model=self.default_model)
+
+
+model_router = ModelRouter()
@@ -0,0 +1,263 @@
+import difflib
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from app.models.story_request import StoryRequest
+from app.services.draft_patch import split_paragraphs
+
+# Marks issues found locally rather than by the Consistency Validator
+SOURCE = "prevalidator"
+
+WORD_COUNT_TOLERANCE = 0.10  # the Writer is asked for the target ±10%
+WORD_COUNT_HARD_TOLERANCE = 0.50  # beyond this the draft is truncated or runaway
+
+# Minimum words before a text is judged for its language
+LANGUAGE_MIN_WORDS = 40
+
+PORTUGUESE_STOPWORDS = {
+    "de", "que", "não", "um", "uma", "para", "com", "os", "as", "do", "da",
+    "dos", "das", "em", "no", "na", "nos", "nas", "ao", "pelo", "pela", "mas",
+    "como", "mais", "ele", "ela", "eles", "elas", "seu", "sua", "foi", "era",
+    "está", "estava", "você", "também", "quando", "muito", "já", "então"
+}
+ENGLISH_STOPWORDS = {
+    "the", "and", "of", "to", "in", "is", "was", "that", "it", "with", "for",
+    "his", "her", "he", "she", "they", "on", "at", "but", "not", "had", "have",
+    "were", "be", "this", "from", "by", "you", "which", "what", "when", "there"
+}
+
+# Honorifics that are not enough on their own to identify a character
+NAME_TITLES = {"dona", "dom", "seu", "sr", "sra", "dr", "dra", "senhor", "senhora", "padre", "irmã"}
+
+
+@dataclass
+class PrevalidationResult:
+    """Findings of the local pre-validators for a draft"""
+
+    issues: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def hard_failure(self) -> bool:
+        """Whether a finding makes LLM validation of this draft pointless"""
+        return any(issue["severity"] == "critical" for issue in self.issues)
+
+
+def _issue(
+    issue_type: str,
+    severity: str,
+    location: str,
+    description: str,
+    suggestion: str,
+    paragraphs: List[int] = None,
+    evidence: str = None
+) -> Dict[str, Any]:
+    """Build an issue in the Consistency Validator's report format"""
+    issue = {
+        "type": issue_type,
+        "severity": severity,
+        "location": location,
+        "description": description,
+        "suggestion": suggestion,
+        "source": SOURCE
+    }
+    if paragraphs:
+        issue["paragraphs"] = [f"P{i}" for i in paragraphs]
+    if evidence:
+        issue["evidence"] = evidence
+    return issue
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents, for lenient name matching"""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in normalized if not unicodedata.combining(c))
+
+
+def check_word_count(draft: str, paragraphs: List[str], request: StoryRequest, characters: Dict) -> List[Dict]:
+    """Draft length against word_count_target ±10%"""
+    word_count = len(draft.split())
+    target = request.word_count_target
+    deviation = (word_count - target) / target
+
+    if abs(deviation) <= WORD_COUNT_TOLERANCE:
+        return []
+
+    severity = "critical" if abs(deviation) > WORD_COUNT_HARD_TOLERANCE else "high"
+    direction = "short of" if deviation < 0 else "over"
+
+    return [_issue(
+        "word_count",
+        severity,
+        "Whole draft",
+        f"Draft has {word_count} words, {abs(deviation):.0%} {direction} the {target}-word target (±10%)",
+        "Expand underdeveloped scenes" if deviation < 0 else "Tighten or cut redundant passages"
+    )]
+
+
+def _character_names(characters: Any) -> List[str]:
+    """Collect every "name" value in the Character Designer output"""
+    names = []
+    if isinstance(characters, dict):
+        for key, value in characters.items():
+            if key == "name" and isinstance(value, str) and value.strip():
+                names.append(value.strip())
+            else:
+                names.extend(_character_names(value))
+    elif isinstance(characters, list):
+        for item in characters:
+            names.extend(_character_names(item))
+    return names
+
+
+def check_character_names(draft: str, paragraphs: List[str], request: StoryRequest, characters: Dict) -> List[Dict]:
+    """Characters that never appear in the draft, or appear misspelled"""
+    issues = []
+    folded_words = set(_fold(w) for w in re.findall(r"\w+", draft))
+    capitalized = sorted(set(re.findall(r"\b[A-ZÀ-Ý][\wÀ-ÿ]{2,}", draft)))
+
+    for name in dict.fromkeys(_character_names(characters)):
+        tokens = [t for t in re.findall(r"\w+", name) if len(t) > 2 and _fold(t) not in NAME_TITLES]
+        if not tokens or any(_fold(t) in folded_words for t in tokens):
+            continue
+
+        close = difflib.get_close_matches(tokens[0], capitalized, n=1, cutoff=0.8)
+        if close:
+            issues.append(_issue(
+                "character_name",
+                "medium",
+                "Whole draft",
+                f"Character \"{name}\" appears to be misspelled as \"{close[0]}\"",
+                f"Use the name \"{name}\" consistently",
+                evidence=close[0]
+            ))
+        else:
+            issues.append(_issue(
+                "character_name",
+                "medium",
+                "Whole draft",
+                f"Character \"{name}\" from the character profiles never appears in the draft",
+                f"Introduce \"{name}\" or make sure the character is named"
+            ))
+
+    return issues
+
+
+def _looks_english(words: List[str]) -> bool:
+    portuguese = sum(1 for w in words if w in PORTUGUESE_STOPWORDS)
+    english = sum(1 for w in words if w in ENGLISH_STOPWORDS)
+    return english > portuguese
+
+
+def check_language(draft: str, paragraphs: List[str], request: StoryRequest, characters: Dict) -> List[Dict]:
+    """Draft (or paragraphs of it) not written in Portuguese"""
+    words = _words(draft)
+    if len(words) >= LANGUAGE_MIN_WORDS and _looks_english(words):
+        return [_issue(
+            "language",
+            "critical",
+            "Whole draft",
+            "Draft does not appear to be written in Brazilian Portuguese",
+            "Rewrite the story in Brazilian Portuguese (pt-BR)"
+        )]
+
+    english = [
+        index for index, paragraph in enumerate(paragraphs, start=1)
+        if len(_words(paragraph)) >= LANGUAGE_MIN_WORDS // 2 and _looks_english(_words(paragraph))
+    ]
+    if not english:
+        return []
+
+    return [_issue(
+        "language",
+        "high",
+        ", ".join(f"P{i}" for i in english),
+        f"{len(english)} paragraph(s) do not appear to be written in Brazilian Portuguese",
+        "Translate these paragraphs to Brazilian Portuguese (pt-BR)",
+        paragraphs=english
+    )]
+
+
+def check_markdown(draft: str, paragraphs: List[str], request: StoryRequest, characters: Dict) -> List[Dict]:
+    """Title heading, code fences and leftover editing markers"""
+    issues = []
+
+    if not paragraphs:
+        return [_issue(
+            "markdown",
+            "critical",
+            "Whole draft",
+            "Draft is empty",
+            "Write the story"
+        )]
+
+    if not paragraphs[0].startswith("# "):
+        issues.append(_issue(
+            "markdown",
+            "medium",
+            "P1",
+            "Draft does not start with the story title as a level-1 heading",
+            "Start the draft with \"# <title>\"",
+            paragraphs=[1]
+        ))
+
+    if draft.count("```") % 2:
+        issues.append(_issue(
+            "markdown",
+            "high",
+            "Whole draft",
+            "Draft has an unclosed code fence (```)",
+            "Remove the stray fence; the story should not contain code blocks"
+        ))
+
+    markers = [i for i, p in enumerate(paragraphs, start=1) if re.search(r"\[P\d+\]", p)]
+    if markers:
+        issues.append(_issue(
+            "markdown",
+            "high",
+            ", ".join(f"P{i}" for i in markers),
+            "Draft contains leftover paragraph ids ([P#]) from editing",
+            "Remove the [P#] markers from the text",
+            paragraphs=markers
+        ))
+
+    return issues
+
+
+RULES: List[Callable[[str, List[str], StoryRequest, Dict], List[Dict]]] = [
+    check_word_count,
+    check_character_names,
+    check_language,
+    check_markdown
+]
+
+
+def run_prevalidators(draft: str, request: StoryRequest, characters: Dict) -> PrevalidationResult:
+    """
+    Run the local deterministic checks on a draft.
+
+    These run in-process before the LLM validators. Critical findings
+    (wrong language, empty or badly truncated draft) mean the LLM
+    validation would be wasted, so the draft goes straight back to the
+    editor; other findings are added to the validation report.
+
+    Args:
+        draft: Draft in Markdown
+        request: Story parameters
+        characters: Character Designer output
+
+    Returns:
+        PrevalidationResult with the issues found
+    """
+    paragraphs = split_paragraphs(draft)
+    result = PrevalidationResult()
+
+    for rule in RULES:
+        result.issues.extend(rule(draft, paragraphs, request, characters))
+
+    return result
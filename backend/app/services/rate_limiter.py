@@ -0,0 +1,416 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.config import settings
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Admission priorities (lower is more urgent). Calls that finish sessions
+# already in progress go first, so a burst of new sessions cannot stall
+# the validation loops of older ones.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+AGENT_PRIORITIES: Dict[str, int] = {
+    "plot-architect": PRIORITY_LOW,
+    "character-designer": PRIORITY_LOW,
+    "style-master": PRIORITY_LOW,
+    "writer": PRIORITY_NORMAL,
+    "consistency-validator": PRIORITY_HIGH,
+    "literary-critic": PRIORITY_HIGH,
+    "editor": PRIORITY_HIGH
+}
+
+# Rough characters per token, used to reserve capacity before the call
+CHARS_PER_TOKEN = 4
+
+# Longest pause between two admission attempts of a waiting call
+MAX_POLL_SECONDS = 1.0
+
+# Token buckets refilled continuously at limit/minute, plus a sorted set of
+# in-flight leases scored by expiry. Admits a call only if every limit has
+# room for it; a call of priority p must leave p * headroom of each limit
+# free, which keeps capacity available for more urgent calls.
+# Times come from the Redis server so that every worker shares one clock.
+# KEYS: requests bucket, tokens bucket, in-flight leases
+# ARGV: RPM, TPM, max in flight, tokens, headroom share, lease id, lease TTL (ms)
+# Returns: {1, 0} when admitted, {0, ms to wait} otherwise
+_ACQUIRE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local headroom = tonumber(ARGV[5])
+
+local function bucket(key, capacity, need)
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    level = math.min(capacity, level + (now - ts) * capacity / 60000)
+    local floor = math.min(headroom * capacity, capacity - need)
+    local missing = need + floor - level
+    if missing <= 0 then
+        return level, 0
+    end
+    return level, math.ceil(missing * 60000 / capacity)
+end
+
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local max_in_flight = tonumber(ARGV[3])
+local tokens = math.min(tonumber(ARGV[4]), tpm > 0 and tpm or tonumber(ARGV[4]))
+local wait = 0
+
+local requests_level, tokens_level
+if rpm > 0 then
+    local w
+    requests_level, w = bucket(KEYS[1], rpm, 1)
+    wait = math.max(wait, w)
+end
+if tpm > 0 then
+    local w
+    tokens_level, w = bucket(KEYS[2], tpm, tokens)
+    wait = math.max(wait, w)
+end
+if max_in_flight > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+    local slots = max_in_flight - math.floor(headroom * max_in_flight)
+    if redis.call('ZCARD', KEYS[3]) >= math.max(slots, 1) then
+        wait = math.max(wait, 50)
+    end
+end
+if wait > 0 then
+    return {0, wait}
+end
+
+if rpm > 0 then
+    redis.call('HSET', KEYS[1], 'level', requests_level - 1, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], 120000)
+end
+if tpm > 0 then
+    redis.call('HSET', KEYS[2], 'level', tokens_level - tokens, 'ts', now)
+    redis.call('PEXPIRE', KEYS[2], 120000)
+end
+if max_in_flight > 0 then
+    redis.call('ZADD', KEYS[3], now + tonumber(ARGV[7]), ARGV[6])
+    redis.call('PEXPIRE', KEYS[3], ARGV[7])
+end
+return {1, 0}
+"""
+
+# Return unused reserved tokens to the bucket, or charge the overrun when
+# the call used more than it reserved (the level may go negative).
+# KEYS: tokens bucket
+# ARGV: TPM, tokens to add (negative to charge)
+_SETTLE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local capacity = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'level', 'ts')
+local level = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+level = math.min(capacity, level + (now - ts) * capacity / 60000)
+level = math.max(-capacity, math.min(capacity, level + tonumber(ARGV[2])))
+redis.call('HSET', KEYS[1], 'level', level, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+return 1
+"""
+
+
+# Extend the lease of a call still in flight. A lease that already expired
+# is not brought back: its slot may have been given to another call.
+# KEYS: in-flight leases
+# ARGV: lease id, lease TTL (ms)
+_RENEW_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local renewed = redis.call('ZADD', KEYS[1], 'XX', 'CH', now + tonumber(ARGV[2]), ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return renewed
+"""
+
+
+class RateLimitTimeout(Exception):
+    """Raised when an LLM call waited too long for rate limit capacity"""
+
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """Estimate the number of tokens in prompt texts"""
+    return sum(len(text) for text in texts if text) // CHARS_PER_TOKEN
+
+
+def usage_tokens(usage: Dict[str, int]) -> int:
+    """Tokens of a response that count against the TPM limit (cache reads do not)"""
+    return sum(
+        usage.get(key, 0) or 0
+        for key in ("input_tokens", "output_tokens", "cache_creation_input_tokens")
+    )
+
+
+@dataclass
+class Reservation:
+    """Capacity held by one admitted LLM call"""
+
+    tokens: int
+    lease_id: Optional[str] = None
+    used_tokens: Optional[int] = None
+    waited_seconds: float = 0.0
+
+    def record(self, usage: Dict[str, int]) -> None:
+        """Record the actual usage of the call, settled when the call ends"""
+        self.used_tokens = usage_tokens(usage)
+
+
+class RateLimiter:
+    """
+    Global rate limiter and concurrency governor for LLM calls.
+
+    Requests per minute, tokens per minute and calls in flight are limited
+    across every API process and worker through Redis. Each call reserves
+    its prompt estimate plus max_tokens before it is sent; the reservation
+    is settled against the actual usage when it ends.
+
+    Calls that cannot be admitted wait instead of failing. Within a
+    process, waiters are served by priority (then arrival), and only the
+    head of the queue polls Redis. If Redis is unavailable, calls are
+    admitted rather than blocked.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = None,
+        tokens_per_minute: int = None,
+        max_in_flight: int = None,
+        priority_headroom: float = None,
+        max_wait_seconds: float = None,
+        prefix: str = "llm-ratelimit"
+    ):
+        self.requests_per_minute = (
+            requests_per_minute if requests_per_minute is not None else settings.llm_requests_per_minute
+        )
+        self.tokens_per_minute = (
+            tokens_per_minute if tokens_per_minute is not None else settings.llm_tokens_per_minute
+        )
+        self.max_in_flight = max_in_flight if max_in_flight is not None else settings.llm_max_in_flight
+        self.priority_headroom = (
+            priority_headroom if priority_headroom is not None else settings.llm_rate_limit_priority_headroom
+        )
+        self.max_wait_seconds = (
+            max_wait_seconds if max_wait_seconds is not None else settings.llm_rate_limit_max_wait_seconds
+        )
+        self.prefix = prefix
+
+        self._keys = [f"{prefix}:requests", f"{prefix}:tokens", f"{prefix}:in-flight"]
+        self._client: Optional[redis.Redis] = None
+        self._waiting: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._changed = asyncio.Event()
+        self.stats = {"admitted": 0, "waited": 0, "timeouts": 0, "errors": 0}
+
+    @property
+    def waiting(self) -> int:
+        """Calls of this process waiting for capacity"""
+        return len(self._waiting)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.llm_rate_limit_enabled and bool(
+            self.requests_per_minute or self.tokens_per_minute or self.max_in_flight
+        )
+
+    async def get_redis(self) -> redis.Redis:
+        """Get the shared Redis connection"""
+        if self._client is None:
+            self._client = await get_redis()
+            self._acquire = self._client.register_script(_ACQUIRE_SCRIPT)
+            self._settle = self._client.register_script(_SETTLE_SCRIPT)
+            self._renew = self._client.register_script(_RENEW_SCRIPT)
+        return self._client
+
+    async def _try_acquire(self, reservation: Reservation, priority: int, lease_seconds: float) -> float:
+        """Attempt to admit a call; returns 0 when admitted, else seconds to wait"""
+        await self.get_redis()
+        admitted, wait_ms = await self._acquire(
+            keys=self._keys,
+            args=[
+                self.requests_per_minute,
+                self.tokens_per_minute,
+                self.max_in_flight,
+                reservation.tokens,
+                min(priority * self.priority_headroom, 0.9),
+                reservation.lease_id,
+                int(lease_seconds * 1000)
+            ]
+        )
+        return 0.0 if int(admitted) else int(wait_ms) / 1000
+
+    async def _wait_turn(self, ticket: Tuple[int, int], timeout: Optional[float]) -> None:
+        """Wait until the ticket is at the head of the local queue"""
+        while self._waiting[0] != ticket:
+            self._changed.clear()
+            await asyncio.wait_for(self._changed.wait(), timeout)
+
+    def _leave_queue(self, ticket: Tuple[int, int]) -> None:
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._changed.set()
+
+    async def acquire(
+        self,
+        tokens: int,
+        priority: int = PRIORITY_NORMAL,
+        lease_seconds: float = None
+    ) -> Reservation:
+        """
+        Wait until a call can be admitted and reserve its capacity.
+
+        Args:
+            tokens: Tokens to reserve (prompt estimate plus max_tokens)
+            priority: Admission priority (PRIORITY_HIGH, _NORMAL or _LOW)
+            lease_seconds: How long the in-flight slot is held if never
+                released or renewed (e.g. the process dies); defaults to
+                llm_rate_limit_lease_seconds
+
+        Returns:
+            Reservation to release when the call ends
+
+        Raises:
+            RateLimitTimeout: If no capacity freed up within max_wait_seconds
+        """
+        reservation = Reservation(tokens=tokens, lease_id=uuid.uuid4().hex)
+        if not self.enabled:
+            return reservation
+
+        lease_seconds = lease_seconds or settings.llm_rate_limit_lease_seconds
+        started = time.monotonic()
+        deadline = started + self.max_wait_seconds if self.max_wait_seconds else None
+
+        ticket = (priority, next(self._sequence))
+        heapq.heappush(self._waiting, ticket)
+
+        try:
+            while True:
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError
+
+                await self._wait_turn(ticket, remaining)
+
+                try:
+                    wait = await self._try_acquire(reservation, priority, lease_seconds)
+                except redis.RedisError as e:
+                    self.stats["errors"] += 1
+                    logger.warning(f"Rate limiter unavailable, admitting call: {e}")
+                    reservation.lease_id = None
+                    return reservation
+
+                if not wait:
+                    break
+
+                if deadline:
+                    wait = min(wait, max(deadline - time.monotonic(), 0))
+                await asyncio.sleep(min(wait, MAX_POLL_SECONDS))
+
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise RateLimitTimeout(
+                f"No LLM capacity for {tokens} tokens after {time.monotonic() - started:.0f}s"
+            ) from None
+
+        finally:
+            self._leave_queue(ticket)
+
+        reservation.waited_seconds = time.monotonic() - started
+        self.stats["admitted"] += 1
+        if reservation.waited_seconds >= 0.5:
+            self.stats["waited"] += 1
+            logger.info(f"LLM call waited {reservation.waited_seconds:.1f}s for rate limit capacity")
+
+        return reservation
+
+    async def release(self, reservation: Reservation) -> None:
+        """
+        Free the call's in-flight slot and settle its token reservation.
+
+        Unused reserved tokens are returned when the actual usage was
+        recorded; otherwise (the call failed) the reservation is kept.
+        """
+        if not self.enabled or reservation.lease_id is None:
+            return
+
+        try:
+            client = await self.get_redis()
+            if self.max_in_flight:
+                await client.zrem(self._keys[2], reservation.lease_id)
+            if self.tokens_per_minute and reservation.used_tokens is not None:
+                refund = min(reservation.tokens, self.tokens_per_minute) - reservation.used_tokens
+                if refund:
+                    await self._settle(keys=[self._keys[1]], args=[self.tokens_per_minute, refund])
+        except redis.RedisError as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to release rate limit reservation: {e}")
+
+    async def keep_lease(self, reservation: Reservation, lease_seconds: float = None) -> None:
+        """
+        Renew the call's in-flight lease until cancelled.
+
+        The lease is renewed three times per lease period, so that it only
+        runs out once the process holding it has stopped.
+        """
+        if not self.enabled or not self.max_in_flight or reservation.lease_id is None:
+            return
+
+        lease_seconds = lease_seconds or settings.llm_rate_limit_lease_seconds
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            try:
+                await self.get_redis()
+                renewed = await self._renew(
+                    keys=[self._keys[2]],
+                    args=[reservation.lease_id, int(lease_seconds * 1000)]
+                )
+                if not int(renewed):
+                    logger.warning(f"Rate limit lease {reservation.lease_id} expired before renewal")
+                    return
+            except redis.RedisError as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Failed to renew rate limit lease: {e}")
+
+    @asynccontextmanager
+    async def limit(
+        self,
+        tokens: int,
+        priority: int = PRIORITY_NORMAL,
+        lease_seconds: float = None
+    ) -> AsyncIterator[Reservation]:
+        """
+        Hold rate limit capacity for the duration of an LLM call.
+
+        Args:
+            tokens: Tokens to reserve (prompt estimate plus max_tokens)
+            priority: Admission priority
+            lease_seconds: In-flight slot expiry if the process stops
+                renewing it
+
+        Yields:
+            Reservation; call record() with the response usage
+        """
+        reservation = await self.acquire(tokens, priority, lease_seconds)
+        renewal = asyncio.create_task(self.keep_lease(reservation, lease_seconds))
+        try:
+            yield reservation
+        finally:
+            renewal.cancel()
+            await self.release(reservation)
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,297 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+from anthropic import APIConnectionError, APIStatusError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Upstream statuses worth retrying: timeouts, lock conflicts, rate limits,
+# server errors and 529 (overloaded)
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an LLM call error is transient (worth retrying)"""
+    if isinstance(error, APIStatusError):
+        if error.status_code in RETRYABLE_STATUS_CODES:
+            return True
+        # Errors sent mid-stream arrive on a 200 response
+        body = error.body if isinstance(error.body, dict) else {}
+        return (body.get("error") or {}).get("type") in ("overloaded_error", "api_error")
+
+    return isinstance(error, (APIConnectionError, httpx.TransportError, asyncio.TimeoutError))
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay requested by the server (retry-after-ms / retry-after headers), if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    The n-th retry waits a random time up to base * 2^n (capped at
+    max_delay). A retry-after sent by the server takes precedence, up to
+    max_retry_after, so rate-limited calls come back when capacity does.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = None,
+        base_delay: float = None,
+        max_delay: float = None,
+        max_retry_after: float = None
+    ):
+        self.max_attempts = max_attempts or settings.llm_max_attempts
+        self.base_delay = base_delay if base_delay is not None else settings.llm_retry_base_delay_seconds
+        self.max_delay = max_delay if max_delay is not None else settings.llm_retry_max_delay_seconds
+        self.max_retry_after = (
+            max_retry_after if max_retry_after is not None else settings.llm_retry_after_max_seconds
+        )
+
+    def delay(self, retry: int, error: BaseException) -> float:
+        """
+        Seconds to wait before a retry.
+
+        Args:
+            retry: Retry number (0 for the first retry)
+            error: Error of the failed attempt
+        """
+        requested = retry_after_seconds(error)
+        if requested is not None:
+            return min(requested, self.max_retry_after) + random.uniform(0, self.base_delay)
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of the LLM upstream from the outcome of recent calls.
+
+    The breaker opens when at least `failure_ratio` of the last `window`
+    calls (and at least `min_calls`) failed with transient errors. While
+    it is open, new sessions wait before starting instead of piling more
+    load on a degraded upstream; sessions already running keep retrying.
+    After `cooldown_seconds` it turns half-open and lets sessions through;
+    the next call outcome closes or reopens it.
+
+    State is per process: every worker observes the upstream on its own.
+    """
+
+    def __init__(
+        self,
+        window: int = None,
+        min_calls: int = None,
+        failure_ratio: float = None,
+        cooldown_seconds: float = None
+    ):
+        self.window = window or settings.llm_circuit_window
+        self.min_calls = min_calls or settings.llm_circuit_min_calls
+        self.failure_ratio = failure_ratio or settings.llm_circuit_failure_ratio
+        self.cooldown_seconds = (
+            cooldown_seconds if cooldown_seconds is not None else settings.llm_circuit_cooldown_seconds
+        )
+
+        self._outcomes: Deque[bool] = deque(maxlen=self.window)
+        self._opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open"""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown_seconds:
+            return "open"
+        return "half_open"
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("LLM circuit breaker closed")
+            self._opened_at = None
+            self._outcomes.clear()
+        self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        if self.state == "half_open":
+            self._open()
+            return
+
+        self._outcomes.append(False)
+        failures = self._outcomes.count(False)
+        if (
+            self._opened_at is None
+            and len(self._outcomes) >= self.min_calls
+            and failures / len(self._outcomes) >= self.failure_ratio
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        logger.warning(
+            f"LLM circuit breaker open: {self._outcomes.count(False)}/{len(self._outcomes)} "
+            f"recent calls failed, pausing new sessions for {self.cooldown_seconds:.0f}s"
+        )
+
+    async def wait_until_closed(self) -> float:
+        """
+        Wait while the breaker is open.
+
+        Returns:
+            Seconds waited
+        """
+        started = time.monotonic()
+        while self.state == "open":
+            await asyncio.sleep(max(self._opened_at + self.cooldown_seconds - time.monotonic(), 0.1))
+        return time.monotonic() - started
+
+
+class LatencyTracker:
+    """Recent call latencies per key, for hedging delays"""
+
+    def __init__(self, window: int = 100, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, key: str, seconds: float) -> None:
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, key: str, q: float) -> Optional[float]:
+        """Latency quantile for a key, or None without enough samples"""
+        samples = self._samples.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def with_retries(
+    call: Callable[[], Awaitable[T]],
+    description: str,
+    policy: RetryPolicy = None,
+    breaker: CircuitBreaker = None,
+    retryable: Callable[[BaseException], bool] = is_retryable
+) -> T:
+    """
+    Run an LLM call, retrying transient errors.
+
+    Every attempt's outcome is reported to the circuit breaker.
+
+    Args:
+        call: Factory of the call (invoked once per attempt)
+        description: Call name for logs (e.g. the agent)
+        policy: Retry policy (defaults to settings)
+        breaker: Circuit breaker (defaults to the shared one)
+        retryable: Whether an error may be retried
+
+    Returns:
+        Result of the first successful attempt
+
+    Raises:
+        The last error, once attempts are exhausted or it is not retryable
+    """
+    policy = policy or RetryPolicy()
+    breaker = breaker or circuit_breaker
+
+    for attempt in range(policy.max_attempts):
+        try:
+            result = await call()
+        except Exception as e:
+            if is_retryable(e):
+                breaker.record_failure()
+            if attempt + 1 >= policy.max_attempts or not retryable(e):
+                raise
+
+            delay = policy.delay(attempt, e)
+            logger.warning(
+                f"LLM call for {description} failed ({type(e).__name__}: {e}), "
+                f"retry {attempt + 1}/{policy.max_attempts - 1} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+
+async def hedged(
+    call: Callable[[], Awaitable[T]],
+    key: str,
+    tracker: LatencyTracker = None
+) -> T:
+    """
+    Run a call and, if it is slower than usual, race a second copy of it.
+
+    The backup request starts once the first has run longer than the
+    tracked latency quantile for `key` (settings.llm_hedge_quantile, with
+    a floor); whichever finishes first wins and the other is cancelled.
+
+    Args:
+        call: Factory of the call (invoked once per request)
+        key: Latency key (e.g. agent and model)
+        tracker: Latency tracker (defaults to the shared one)
+
+    Returns:
+        Result of the first request to succeed
+    """
+    tracker = tracker or latency_tracker
+    delay = max(
+        tracker.quantile(key, settings.llm_hedge_quantile) or settings.llm_hedge_default_delay_seconds,
+        settings.llm_hedge_min_delay_seconds
+    )
+
+    started = time.monotonic()
+    primary = asyncio.ensure_future(call())
+    tasks = {primary}
+
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            logger.info(f"Hedging LLM call for {key} after {delay:.1f}s")
+            tasks.add(asyncio.ensure_future(call()))
+
+        error: Optional[BaseException] = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    tracker.observe(key, time.monotonic() - started)
+                    return task.result()
+                error = error or task.exception()
+        raise error
+
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+circuit_breaker = CircuitBreaker()
+latency_tracker = LatencyTracker()
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Content-addressed cache for agent responses.
+
+    Entries are keyed by a hash of the agent name, the prompt and the model
+    parameters, so identical requests (e.g. the Style Master for the same
+    author/genre/audience) are served without calling the LLM.
+
+    Lookups go through an in-process LRU first and fall back to Redis,
+    which is shared by every worker. Both levels honour the TTL; the local
+    level is also bounded by entry count and total size.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = None,
+        max_local_entries: int = None,
+        max_local_bytes: int = None,
+        prefix: str = "llm-cache"
+    ):
+        self.ttl_seconds = ttl_seconds or settings.response_cache_ttl_seconds
+        self.max_local_entries = max_local_entries or settings.response_cache_local_max_entries
+        self.max_local_bytes = max_local_bytes or settings.response_cache_local_max_bytes
+        self.prefix = prefix
+
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._local_bytes = 0
+        self.stats = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "errors": 0
+        }
+
+    @staticmethod
+    def make_key(agent: str, prompt: str, **params: Any) -> str:
+        """
+        Build the cache key for an agent call.
+
+        Args:
+            agent: Agent name
+            prompt: Full prompt text
+            **params: Model parameters that affect the output (model, max_tokens, ...)
+
+        Returns:
+            Hex digest identifying the request
+        """
+        payload = json.dumps(
+            {"agent": agent, "prompt": prompt, "params": params},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Cached response text or None
+        """
+        entry = self._local.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._local.move_to_end(key)
+                self.stats["local_hits"] += 1
+                return value
+            self._evict(key)
+
+        try:
+            client = await get_redis()
+            value = await client.get(f"{self.prefix}:{key}")
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            self.stats["errors"] += 1
+            value = None
+
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["redis_hits"] += 1
+        self._store_local(key, value)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        """
+        Store a response in both cache levels.
+
+        Args:
+            key: Cache key from make_key
+            value: Response text
+        """
+        self._store_local(key, value)
+        self.stats["stores"] += 1
+
+        try:
+            client = await get_redis()
+            await client.setex(f"{self.prefix}:{key}", self.ttl_seconds, value)
+        except Exception as e:
+            logger.warning(f"Response cache store failed: {e}")
+            self.stats["errors"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and local cache occupancy"""
+        lookups = self.stats["local_hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        hits = self.stats["local_hits"] + self.stats["redis_hits"]
+
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "local_entries": len(self._local),
+            "local_bytes": self._local_bytes
+        }
+
+    def _store_local(self, key: str, value: str) -> None:
+        """Insert into the local LRU, evicting the oldest entries over the limits"""
+        size = len(value.encode("utf-8"))
+        if size > self.max_local_bytes:
+            return
+
+        if key in self._local:
+            self._evict(key)
+
+        self._local[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._local_bytes += size
+
+        while len(self._local) > self.max_local_entries or self._local_bytes > self.max_local_bytes:
+            oldest = next(iter(self._local))
+            self._evict(oldest)
+            self.stats["evictions"] += 1
+
+    def _evict(self, key: str) -> None:
+        """Remove an entry from the local LRU"""
+        _, value = self._local.pop(key)
+        self._local_bytes -= len(value.encode("utf-8"))
+
+
+response_cache = ResponseCache()
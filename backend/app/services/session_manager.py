@@ -2,29 +2,173 @@ import redis.asyncio as redis
 import json
 from typing import Dict, Any, List, Optional
 import logging
+import time
 from datetime import datetime
 
 from app.config import settings
+from app.services.cost import session_budget
+from app.services.redis_client import get_redis, close_redis
+from app.services.event_bus import event_bus
 
 logger = logging.getLogger(__name__)
 
+# Statuses after which a session no longer changes
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+SESSION_TTL_SECONDS = 60 * 60 * 24  # 24 hours
+
+# Sorted sets of session ids scored by creation time: one for all sessions
+# and one per status (sessions:index:{status})
+SESSION_INDEX_KEY = "sessions:index"
+
+# Fields returned for each session by list_sessions
+SUMMARY_FIELDS = ["session_id", "status", "created_at", "updated_at", "approved"]
+
+# Counters of session:{id}:usage, kept for the session and for each agent
+TOKEN_FIELDS = ["input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens"]
+USAGE_FIELDS = ["calls"] + TOKEN_FIELDS + ["cost_usd"]
+
+# HSET the given fields only if the session hash exists, and refresh its TTL.
+# When the status changes, the session is moved between the per-status indexes.
+# A cancelled session keeps its status: updates that change it are refused,
+# so a run finishing after a cancellation cannot mark it completed or failed.
+# KEYS: session hash
+# ARGV: TTL, index key, session id, new status ('' if unchanged), field/value pairs...
+_UPDATE_FIELDS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+if ARGV[4] ~= '' then
+    local old_status = redis.call('HGET', KEYS[1], 'status')
+    if old_status == '"cancelled"' then
+        return 0
+    end
+    local created_ts = redis.call('HGET', KEYS[1], 'created_ts')
+    if old_status then
+        redis.call('ZREM', ARGV[2] .. ':' .. cjson.decode(old_status), ARGV[3])
+    end
+    if created_ts then
+        redis.call('ZADD', ARGV[2] .. ':' .. ARGV[4], created_ts, ARGV[3])
+    end
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 5))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+# Move an agent between the in-progress/completed lists and bump updated_at.
+# KEYS: session hash, in-progress list, completed list
+# ARGV: agent, status, TTL, encoded updated_at
+_SET_AGENT_STATUS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+if ARGV[2] == 'in_progress' then
+    if not redis.call('LPOS', KEYS[2], ARGV[1]) then
+        redis.call('RPUSH', KEYS[2], ARGV[1])
+    end
+elseif ARGV[2] == 'completed' then
+    redis.call('LREM', KEYS[2], 0, ARGV[1])
+    if not redis.call('LPOS', KEYS[3], ARGV[1]) then
+        redis.call('RPUSH', KEYS[3], ARGV[1])
+    end
+end
+redis.call('HSET', KEYS[1], 'updated_at', ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+return 1
+"""
+
+# Store a draft version and append it to the version list (once).
+# KEYS: session hash, versions list, draft key
+# ARGV: version, draft JSON, TTL, encoded updated_at
+_ADD_DRAFT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('SET', KEYS[3], ARGV[2], 'EX', ARGV[3])
+if not redis.call('LPOS', KEYS[2], ARGV[1]) then
+    redis.call('RPUSH', KEYS[2], ARGV[1])
+end
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('HSET', KEYS[1], 'updated_at', ARGV[4])
+return 1
+"""
+
+
+def _encode_fields(data: Dict[str, Any]) -> Dict[str, str]:
+    """JSON-encode each field value for storage in a Redis hash"""
+    return {key: json.dumps(value) for key, value in data.items()}
+
+
+def _decode_fields(data: Dict[str, str]) -> Dict[str, Any]:
+    """Decode the JSON field values of a Redis hash"""
+    return {key: json.loads(value) for key, value in data.items()}
+
+
+def _decode_usage(data: Dict[str, str]) -> Dict[str, Any]:
+    """Decode a usage hash into session totals and per-agent totals"""
+    usage: Dict[str, Any] = {"total": dict.fromkeys(USAGE_FIELDS, 0), "agents": {}}
+
+    for key, value in data.items():
+        agent, _, field = key.rpartition(":")
+        totals = usage["agents"].setdefault(agent, dict.fromkeys(USAGE_FIELDS, 0)) if agent else usage["total"]
+        totals[field] = float(value) if field == "cost_usd" else int(value)
+
+    return usage
+
 
 class SessionManager:
-    """Manages story generation sessions using Redis"""
+    """
+    Manages story generation sessions using Redis.
+
+    Storage layout:
+    - session:{id}                      hash of small fields, each JSON-encoded
+    - session:{id}:agents_in_progress   list of running agents
+    - session:{id}:agents_completed     list of finished agents
+    - session:{id}:drafts               list of draft versions, in creation order
+    - session:{id}:draft:{v}            JSON of a single draft version
+    - session:{id}:checkpoints          hash of completed pipeline steps
+    - session:{id}:usage                hash of token/cost counters ({field}, {agent}:{field})
+    - sessions:index[:{status}]         sorted sets of ids by creation time
+
+    Status updates only touch the fields that change, and drafts are
+    written once, so pipeline progress never rewrites the draft history.
+    Every mutation is a single atomic server-side operation (Lua script
+    or field-level write), so concurrent agents cannot lose each other's
+    updates.
+    """
 
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
 
     async def get_redis(self) -> redis.Redis:
-        """Get or create Redis connection"""
+        """Get the shared Redis connection"""
         if self.redis_client is None:
-            self.redis_client = await redis.from_url(
-                settings.redis_url,
-                encoding="utf-8",
-                decode_responses=True
-            )
+            self.redis_client = await get_redis()
+            self._update_fields = self.redis_client.register_script(_UPDATE_FIELDS_SCRIPT)
+            self._set_agent_status = self.redis_client.register_script(_SET_AGENT_STATUS_SCRIPT)
+            self._add_draft = self.redis_client.register_script(_ADD_DRAFT_SCRIPT)
         return self.redis_client
 
+    def _key(self, session_id: str) -> str:
+        return f"session:{session_id}"
+
+    def _drafts_key(self, session_id: str) -> str:
+        return f"session:{session_id}:drafts"
+
+    def _draft_key(self, session_id: str, version: int) -> str:
+        return f"session:{session_id}:draft:{version}"
+
+    def _agents_key(self, session_id: str, status: str) -> str:
+        return f"session:{session_id}:agents_{status}"
+
+    def _checkpoints_key(self, session_id: str) -> str:
+        return f"session:{session_id}:checkpoints"
+
+    def _usage_key(self, session_id: str) -> str:
+        return f"session:{session_id}:usage"
+
     async def create_session(self, session_id: str, request_data: Dict[str, Any]) -> None:
         """
         Create a new story generation session.
@@ -35,75 +179,136 @@ class SessionManager:
         """
         client = await self.get_redis()
 
+        created_ts = time.time()
         session_data = {
             "session_id": session_id,
             "status": "initiated",
             "request": request_data,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": datetime.utcfromtimestamp(created_ts).isoformat(),
+            "created_ts": created_ts,
             "updated_at": datetime.utcnow().isoformat(),
             "current_iteration": 0,
             "max_iterations": settings.max_agent_iterations,
-            "agents_completed": [],
-            "agents_in_progress": [],
             "validation_issues": [],
             "critic_scores": {},
-            "drafts": [],
             "final_draft": None,
             "approved": False
         }
 
-        await client.setex(
-            f"session:{session_id}",
-            60 * 60 * 24,  # 24 hours TTL
-            json.dumps(session_data)
-        )
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(session_id), mapping=_encode_fields(session_data))
+            pipe.expire(self._key(session_id), SESSION_TTL_SECONDS)
+            pipe.zadd(SESSION_INDEX_KEY, {session_id: created_ts})
+            pipe.zadd(f"{SESSION_INDEX_KEY}:initiated", {session_id: created_ts})
+            await pipe.execute()
 
         logger.info(f"Created session {session_id}")
 
-    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+    async def get_session(
+        self,
+        session_id: str,
+        include_drafts: bool = True
+    ) -> Optional[Dict[str, Any]]:
         """
         Get session data.
 
         Args:
             session_id: Session identifier
+            include_drafts: Also load every draft version
 
         Returns:
             Session data or None if not found
         """
         client = await self.get_redis()
-        data = await client.get(f"session:{session_id}")
 
-        if data:
-            return json.loads(data)
-        return None
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._key(session_id))
+            pipe.lrange(self._agents_key(session_id, "in_progress"), 0, -1)
+            pipe.lrange(self._agents_key(session_id, "completed"), 0, -1)
+            pipe.lrange(self._drafts_key(session_id), 0, -1)
+            pipe.hgetall(self._usage_key(session_id))
+            data, in_progress, completed, versions, usage = await pipe.execute()
+
+        if not data:
+            return None
+
+        session = _decode_fields(data)
+        session["agents_in_progress"] = in_progress
+        session["agents_completed"] = completed
+        session["usage"] = _decode_usage(usage)
+        session["usage"]["budget_usd"] = session_budget((session.get("request") or {}).get("max_cost_usd"))
+
+        if include_drafts:
+            session["drafts"] = await self._load_drafts(session_id, versions)
+
+        return session
+
+    async def get_session_fields(
+        self,
+        session_id: str,
+        *fields: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get selected session fields without loading the rest of the session.
+
+        Args:
+            session_id: Session identifier
+            *fields: Field names
+
+        Returns:
+            Mapping of field to value (None for missing fields),
+            or None if the session does not exist
+        """
+        client = await self.get_redis()
+
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.exists(self._key(session_id))
+            pipe.hmget(self._key(session_id), list(fields))
+            exists, values = await pipe.execute()
+
+        if not exists:
+            return None
+
+        return {
+            field: json.loads(value) if value is not None else None
+            for field, value in zip(fields, values)
+        }
 
     async def update_session(
         self,
         session_id: str,
         updates: Dict[str, Any]
-    ) -> None:
+    ) -> bool:
         """
         Update session data.
 
+        Only the given fields are written; the session is left untouched
+        if it does not exist (e.g. expired), or if the update changes the
+        status of a cancelled session.
+
         Args:
             session_id: Session identifier
             updates: Fields to update
+
+        Returns:
+            True if the session was updated
         """
-        client = await self.get_redis()
-        session = await self.get_session(session_id)
+        await self.get_redis()
 
-        if session:
-            session.update(updates)
-            session["updated_at"] = datetime.utcnow().isoformat()
+        fields = {**updates, "updated_at": datetime.utcnow().isoformat()}
+        fields.pop("drafts", None)  # drafts live in their own keys
 
-            await client.setex(
-                f"session:{session_id}",
-                60 * 60 * 24,
-                json.dumps(session)
-            )
+        args = [SESSION_TTL_SECONDS, SESSION_INDEX_KEY, session_id, fields.get("status") or ""]
+        for field, value in _encode_fields(fields).items():
+            args.extend([field, value])
 
+        updated = await self._update_fields(keys=[self._key(session_id)], args=args)
+
+        if updated:
             logger.debug(f"Updated session {session_id}")
 
+        return bool(updated)
+
     async def add_draft(
         self,
         session_id: str,
@@ -120,19 +325,25 @@ class SessionManager:
             version: Draft version number
             metadata: Additional metadata
         """
-        session = await self.get_session(session_id)
+        await self.get_redis()
 
-        if session:
-            draft = {
-                "version": version,
-                "content": draft_content,
-                "created_at": datetime.utcnow().isoformat(),
-                "metadata": metadata or {}
-            }
+        draft = {
+            "version": version,
+            "content": draft_content,
+            "created_at": datetime.utcnow().isoformat(),
+            "metadata": metadata or {}
+        }
 
-            session["drafts"].append(draft)
-            await self.update_session(session_id, {"drafts": session["drafts"]})
+        added = await self._add_draft(
+            keys=[
+                self._key(session_id),
+                self._drafts_key(session_id),
+                self._draft_key(session_id, version)
+            ],
+            args=[version, json.dumps(draft), SESSION_TTL_SECONDS, json.dumps(draft["created_at"])]
+        )
 
+        if added:
             logger.info(f"Added draft v{version} to session {session_id}")
 
     async def get_draft(self, session_id: str, version: int = None) -> Optional[Dict[str, Any]]:
@@ -146,19 +357,112 @@ class SessionManager:
         Returns:
             Draft data or None
         """
-        session = await self.get_session(session_id)
-
-        if not session or not session.get("drafts"):
-            return None
+        client = await self.get_redis()
 
         if version is None:
-            return session["drafts"][-1]
+            version = await client.lindex(self._drafts_key(session_id), -1)
+            if version is None:
+                return None
+
+        data = await client.get(self._draft_key(session_id, version))
+
+        return json.loads(data) if data else None
+
+    async def _load_drafts(self, session_id: str, versions: List[str]) -> List[Dict[str, Any]]:
+        """Load the given draft versions of a session, in order"""
+        if not versions:
+            return []
+
+        client = await self.get_redis()
+        data = await client.mget([self._draft_key(session_id, v) for v in versions])
+
+        return [json.loads(d) for d in data if d]
 
-        for draft in session["drafts"]:
-            if draft["version"] == version:
-                return draft
+    async def save_checkpoint(self, session_id: str, step: str, value: Any) -> None:
+        """
+        Persist the output of a completed pipeline step.
 
-        return None
+        Args:
+            session_id: Session identifier
+            step: Step name (e.g. "plot_structure", "validation:2")
+            value: JSON-serializable step output
+        """
+        client = await self.get_redis()
+
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._checkpoints_key(session_id), step, json.dumps(value))
+            pipe.expire(self._checkpoints_key(session_id), SESSION_TTL_SECONDS)
+            await pipe.execute()
+
+        logger.debug(f"Saved checkpoint {step} for session {session_id}")
+
+    async def get_checkpoints(self, session_id: str) -> Dict[str, Any]:
+        """
+        Get every checkpoint saved for a session.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Mapping of step name to its saved output
+        """
+        client = await self.get_redis()
+        data = await client.hgetall(self._checkpoints_key(session_id))
+
+        return _decode_fields(data)
+
+    async def record_usage(
+        self,
+        session_id: str,
+        agent: str,
+        usage: Dict[str, int],
+        cost_usd: float
+    ) -> Dict[str, float]:
+        """
+        Add the token usage and cost of an agent call to the session's totals.
+
+        Args:
+            session_id: Session identifier
+            agent: Name of the agent
+            usage: Token counts of the call
+            cost_usd: Cost of the call
+
+        Returns:
+            Session totals after the call: "tokens" (all kinds) and "cost_usd"
+        """
+        client = await self.get_redis()
+        key = self._usage_key(session_id)
+
+        async with client.pipeline(transaction=True) as pipe:
+            for field in TOKEN_FIELDS:
+                pipe.hincrby(key, field, usage.get(field, 0) or 0)
+                pipe.hincrby(key, f"{agent}:{field}", usage.get(field, 0) or 0)
+            pipe.hincrby(key, "calls", 1)
+            pipe.hincrby(key, f"{agent}:calls", 1)
+            pipe.hincrbyfloat(key, "cost_usd", cost_usd)
+            pipe.hincrbyfloat(key, f"{agent}:cost_usd", cost_usd)
+            pipe.expire(key, SESSION_TTL_SECONDS)
+            results = await pipe.execute()
+
+        return {
+            "tokens": sum(results[0:2 * len(TOKEN_FIELDS):2]),
+            "cost_usd": float(results[-3])
+        }
+
+    async def get_usage(self, session_id: str) -> Dict[str, Any]:
+        """
+        Get the token usage and cost of a session.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            "total" and per-agent ("agents") counters
+        """
+        client = await self.get_redis()
+        data = await client.hgetall(self._usage_key(session_id))
+
+        return _decode_usage(data)
 
     async def set_agent_status(
         self,
@@ -174,25 +478,16 @@ class SessionManager:
             agent_name: Name of the agent
             status: Status (in_progress, completed, failed)
         """
-        session = await self.get_session(session_id)
-
-        if session:
-            agents_in_progress = session.get("agents_in_progress", [])
-            agents_completed = session.get("agents_completed", [])
-
-            if status == "in_progress":
-                if agent_name not in agents_in_progress:
-                    agents_in_progress.append(agent_name)
-            elif status == "completed":
-                if agent_name in agents_in_progress:
-                    agents_in_progress.remove(agent_name)
-                if agent_name not in agents_completed:
-                    agents_completed.append(agent_name)
-
-            await self.update_session(session_id, {
-                "agents_in_progress": agents_in_progress,
-                "agents_completed": agents_completed
-            })
+        await self.get_redis()
+
+        await self._set_agent_status(
+            keys=[
+                self._key(session_id),
+                self._agents_key(session_id, "in_progress"),
+                self._agents_key(session_id, "completed")
+            ],
+            args=[agent_name, status, SESSION_TTL_SECONDS, json.dumps(datetime.utcnow().isoformat())]
+        )
 
     async def cancel_session(self, session_id: str) -> None:
         """
@@ -205,6 +500,7 @@ class SessionManager:
             "status": "cancelled",
             "cancelled_at": datetime.utcnow().isoformat()
         })
+        await self._notify_status(session_id, "cancelled")
 
         logger.info(f"Cancelled session {session_id}")
 
@@ -224,13 +520,18 @@ class SessionManager:
             approved: Whether story was approved by all validators
             metadata: Additional metadata
         """
-        await self.update_session(session_id, {
+        updated = await self.update_session(session_id, {
             "status": "completed",
             "final_draft": final_draft,
             "approved": approved,
             "completed_at": datetime.utcnow().isoformat(),
             "metadata": metadata or {}
         })
+        if not updated:
+            logger.info(f"Not completing session {session_id}: cancelled or expired")
+            return
+
+        await self._notify_status(session_id, "completed")
 
         logger.info(f"Completed session {session_id} (approved={approved})")
 
@@ -246,55 +547,116 @@ class SessionManager:
             session_id: Session identifier
             error: Error message
         """
-        await self.update_session(session_id, {
+        updated = await self.update_session(session_id, {
             "status": "failed",
             "error": error,
             "failed_at": datetime.utcnow().isoformat()
         })
+        if not updated:
+            logger.info(f"Not failing session {session_id}: cancelled or expired")
+            return
+
+        await self._notify_status(session_id, "failed")
 
         logger.error(f"Failed session {session_id}: {error}")
 
+    async def _notify_status(self, session_id: str, status: str) -> None:
+        """
+        Push a status change to the session's event bus channel.
+
+        Websocket handlers wait on this event instead of polling Redis
+        for the session state.
+
+        Args:
+            session_id: Session identifier
+            status: New session status
+        """
+        try:
+            await event_bus.publish(session_id, {
+                "type": "session_status",
+                "status": status,
+                "session_id": session_id
+            })
+        except Exception as e:
+            logger.warning(f"Failed to publish status for session {session_id}: {e}")
+
     async def list_sessions(
         self,
         limit: int = 10,
-        offset: int = 0
-    ) -> List[Dict[str, Any]]:
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        List recent sessions.
+        List recent sessions, newest first.
+
+        Pages are read from the creation-time sorted-set index, so each
+        page costs O(log N + limit) regardless of the number of sessions.
 
         Args:
             limit: Maximum number of sessions
-            offset: Number to skip
+            offset: Number to skip (ignored when a cursor is given)
+            cursor: next_cursor returned by the previous page
+            status: Only list sessions with this status
 
         Returns:
-            List of session summaries
+            Dict with the session summaries and the cursor of the next
+            page (None on the last page)
         """
         client = await self.get_redis()
+        index_key = f"{SESSION_INDEX_KEY}:{status}" if status else SESSION_INDEX_KEY
+
+        start = offset
+        entries = None
+        if cursor:
+            cursor_score, _, cursor_id = cursor.partition(":")
+            rank = await client.zrevrank(index_key, cursor_id)
+            if rank is not None:
+                start = rank + 1
+            else:
+                # The cursor session left the index: resume strictly after its score
+                entries = await client.zrevrangebyscore(
+                    index_key, f"({cursor_score}", "-inf",
+                    start=0, num=limit + 1, withscores=True
+                )
+
+        if entries is None:
+            entries = await client.zrevrange(index_key, start, start + limit, withscores=True)
+
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        async with client.pipeline(transaction=False) as pipe:
+            for session_id, _ in entries:
+                pipe.hmget(self._key(session_id), SUMMARY_FIELDS)
+            rows = await pipe.execute()
 
-        # Get all session keys
-        keys = []
-        async for key in client.scan_iter("session:*"):
-            keys.append(key)
-
-        # Sort by creation time (newest first)
         sessions = []
-        for key in keys:
-            data = await client.get(key)
-            if data:
-                session = json.loads(data)
-                sessions.append({
-                    "session_id": session["session_id"],
-                    "status": session["status"],
-                    "created_at": session["created_at"],
-                    "updated_at": session["updated_at"],
-                    "approved": session.get("approved", False)
-                })
-
-        sessions.sort(key=lambda x: x["created_at"], reverse=True)
-
-        return sessions[offset:offset + limit]
+        expired = []
+        for (session_id, _), row in zip(entries, rows):
+            if row[0] is None:
+                expired.append(session_id)
+                continue
+            summary = {
+                field: json.loads(value) if value is not None else None
+                for field, value in zip(SUMMARY_FIELDS, row)
+            }
+            summary["approved"] = summary["approved"] or False
+            sessions.append(summary)
+
+        # Sessions expire by TTL; drop their stale index entries lazily
+        if expired:
+            await client.zrem(index_key, *expired)
+
+        next_cursor = None
+        if has_more and entries:
+            last_id, last_score = entries[-1]
+            next_cursor = f"{last_score!r}:{last_id}"
+
+        return {"sessions": sessions, "next_cursor": next_cursor}
 
     async def close(self):
         """Close Redis connection"""
         if self.redis_client:
-            await self.redis_client.close()
+            await close_redis()
+            self.redis_client = None
@@ -1,11 +1,33 @@
 import asyncio
+import functools
 import json
 import logging
-from typing import Dict, Any
-from anthropic import Anthropic
+import re
+from typing import Dict, Any, Awaitable, Callable, List, Set, Tuple
 
 from app.models.story_request import StoryRequest
-from app.services.session_manager import SessionManager
+from app.services.session_manager import TOKEN_FIELDS, SessionManager
+from app.services.cost import session_budget, usage_cost
+from app.services.llm_client import LLMResponse, LLMStream, LLMTransport, get_transport
+from app.services.metrics import observe_llm_call, observe_phase, observe_usage
+from app.services.model_router import model_router
+from app.services.rate_limiter import AGENT_PRIORITIES, PRIORITY_NORMAL, estimate_tokens, rate_limiter
+from app.services.resilience import circuit_breaker, hedged, is_retryable, with_retries
+from app.services.response_cache import response_cache
+from app.services.tracing import record_usage, session_span, trace_span, traced
+from app.services.draft_patch import (
+    DraftDiff,
+    PatchError,
+    apply_edits,
+    diff_paragraphs,
+    number_paragraphs,
+    parse_paragraph_id,
+    render_excerpts,
+    split_paragraphs
+)
+from app.services.prevalidators import run_prevalidators
+from app.services.convergence import ConvergencePolicy
+from app.services.cancellation import CancellationToken, GenerationCancelled, watch_cancellation
 from app.api.routes.websocket import (
     send_agent_update,
     send_progress_update,
@@ -13,12 +35,17 @@ from app.api.routes.websocket import (
     send_agent_prompt,
     send_agent_response,
     send_partial_draft,
-    send_validation_issue
+    send_validation_issue,
+    send_agent_usage,
+    forget_session
 )
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Issue severities that fail a validation report on their own
+BLOCKING_SEVERITIES = ("critical", "high")
+
 
 class StoryGenerationService:
     """
@@ -29,13 +56,25 @@ class StoryGenerationService:
     """
 
     def __init__(self):
-        self.anthropic_client = Anthropic(api_key=settings.anthropic_api_key)
         self.session_manager = SessionManager()
+        # Cancellation tokens of the runs in progress, by session id
+        self._cancellations: Dict[str, CancellationToken] = {}
+        # Sessions generated (or reserved for a run) by this process
+        self._runs: Set[str] = set()
+        # Session totals ("tokens", "cost_usd") and cost budgets of the runs in progress
+        self._session_usage: Dict[str, Dict[str, Any]] = {}
+        self._session_budgets: Dict[str, float] = {}
+
+    @property
+    def transport(self) -> LLMTransport:
+        """Shared LLM transport (resolved on use so it can be swapped)"""
+        return get_transport()
 
     async def generate_story(
         self,
         request: StoryRequest,
-        session_id: str
+        session_id: str,
+        trace_context: Dict[str, str] = None
     ) -> None:
         """
         Main story generation pipeline.
@@ -45,23 +84,95 @@ class StoryGenerationService:
         2. Writing: Initial draft
         3. Validation Loop: Consistency + Critic → Editor (iterative)
 
+        Every agent output is checkpointed (planning artifacts, draft
+        versions, validation reports). If the session already has
+        checkpoints, e.g. after a crash, the pipeline resumes from the last
+        completed step instead of repeating paid-for agent calls.
+
+        Cancelling the session (from any process) stops the run: the
+        pipeline task is cancelled, aborting in-flight agent calls, and the
+        session keeps its cancelled status.
+
         Args:
             request: Story parameters
             session_id: Unique session identifier
+            trace_context: Trace context of the request that started the
+                run (see tracing.inject_context), continued by its spans
         """
+        self._runs.add(session_id)
         try:
-            logger.info(f"Starting story generation for session {session_id}")
+            with session_span("story.generate", session_id, carrier=trace_context):
+                async with watch_cancellation(session_id) as token:
+                    session = await self.session_manager.get_session_fields(session_id, "status")
+                    if session and session["status"] == "cancelled":
+                        token.cancel()
+
+                    self._cancellations[session_id] = token
+                    self._session_budgets[session_id] = session_budget(request.max_cost_usd)
+                    # Spend of earlier runs (before a resume) counts towards the budget
+                    usage = (await self.session_manager.get_usage(session_id))["total"]
+                    self._session_usage[session_id] = {
+                        "tokens": sum(usage[field] for field in TOKEN_FIELDS),
+                        "cost_usd": usage["cost_usd"]
+                    }
+                    try:
+                        await token.run(self._run_pipeline(request, session_id))
+                    finally:
+                        self._cancellations.pop(session_id, None)
+                        self._session_usage.pop(session_id, None)
+                        self._session_budgets.pop(session_id, None)
+                        forget_session(session_id)
+
+        except GenerationCancelled:
+            logger.info(f"Stopped story generation for cancelled session {session_id}")
 
-            await self.session_manager.update_session(session_id, {
-                "status": "planning",
-                "current_phase": "planning"
-            })
+        except Exception as e:
+            logger.error(f"Error in story generation for session {session_id}: {e}", exc_info=True)
+            await self.session_manager.fail_session(session_id, str(e))
+            raise
+
+        finally:
+            self._runs.discard(session_id)
 
-            # Phase 1: Planning (run in parallel)
-            await send_progress_update(session_id, 1, 10, "planning", "Creating story structure...")
+    async def _run_pipeline(
+        self,
+        request: StoryRequest,
+        session_id: str
+    ) -> None:
+        """Run the generation phases, skipping checkpointed steps"""
+        logger.info(f"Starting story generation for session {session_id}")
 
-            plot_structure, characters, style_guide = await self._planning_phase(request, session_id)
+        if circuit_breaker.state == "open":
+            await send_progress_update(
+                session_id, 0, 10, "waiting", "LLM service is degraded, waiting to start..."
+            )
+            waited = await circuit_breaker.wait_until_closed()
+            logger.info(f"Session {session_id} waited {waited:.0f}s for the circuit breaker")
+
+        checkpoints = await self.session_manager.get_checkpoints(session_id)
+        latest_draft = await self.session_manager.get_draft(session_id)
+        if checkpoints or latest_draft:
+            logger.info(f"Resuming session {session_id} from {len(checkpoints)} checkpoints")
+
+        await self.session_manager.update_session(session_id, {
+            "status": "planning",
+            "current_phase": "planning",
+            "error": None  # left over by the failed run being resumed
+        })
+
+        # Phase 1: Planning (run in parallel)
+        await send_progress_update(session_id, 1, 10, "planning", "Creating story structure...")
+
+        with observe_phase("planning"), trace_span("phase.planning"):
+            plot_structure, characters, style_guide = await self._planning_phase(
+                request, session_id, checkpoints
+            )
 
+        if latest_draft:
+            # Drafts are checkpoints too: continue validating the latest one
+            draft = latest_draft["content"]
+            start_iteration = latest_draft["version"]
+        else:
             # Phase 2: Writing
             await self.session_manager.update_session(session_id, {
                 "status": "writing",
@@ -69,45 +180,107 @@ class StoryGenerationService:
             })
             await send_progress_update(session_id, 3, 10, "writing", "Writing initial draft...")
 
-            draft = await self._writing_phase(
-                request, plot_structure, characters, style_guide, session_id
-            )
+            with observe_phase("writing"), trace_span("phase.writing"):
+                draft = await self._writing_phase(
+                    request, plot_structure, characters, style_guide, session_id, checkpoints
+                )
 
             # Add draft v1
             await self.session_manager.add_draft(session_id, draft, version=1)
+            start_iteration = 1
 
-            # Phase 3: Validation Loop
-            await self.session_manager.update_session(session_id, {
-                "status": "validating",
-                "current_phase": "validation"
-            })
+        # Phase 3: Validation Loop
+        await self.session_manager.update_session(session_id, {
+            "status": "validating",
+            "current_phase": "validation"
+        })
 
+        with observe_phase("validation"), trace_span("phase.validation"):
             final_draft, approved = await self._validation_loop(
-                draft, plot_structure, characters, style_guide, request, session_id
+                draft, plot_structure, characters, style_guide, request, session_id,
+                checkpoints=checkpoints, start_iteration=start_iteration
             )
 
-            # Complete session
-            await self.session_manager.complete_session(
-                session_id,
-                final_draft=final_draft,
-                approved=approved,
-                metadata={
-                    "word_count": len(final_draft.split()),
-                    "iterations": await self._get_iteration_count(session_id)
-                }
-            )
+        # Complete session
+        await self.session_manager.complete_session(
+            session_id,
+            final_draft=final_draft,
+            approved=approved,
+            metadata={
+                "word_count": len(final_draft.split()),
+                "iterations": await self._get_iteration_count(session_id)
+            }
+        )
 
-            logger.info(f"Completed story generation for session {session_id} (approved={approved})")
+        logger.info(f"Completed story generation for session {session_id} (approved={approved})")
 
-        except Exception as e:
-            logger.error(f"Error in story generation for session {session_id}: {e}", exc_info=True)
-            await self.session_manager.fail_session(session_id, str(e))
-            raise
+    def reserve_run(self, session_id: str) -> bool:
+        """
+        Reserve a session for a run in this process.
+
+        The reservation lasts until the run started with generate_story or
+        resume_story ends.
+
+        Returns:
+            False if this process is already generating the session
+        """
+        if session_id in self._runs:
+            return False
+        self._runs.add(session_id)
+        return True
+
+    async def resume_story(self, session_id: str, trace_context: Dict[str, str] = None) -> None:
+        """
+        Resume an interrupted or failed session from its checkpoints.
+
+        Args:
+            session_id: Unique session identifier
+            trace_context: Trace context of the resume request
+        """
+        session = await self.session_manager.get_session_fields(session_id, "request")
+
+        if not session or not session["request"]:
+            self._runs.discard(session_id)
+            raise ValueError(f"Session {session_id} not found")
+
+        await self.generate_story(StoryRequest(**session["request"]), session_id, trace_context=trace_context)
+
+    async def _checkpointed(
+        self,
+        session_id: str,
+        checkpoints: Dict[str, Any],
+        step: str,
+        call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Run a pipeline step unless its output is already checkpointed.
+
+        Args:
+            session_id: Session identifier
+            checkpoints: Checkpoints loaded for the session (updated in place)
+            step: Checkpoint name of the step
+            call: Coroutine factory running the step
+
+        Returns:
+            Step output
+        """
+        if step in checkpoints:
+            logger.info(f"Using checkpoint {step} for session {session_id}")
+            return checkpoints[step]
+
+        self._check_cancelled(session_id)
+
+        value = await call()
+        await self.session_manager.save_checkpoint(session_id, step, value)
+        checkpoints[step] = value
+
+        return value
 
     async def _planning_phase(
         self,
         request: StoryRequest,
-        session_id: str
+        session_id: str,
+        checkpoints: Dict[str, Any] = None
     ) -> tuple[Dict, Dict, str]:
         """
         Phase 1: Planning (parallel execution of Plot, Character, Style agents)
@@ -115,11 +288,22 @@ class StoryGenerationService:
         Returns:
             Tuple of (plot_structure, characters, style_guide)
         """
+        checkpoints = {} if checkpoints is None else checkpoints
+
         # Run planning agents in parallel
         tasks = [
-            self._call_plot_architect(request, session_id),
-            self._call_character_designer(request, session_id),
-            self._call_style_master(request, session_id)
+            self._checkpointed(
+                session_id, checkpoints, "plot_structure",
+                lambda: self._call_plot_architect(request, session_id)
+            ),
+            self._checkpointed(
+                session_id, checkpoints, "characters",
+                lambda: self._call_character_designer(request, session_id)
+            ),
+            self._checkpointed(
+                session_id, checkpoints, "style_guide",
+                lambda: self._call_style_master(request, session_id)
+            )
         ]
 
         results = await asyncio.gather(*tasks)
@@ -133,17 +317,61 @@ class StoryGenerationService:
         plot_structure: Dict,
         characters: Dict,
         style_guide: str,
-        session_id: str
+        session_id: str,
+        checkpoints: Dict[str, Any] = None
     ) -> str:
         """
         Phase 2: Writing the initial draft
 
+        With `writer_mode = "sharded"` the acts of the plot structure are
+        written concurrently and stitched together; otherwise the Writer
+        produces the whole draft in one call.
+
         Returns:
             Draft content as markdown string
         """
         await send_agent_update(session_id, "writer", "starting", "Generating initial draft...")
         await self.session_manager.set_agent_status(session_id, "writer", "in_progress")
 
+        segments = self._plot_segments(plot_structure)
+        if settings.writer_mode == "sharded" and len(segments) > 1:
+            draft = await self._write_sharded(
+                request, plot_structure, characters, style_guide, segments, session_id, checkpoints
+            )
+        else:
+            draft = await self._write_single(
+                request, plot_structure, characters, style_guide, session_id
+            )
+        word_count = len(draft.split())
+
+        # Send the response for transparency
+        await send_agent_response(
+            session_id,
+            "writer",
+            draft[:1000] + "..." if len(draft) > 1000 else draft,  # Truncate for summary
+            summary=f"Generated {word_count}-word draft ({len(draft)} chars)"
+        )
+
+        await self.session_manager.set_agent_status(session_id, "writer", "completed")
+        await send_agent_update(session_id, "writer", "completed", f"Draft complete ({word_count} words)")
+
+        return draft
+
+    @traced("agent.writer")
+    async def _write_single(
+        self,
+        request: StoryRequest,
+        plot_structure: Dict,
+        characters: Dict,
+        style_guide: str,
+        session_id: str
+    ) -> str:
+        """
+        Write the whole draft in a single Writer call
+
+        Returns:
+            Draft content as markdown string
+        """
         # Call Writer agent with all planning materials
         prompt = f"""You are the Writer Agent. Generate a complete story draft following these specifications:
 
@@ -183,10 +411,102 @@ Output only the story content in Markdown, starting with the title.
             reasoning="Requesting complete story draft following plot, characters, and style guide"
         )
 
-        draft = await self._call_anthropic(prompt, max_tokens=16000)
+        if settings.stream_drafts:
+            draft = await self._stream_draft(
+                prompt, session_id, "Writing draft", max_tokens=16000, agent="writer"
+            )
+        else:
+            draft = await self._call_anthropic(
+                prompt, max_tokens=16000, agent="writer", session_id=session_id
+            )
+            word_count = len(draft.split())
+
+            # Send partial draft (the full initial draft in this case)
+            await send_partial_draft(
+                session_id,
+                draft,
+                word_count,
+                progress_message=f"Initial draft completed: {word_count} words"
+            )
+
+        return draft
+
+    def _plot_segments(self, plot_structure: Dict) -> List[Tuple[str, Any]]:
+        """
+        Split the plot structure into independently writable segments.
+
+        Returns:
+            (key, outline) pairs for the acts (act_1, act_2, ...), in plot order
+        """
+        return [
+            (key, outline)
+            for key, outline in plot_structure.items()
+            if key.lower().startswith("act")
+        ]
+
+    @traced("agent.writer.sharded")
+    async def _write_sharded(
+        self,
+        request: StoryRequest,
+        plot_structure: Dict,
+        characters: Dict,
+        style_guide: str,
+        segments: List[Tuple[str, Any]],
+        session_id: str,
+        checkpoints: Dict[str, Any] = None
+    ) -> str:
+        """
+        Write the draft one plot segment (act) at a time, concurrently.
+
+        Every segment call shares the cached story context and gets the
+        outline of its neighbouring segments, so the phase takes about as
+        long as the longest segment. A stitching pass then smooths each
+        boundary between segments.
+
+        Returns:
+            Draft content as markdown string
+        """
+        checkpoints = {} if checkpoints is None else checkpoints
+        story_context = self._story_context(plot_structure, characters, style_guide)
+        total = len(segments)
+        segment_words = request.word_count_target // total
+
+        async def write_segment(index: int) -> str:
+            key, _ = segments[index]
+            prompt = self._segment_prompt(request, segments, index, segment_words)
+
+            await send_agent_prompt(
+                session_id,
+                "writer",
+                prompt,
+                reasoning=f"Requesting segment {index + 1}/{total} ({key}) of the draft"
+            )
+
+            # ~2 tokens per Portuguese word, plus headroom
+            text = await self._call_anthropic(
+                prompt,
+                max_tokens=min(16000, segment_words * 2 + 1000),
+                agent="writer",
+                session_id=session_id,
+                context=story_context
+            )
+            await send_agent_update(
+                session_id, "writer", "running", f"Segment {index + 1}/{total} written ({key})"
+            )
+
+            return text.strip()
+
+        parts = await asyncio.gather(*[
+            self._checkpointed(
+                session_id, checkpoints, f"segment:{key}",
+                lambda index=index: write_segment(index)
+            )
+            for index, (key, _) in enumerate(segments)
+        ])
+
+        draft = await self._stitch_segments(parts, story_context, session_id)
         word_count = len(draft.split())
 
-        # Send partial draft (the full initial draft in this case)
         await send_partial_draft(
             session_id,
             draft,
@@ -194,18 +514,116 @@ Output only the story content in Markdown, starting with the title.
             progress_message=f"Initial draft completed: {word_count} words"
         )
 
-        # Send the response for transparency
-        await send_agent_response(
-            session_id,
-            "writer",
-            draft[:1000] + "..." if len(draft) > 1000 else draft,  # Truncate for summary
-            summary=f"Generated {word_count}-word draft ({len(draft)} chars)"
-        )
+        return draft
 
-        await self.session_manager.set_agent_status(session_id, "writer", "completed")
-        await send_agent_update(session_id, "writer", "completed", f"Draft complete ({word_count} words)")
+    def _segment_prompt(
+        self,
+        request: StoryRequest,
+        segments: List[Tuple[str, Any]],
+        index: int,
+        segment_words: int
+    ) -> str:
+        """Build the Writer prompt for one segment of a sharded draft"""
+        key, outline = segments[index]
 
-        return draft
+        if index > 0:
+            prev_key, prev_outline = segments[index - 1]
+            previous = f"""**Previous segment ({prev_key}), written separately:**
+```json
+{json.dumps(prev_outline, indent=2, ensure_ascii=False)}
+```"""
+        else:
+            previous = "**Previous segment:** none, this segment opens the story. Start with the story title as a Markdown heading."
+
+        if index < len(segments) - 1:
+            next_key, next_outline = segments[index + 1]
+            following = f"""**Next segment ({next_key}), written separately:**
+```json
+{json.dumps(next_outline, indent=2, ensure_ascii=False)}
+```"""
+        else:
+            following = "**Next segment:** none, this segment ends the story."
+
+        return f"""You are the Writer Agent. Write segment {index + 1} of {len(segments)} of the story: the part covering "{key}".
+The other segments are written at the same time from the same plot structure, characters and style guide.
+
+**This Segment's Outline:**
+```json
+{json.dumps(outline, indent=2, ensure_ascii=False)}
+```
+
+{previous}
+
+{following}
+
+**Requirements:**
+- Genre: {request.genre.value}
+- Target Audience: {request.target_audience.value}
+- Target Word Count: {segment_words} words (±10%)
+- Author Style: {request.author_style.value}
+- **Language: PORTUGUESE (BRAZIL) - pt-BR**
+
+Pick up where the previous segment's outline ends and stop where the next segment's outline begins.
+Do not retell other segments and do not add act or chapter headings.
+
+Output only the segment's prose in Markdown.
+"""
+
+    @traced("agent.writer.stitch")
+    async def _stitch_segments(
+        self,
+        parts: List[str],
+        story_context: str,
+        session_id: str
+    ) -> str:
+        """
+        Join independently written segments, smoothing each boundary.
+
+        Only the last paragraph before and the first paragraph after each
+        boundary are rewritten, so the stitching calls are small and run
+        concurrently.
+
+        Args:
+            parts: Segment texts in story order
+            story_context: Cached story context
+            session_id: Session identifier
+
+        Returns:
+            Full draft text
+        """
+        paragraphs = [[p for p in part.split("\n\n") if p.strip()] for part in parts]
+
+        async def stitch(index: int) -> str:
+            before, after = paragraphs[index], paragraphs[index + 1]
+            # Single-paragraph segments would be rewritten by both of their boundaries
+            if len(before) < 2 or len(after) < 2:
+                return ""
+
+            prompt = f"""You are the Writer Agent. Two consecutive segments of the story were written separately.
+Rewrite the passage below, where they meet, into a seamless transition in BRAZILIAN PORTUGUESE (pt-BR).
+Keep every event and roughly the same length; only fix continuity, repetition and tone.
+
+**End of the earlier segment:**
+{before[-1]}
+
+**Start of the later segment:**
+{after[0]}
+
+Output only the rewritten passage in Markdown.
+"""
+            text = await self._call_anthropic(
+                prompt, max_tokens=2000, agent="writer", session_id=session_id, context=story_context
+            )
+            return text.strip()
+
+        transitions = await asyncio.gather(*[stitch(i) for i in range(len(parts) - 1)])
+
+        for index, transition in enumerate(transitions):
+            if transition:
+                paragraphs[index][-1] = transition
+                paragraphs[index + 1][0] = ""
+
+        return "\n\n".join(p for part in paragraphs for p in part if p)
 
     async def _validation_loop(
         self,
@@ -214,101 +632,235 @@ Output only the story content in Markdown, starting with the title.
         characters: Dict,
         style_guide: str,
         request: StoryRequest,
-        session_id: str
+        session_id: str,
+        checkpoints: Dict[str, Any] = None,
+        start_iteration: int = 1
     ) -> tuple[str, bool]:
         """
         Phase 3: Iterative validation and refinement loop
 
+        Iteration N validates draft vN and, if needed, produces draft vN+1.
+        The loop stops early once critic scores plateau or the session's
+        token/cost/time budget is spent, returning the best version seen.
+        Validation reports are checkpointed per iteration. Local
+        pre-validators run first: a critical finding skips the LLM
+        validators for that iteration and has the Editor rewrite the draft,
+        and a high-severity one fails the validation.
+
+        From the second iteration on, only the paragraphs the editor changed
+        (plus their context) are re-validated, and findings for untouched
+        paragraphs are carried forward, unless most of the draft changed.
+
         Returns:
             Tuple of (final_draft, approved)
         """
+        checkpoints = {} if checkpoints is None else checkpoints
         current_draft = draft
-        iteration = 1
+        iteration = start_iteration
         max_iterations = settings.max_agent_iterations
+        # Paragraphs and reports of the previous iteration, for incremental re-validation
+        previous: Dict[str, Any] = None
+        convergence = ConvergencePolicy(
+            cost_budget_usd=self._session_budgets.get(session_id),
+            elapsed_seconds=checkpoints.get("validation_elapsed", 0.0)
+        )
+        stop_reason = f"max iterations ({max_iterations}) reached"
+
+        # After a resume, versions validated before the interruption still
+        # count towards the plateau and compete for the best draft
+        for version in range(1, start_iteration):
+            validation_report = checkpoints.get(f"validation:{version}")
+            critique_report = checkpoints.get(f"critique:{version}")
+            if validation_report is None or critique_report is None:
+                continue
+            validated_draft = await self.session_manager.get_draft(session_id, version)
+            if validated_draft:
+                convergence.record(version, validated_draft["content"], validation_report, critique_report)
+
+        # Planning artifacts are identical on every iteration: send them as a
+        # cached prefix instead of re-billing them as fresh input each time
+        story_context = self._story_context(plot_structure, characters, style_guide)
 
         while iteration <= max_iterations:
-            await send_progress_update(
-                session_id,
-                iteration + 3,
-                10,
-                "validation",
-                f"Validation cycle {iteration}/{max_iterations}"
-            )
-
-            await self.session_manager.update_session(session_id, {
-                "current_iteration": iteration
-            })
-
-            # Run validators in parallel
-            validation_task = self._call_consistency_validator(current_draft, plot_structure, characters, session_id)
-            critique_task = self._call_literary_critic(current_draft, style_guide, request, session_id)
-
-            validation_report, critique_report = await asyncio.gather(validation_task, critique_task)
-
-            # Send validation results via WebSocket
-            await send_validation_results(session_id, validation_report, critique_report)
-
-            # Check approval criteria
-            is_consistent = validation_report.get("status") == "PASSED"
-            min_critic_score = critique_report.get("min_score", 0)
-            approved = is_consistent and min_critic_score >= settings.min_critic_score
-
-            if approved:
-                logger.info(f"Story approved in iteration {iteration}")
+            # Revisions that overran the budget are not validated: the best
+            # version validated so far is returned instead
+            if convergence.best is not None:
+                stop_reason = convergence.budget_reason(**self._usage_totals(session_id))
+                if stop_reason:
+                    break
+
+            with trace_span("validation.iteration", iteration=iteration):
                 await send_progress_update(
                     session_id,
+                    iteration + 3,
                     10,
-                    10,
-                    "completed",
-                    f"Story approved! Min score: {min_critic_score:.1f}/10"
+                    "validation",
+                    f"Validation cycle {iteration}/{max_iterations}"
                 )
-                return current_draft, True
 
-            # If not approved, call Editor
-            await send_agent_update(
-                session_id,
-                "editor",
-                "starting",
-                f"Implementing corrections (iteration {iteration})"
-            )
+                await self.session_manager.update_session(session_id, {
+                    "current_iteration": iteration
+                })
+
+                paragraphs = split_paragraphs(current_draft)
+
+                # Cheap local checks first: critical findings send the draft
+                # straight back to the editor without paying for LLM validation
+                prevalidation = run_prevalidators(current_draft, request, characters)
+                for issue in prevalidation.issues:
+                    await send_validation_issue(session_id, issue)
+
+                if prevalidation.hard_failure:
+                    logger.info(
+                        f"Pre-validation failed, skipping LLM validators "
+                        f"(session {session_id}, iteration {iteration})"
+                    )
+                    validation_report = {
+                        "status": "FAILED",
+                        "issues": prevalidation.issues,
+                        "summary": self._issue_summary(prevalidation.issues)
+                    }
+                    critique_report = {"scores": {}, "average_score": 0, "min_score": 0, "overall_assessment": "SKIPPED"}
+                else:
+                    diff = None
+                    if previous is not None and settings.incremental_validation:
+                        diff = diff_paragraphs(previous["paragraphs"], paragraphs)
+                        if diff.changed_ratio > settings.incremental_validation_max_changed_ratio:
+                            logger.info(
+                                f"{diff.changed_ratio:.0%} of the draft changed, running full validation "
+                                f"(session {session_id}, iteration {iteration})"
+                            )
+                            diff = None
+
+                    # Run validators in parallel
+                    validation_task = self._checkpointed(
+                        session_id, checkpoints, f"validation:{iteration}",
+                        lambda: self._call_consistency_validator(
+                            current_draft, story_context, session_id,
+                            diff=diff, previous_report=previous and previous["validation"]
+                        )
+                    )
+                    critique_task = self._checkpointed(
+                        session_id, checkpoints, f"critique:{iteration}",
+                        lambda: self._call_literary_critic(
+                            current_draft, story_context, request, session_id,
+                            diff=diff, previous_report=previous and previous["critique"]
+                        )
+                    )
+
+                    validation_report, critique_report = await asyncio.gather(validation_task, critique_task)
+
+                    # Incremental re-validation diffs against the last LLM-validated draft
+                    validated = {
+                        "paragraphs": paragraphs,
+                        "validation": validation_report,
+                        "critique": critique_report
+                    }
+
+                    if prevalidation.issues:
+                        issues = prevalidation.issues + validation_report.get("issues", [])
+                        validation_report = {
+                            **validation_report,
+                            "issues": issues,
+                            "summary": self._issue_summary(issues)
+                        }
+                        # Breaking a rule of the request (e.g. length off by
+                        # more than 10%) fails the draft whatever the LLM says
+                        if any(issue["severity"] in BLOCKING_SEVERITIES for issue in prevalidation.issues):
+                            validation_report["status"] = "FAILED"
+
+                # Send validation results via WebSocket
+                await send_validation_results(session_id, validation_report, critique_report)
+
+                # Check approval criteria
+                is_consistent = validation_report.get("status") == "PASSED"
+                min_critic_score = critique_report.get("min_score", 0)
+                approved = is_consistent and min_critic_score >= settings.min_critic_score
+
+                if approved:
+                    logger.info(f"Story approved in iteration {iteration}")
+                    await send_progress_update(
+                        session_id,
+                        10,
+                        10,
+                        "completed",
+                        f"Story approved! Min score: {min_critic_score:.1f}/10"
+                    )
+                    return current_draft, True
+
+                convergence.record(iteration, current_draft, validation_report, critique_report)
+                if iteration >= max_iterations:
+                    stop_reason = f"max iterations ({max_iterations}) reached"
+                else:
+                    stop_reason = convergence.stop_reason(**self._usage_totals(session_id))
+                if stop_reason:
+                    break
+
+                # If not approved, call Editor
+                await send_agent_update(
+                    session_id,
+                    "editor",
+                    "starting",
+                    f"Implementing corrections (iteration {iteration})"
+                )
 
-            current_draft = await self._call_editor(
-                current_draft,
-                validation_report,
-                critique_report,
-                plot_structure,
-                characters,
-                style_guide,
-                session_id
-            )
+                if not prevalidation.hard_failure:
+                    previous = validated
+
+                with observe_phase("editing"), trace_span("phase.editing"):
+                    current_draft = await self._call_editor(
+                        current_draft,
+                        validation_report,
+                        critique_report,
+                        story_context,
+                        session_id,
+                        full_rewrite=prevalidation.hard_failure
+                    )
+
+                # Add new draft version
+                await self.session_manager.add_draft(
+                    session_id,
+                    current_draft,
+                    version=iteration + 1,
+                    metadata={
+                        "validation_status": validation_report.get("status"),
+                        "min_critic_score": min_critic_score
+                    }
+                )
+                # The time budget covers every run of the session, not just this one
+                await self.session_manager.save_checkpoint(
+                    session_id, "validation_elapsed", convergence.elapsed_seconds
+                )
 
-            # Add new draft version
-            await self.session_manager.add_draft(
-                session_id,
-                current_draft,
-                version=iteration + 1,
-                metadata={
-                    "validation_status": validation_report.get("status"),
-                    "min_critic_score": min_critic_score
-                }
-            )
+                iteration += 1
 
-            iteration += 1
+        best = convergence.best
+        if best is None:
+            # Resumed past the last iteration: nothing left to validate
+            return current_draft, False
 
-        # Max iterations reached without approval
-        logger.warning(f"Max iterations reached for session {session_id} without approval")
+        # Stopped without approval: keep the best version, not the latest
+        logger.warning(
+            f"Stopping validation for session {session_id} without approval: {stop_reason}; "
+            f"returning draft v{best.version} (min score {best.min_score:.1f})"
+        )
+        await self.session_manager.update_session(session_id, {
+            "stop_reason": stop_reason,
+            "best_version": best.version
+        })
         await send_progress_update(
             session_id,
             10,
             10,
             "completed",
-            f"Max iterations reached. Returning best draft."
+            f"Stopped: {stop_reason}. Returning best draft (v{best.version}, min score {best.min_score:.1f}/10)."
         )
 
-        return current_draft, False
+        return convergence.best_draft, False
 
     # ===== Individual Agent Callers =====
 
+    @traced("agent.plot_architect")
     async def _call_plot_architect(self, request: StoryRequest, session_id: str) -> Dict:
         """Call Plot Architect agent"""
         await send_agent_update(session_id, "plot-architect", "starting", "Creating story structure...")
@@ -336,8 +888,9 @@ Output ONLY valid JSON, no additional text.
             reasoning="Requesting detailed 3-act structure based on user's plot idea"
         )
 
-        response = await self._call_anthropic(prompt, max_tokens=4000)
-        plot_structure = self._extract_json(response)
+        response, plot_structure = await self._call_json_agent(
+            prompt, max_tokens=4000, agent="plot-architect", session_id=session_id
+        )
 
         # Send the response for transparency
         await send_agent_response(
@@ -352,6 +905,7 @@ Output ONLY valid JSON, no additional text.
 
         return plot_structure
 
+    @traced("agent.character_designer")
     async def _call_character_designer(self, request: StoryRequest, session_id: str) -> Dict:
         """Call Character Designer agent"""
         await send_agent_update(session_id, "character-designer", "starting", "Creating characters...")
@@ -379,8 +933,9 @@ Output ONLY valid JSON, no additional text.
             reasoning="Requesting character profiles that fit the plot and author style"
         )
 
-        response = await self._call_anthropic(prompt, max_tokens=4000)
-        characters = self._extract_json(response)
+        response, characters = await self._call_json_agent(
+            prompt, max_tokens=4000, agent="character-designer", session_id=session_id
+        )
 
         # Send the response for transparency
         await send_agent_response(
@@ -395,6 +950,7 @@ Output ONLY valid JSON, no additional text.
 
         return characters
 
+    @traced("agent.style_master")
     async def _call_style_master(self, request: StoryRequest, session_id: str) -> str:
         """Call Style Master agent"""
         await send_agent_update(session_id, "style-master", "starting", f"Analyzing {request.author_style.value} style...")
@@ -420,7 +976,10 @@ Follow your instructions to create a detailed style guide in Markdown format.
             reasoning=f"Analyzing {request.author_style.value}'s writing style to create a guide for the writer"
         )
 
-        style_guide = await self._call_anthropic(prompt, max_tokens=3000)
+        # The style guide only depends on (author, genre, audience), so it is cached
+        style_guide = await self._call_anthropic(
+            prompt, max_tokens=3000, agent="style-master", session_id=session_id, cache=True
+        )
 
         # Send the response for transparency
         await send_agent_response(
@@ -435,28 +994,63 @@ Follow your instructions to create a detailed style guide in Markdown format.
 
         return style_guide
 
+    @traced("agent.consistency_validator")
     async def _call_consistency_validator(
-        self, draft: str, plot_structure: Dict, characters: Dict, session_id: str
+        self,
+        draft: str,
+        story_context: str,
+        session_id: str,
+        diff: DraftDiff = None,
+        previous_report: Dict = None
     ) -> Dict:
-        """Call Consistency Validator agent"""
+        """
+        Call Consistency Validator agent
+
+        With a diff against the previous draft, only the changed paragraphs
+        are re-validated and the previous issues located in untouched
+        paragraphs are carried forward.
+        """
+        if diff is not None and diff.identical:
+            logger.info(f"Draft unchanged, reusing previous validation report (session {session_id})")
+            return previous_report
+
         await send_agent_update(session_id, "consistency-validator", "starting", "Checking for plot holes...")
         await self.session_manager.set_agent_status(session_id, "consistency-validator", "in_progress")
 
-        prompt = f"""You are the Consistency Validator Agent. Analyze this draft for plot holes and inconsistencies.
+        paragraphs = split_paragraphs(draft)
+        location_rule = (
+            'Each paragraph is prefixed with its id ([P1], [P2], ...): list the ids of the paragraphs '
+            'each issue is about in its "paragraphs" field (e.g. ["P3", "P4"]).'
+        )
 
-**Draft:**
-{draft}
+        if diff is None:
+            prompt = f"""You are the Consistency Validator Agent. Analyze this draft for plot holes and inconsistencies
+against the plot structure and characters in the story context.
+{location_rule}
 
-**Plot Structure:**
-```json
-{json.dumps(plot_structure, indent=2)}
-```
+**Draft:**
+{number_paragraphs(paragraphs)}
 
-**Characters:**
+Follow your instructions and output a validation report in JSON format.
+Output ONLY valid JSON, no additional text.
+"""
+        else:
+            carried, rechecked = self._split_issues(previous_report.get("issues", []), diff)
+            prompt = f"""You are the Consistency Validator Agent. The draft was revised since your last review.
+Only the revised paragraphs and their context are shown; [...] marks text you already validated.
+Check the revised passages for plot holes and inconsistencies against the plot structure and
+characters in the story context, and check whether the previously reported issues below are resolved.
+{location_rule}
+
+**Revised Passages:**
+{render_excerpts(paragraphs, diff.changed, settings.incremental_validation_context_paragraphs)}
+
+**Previously Reported Issues to Re-check:**
 ```json
-{json.dumps(characters, indent=2)}
+{json.dumps(rechecked, indent=2, ensure_ascii=False)}
 ```
 
+Report only issues still present in, or introduced by, the revised passages.
 Follow your instructions and output a validation report in JSON format.
 Output ONLY valid JSON, no additional text.
 """
@@ -469,14 +1063,19 @@ Output ONLY valid JSON, no additional text.
             reasoning="Checking draft for plot holes, timeline issues, and inconsistencies"
         )
 
-        response = await self._call_anthropic(prompt, max_tokens=4000)
-        validation_report = self._extract_json(response)
+        response, validation_report = await self._call_json_agent(
+            prompt, max_tokens=4000, agent="consistency-validator",
+            session_id=session_id, context=story_context, required=("status",)
+        )
 
         # Send individual issues for real-time visibility
         issues = validation_report.get("issues", [])
         for issue in issues:
             await send_validation_issue(session_id, issue)
 
+        if diff is not None:
+            validation_report = self._merge_validation(validation_report, carried, diff)
+
         # Send the response for transparency
         await send_agent_response(
             session_id,
@@ -498,26 +1097,61 @@ Output ONLY valid JSON, no additional text.
 
         return validation_report
 
+    @traced("agent.literary_critic")
     async def _call_literary_critic(
-        self, draft: str, style_guide: str, request: StoryRequest, session_id: str
+        self,
+        draft: str,
+        story_context: str,
+        request: StoryRequest,
+        session_id: str,
+        diff: DraftDiff = None,
+        previous_report: Dict = None
     ) -> Dict:
-        """Call Literary Critic agent"""
+        """
+        Call Literary Critic agent
+
+        With a diff against the previous draft, the critic only reads the
+        changed paragraphs and updates its previous critique.
+        """
+        if diff is not None and diff.identical:
+            logger.info(f"Draft unchanged, reusing previous critique (session {session_id})")
+            return previous_report
+
         await send_agent_update(session_id, "literary-critic", "starting", "Evaluating story quality...")
         await self.session_manager.set_agent_status(session_id, "literary-critic", "in_progress")
 
-        prompt = f"""You are the Literary Critic Agent. Evaluate this draft across 6 dimensions.
+        if diff is None:
+            prompt = f"""You are the Literary Critic Agent. Evaluate this draft across 6 dimensions,
+judging style adherence against the style guide in the story context.
 
 **Draft:**
 {draft}
 
-**Style Guide:**
-{style_guide}
-
 **Genre:** {request.genre.value}
 **Target Audience:** {request.target_audience.value}
 
 Follow your instructions and output a critique report in JSON format.
 Output ONLY valid JSON, no additional text.
+"""
+        else:
+            prompt = f"""You are the Literary Critic Agent. The draft was revised since your previous critique.
+Only the revised paragraphs and their context are shown; [...] marks text you already evaluated.
+Update your previous critique across the same 6 dimensions, judging style adherence against the
+style guide in the story context. Keep the scores of dimensions the revisions do not affect.
+
+**Previous Critique:**
+```json
+{json.dumps(previous_report, indent=2, ensure_ascii=False)}
+```
+
+**Revised Passages:**
+{render_excerpts(split_paragraphs(draft), diff.changed, settings.incremental_validation_context_paragraphs)}
+
+**Genre:** {request.genre.value}
+**Target Audience:** {request.target_audience.value}
+
+Follow your instructions and output the full updated critique report in JSON format.
+Output ONLY valid JSON, no additional text.
 """
 
         # Send the prompt for transparency
@@ -528,8 +1162,10 @@ Output ONLY valid JSON, no additional text.
             reasoning="Evaluating draft across 6 quality dimensions (prose, character, structure, style, emotion, originality)"
         )
 
-        response = await self._call_anthropic(prompt, max_tokens=4000)
-        critique_report = self._extract_json(response)
+        response, critique_report = await self._call_json_agent(
+            prompt, max_tokens=4000, agent="literary-critic",
+            session_id=session_id, context=story_context, required=("scores", "min_score")
+        )
 
         # Send the response for transparency
         scores = critique_report.get("scores", {})
@@ -553,20 +1189,156 @@ Output ONLY valid JSON, no additional text.
 
         return critique_report
 
+    def _issue_paragraphs(self, issue: Dict) -> List[int]:
+        """Paragraph ids an issue refers to (from "paragraphs", else its location)"""
+        refs = issue.get("paragraphs")
+        if not isinstance(refs, list):
+            refs = re.findall(r"\bP\d+\b", str(issue.get("location", "")))
+
+        ids = []
+        for ref in refs:
+            try:
+                ids.append(parse_paragraph_id(ref))
+            except PatchError:
+                continue
+        return ids
+
+    def _split_issues(self, issues: List[Dict], diff: DraftDiff) -> tuple[List[Dict], List[Dict]]:
+        """
+        Split previous issues by whether the revision touched their paragraphs.
+
+        Paragraphs next to a deletion are unchanged but re-validated, so
+        issues located there are re-checked rather than carried.
+
+        Returns:
+            Tuple of (carried, rechecked): issues located only in paragraphs
+            that are not re-validated, with their ids remapped to the new
+            draft, and issues that must be re-checked (changed, re-validated
+            or unknown location)
+        """
+        carried, rechecked = [], []
+        changed = set(diff.changed)
+
+        for issue in issues:
+            ids = self._issue_paragraphs(issue)
+            new_ids = [diff.old_to_new.get(i) for i in ids]
+            if ids and all(i is not None and i not in changed for i in new_ids):
+                carried.append({**issue, "paragraphs": [f"P{i}" for i in new_ids]})
+            else:
+                rechecked.append(issue)
+
+        return carried, rechecked
+
+    def _issue_summary(self, issues: List[Dict]) -> Dict[str, int]:
+        """Issue counts by severity, in the validation report's summary format"""
+        return {
+            "total_issues": len(issues),
+            **{
+                severity: sum(1 for issue in issues if issue.get("severity") == severity)
+                for severity in ("critical", "high", "medium", "low")
+            }
+        }
+
+    def _merge_validation(
+        self,
+        report: Dict,
+        carried: List[Dict],
+        diff: DraftDiff
+    ) -> Dict:
+        """Combine an incremental validation report with the carried-forward issues"""
+        # No de-duplication needed: carried issues lie outside diff.changed
+        # (see _split_issues), and the fresh report only covers the
+        # re-validated paragraphs and the re-checked issues
+        issues = carried + report.get("issues", [])
+
+        merged = {
+            **report,
+            "issues": issues,
+            "summary": self._issue_summary(issues),
+            "revalidated_paragraphs": [f"P{i}" for i in diff.changed]
+        }
+
+        # The fresh report only judged the revised passages: unresolved
+        # blocking issues in untouched paragraphs still fail the draft
+        if any(issue.get("severity") in BLOCKING_SEVERITIES for issue in carried):
+            merged["status"] = "FAILED"
+
+        return merged
+
+    @traced("agent.editor")
     async def _call_editor(
         self,
         draft: str,
         validation_report: Dict,
         critique_report: Dict,
-        plot_structure: Dict,
-        characters: Dict,
-        style_guide: str,
-        session_id: str
+        story_context: str,
+        session_id: str,
+        full_rewrite: bool = False
     ) -> str:
-        """Call Editor agent"""
+        """
+        Call Editor agent (paragraph patches, falling back to a full rewrite)
+
+        Whole-draft problems (a failed pre-validation, or issues that point
+        to no paragraph) cannot be fixed with patches: the draft is rewritten.
+        """
         await self.session_manager.set_agent_status(session_id, "editor", "in_progress")
 
-        prompt = f"""You are the Editor Agent. Revise this draft to address all issues.
+        issues = validation_report.get("issues", [])
+        issues_count = len(issues)
+        weak_scores = [k for k, v in critique_report.get("scores", {}).items() if v < settings.min_critic_score]
+
+        if issues and not any(self._issue_paragraphs(issue) for issue in issues):
+            full_rewrite = True
+
+        revised_draft = None
+        if settings.editor_mode == "patch" and not full_rewrite:
+            try:
+                revised_draft = await self._patch_draft(
+                    draft, validation_report, critique_report, story_context, session_id,
+                    targets=issues_count + len(weak_scores)
+                )
+            except ValueError as e:
+                logger.warning(f"Editor patch failed for session {session_id}, rewriting full draft: {e}")
+
+        if revised_draft is None:
+            revised_draft = await self._rewrite_draft(
+                draft, validation_report, critique_report, story_context, session_id,
+                issues_count, weak_scores
+            )
+        revised_word_count = len(revised_draft.split())
+
+        # Send the response for transparency
+        await send_agent_response(
+            session_id,
+            "editor",
+            revised_draft[:1000] + "..." if len(revised_draft) > 1000 else revised_draft,
+            summary=f"Revised draft: {revised_word_count} words, addressed {issues_count} issues"
+        )
+
+        await self.session_manager.set_agent_status(session_id, "editor", "completed")
+
+        await send_agent_update(
+            session_id,
+            "editor",
+            "completed",
+            f"Fixed {issues_count} issues, improved {len(weak_scores)} weak sections"
+        )
+
+        return revised_draft
+
+    async def _rewrite_draft(
+        self,
+        draft: str,
+        validation_report: Dict,
+        critique_report: Dict,
+        story_context: str,
+        session_id: str,
+        issues_count: int,
+        weak_scores: List[str]
+    ) -> str:
+        """Have the Editor regenerate the full revised draft"""
+        prompt = f"""You are the Editor Agent. Revise this draft to address all issues, staying faithful
+to the plot structure, characters and style guide in the story context.
 
 **Current Draft:**
 {draft}
@@ -581,65 +1353,225 @@ Output ONLY valid JSON, no additional text.
 {json.dumps(critique_report, indent=2)}
 ```
 
-**Plot Structure:**
+**CRITICAL: Maintain the ENTIRE revised story in BRAZILIAN PORTUGUESE (pt-BR). All edits, additions, and modifications must be in Portuguese from Brazil.**
+
+Follow your instructions and output the revised draft in Markdown format.
+Output only the story content, no meta-commentary.
+"""
+
+        # Send the prompt for transparency
+        await send_agent_prompt(
+            session_id,
+            "editor",
+            prompt,
+            reasoning=f"Revising draft to fix {issues_count} validation issues and improve {len(weak_scores)} weak dimensions: {weak_scores}"
+        )
+
+        if settings.stream_drafts:
+            revised_draft = await self._stream_draft(
+                prompt, session_id, "Revising draft", max_tokens=16000,
+                agent="editor", context=story_context
+            )
+        else:
+            revised_draft = await self._call_anthropic(
+                prompt, max_tokens=16000, agent="editor",
+                session_id=session_id, context=story_context
+            )
+            revised_word_count = len(revised_draft.split())
+
+            # Send partial draft with revision
+            await send_partial_draft(
+                session_id,
+                revised_draft,
+                revised_word_count,
+                progress_message=f"Revision completed: {revised_word_count} words"
+            )
+
+        return revised_draft
+
+    async def _patch_draft(
+        self,
+        draft: str,
+        validation_report: Dict,
+        critique_report: Dict,
+        story_context: str,
+        session_id: str,
+        targets: int
+    ) -> str:
+        """
+        Have the Editor revise the draft with paragraph-level edits.
+
+        The Editor only writes the paragraphs it changes, so output tokens
+        and latency grow with the number of issues instead of the length of
+        the story.
+
+        Args:
+            draft: Current draft
+            validation_report: Consistency Validator report
+            critique_report: Literary Critic report
+            story_context: Cached story context
+            session_id: Session identifier
+            targets: Number of issues and weak dimensions to address
+
+        Returns:
+            Patched draft
+
+        Raises:
+            ValueError: If the response is not a valid, applicable edit list
+        """
+        paragraphs = split_paragraphs(draft)
+
+        prompt = f"""You are the Editor Agent. Revise this draft to address all issues, staying faithful
+to the plot structure, characters and style guide in the story context.
+
+Each paragraph of the draft is prefixed with its id ([P1], [P2], ...). Do not rewrite the whole
+draft: change only the paragraphs the issues point to.
+
+**Current Draft:**
+{number_paragraphs(paragraphs)}
+
+**Validation Report:**
 ```json
-{json.dumps(plot_structure, indent=2)}
+{json.dumps(validation_report, indent=2)}
 ```
 
-**Characters:**
+**Critique Report:**
 ```json
-{json.dumps(characters, indent=2)}
+{json.dumps(critique_report, indent=2)}
 ```
 
-**Style Guide:**
-{style_guide}
+**CRITICAL: Write every edit in BRAZILIAN PORTUGUESE (pt-BR).**
 
-**CRITICAL: Maintain the ENTIRE revised story in BRAZILIAN PORTUGUESE (pt-BR). All edits, additions, and modifications must be in Portuguese from Brazil.**
-
-Follow your instructions and output the revised draft in Markdown format.
-Output only the story content, no meta-commentary.
+Output ONLY valid JSON with the list of edits, no additional text:
+{{"edits": [
+  {{"paragraph": "P3", "action": "replace", "text": "revised paragraph"}},
+  {{"paragraph": "P7", "action": "insert_after", "text": "new paragraph"}},
+  {{"paragraph": "P9", "action": "delete"}}
+]}}
+Edit text must not include the [P#] ids. Use "P0" with insert_after to add text before the first paragraph.
 """
 
-        issues_count = len(validation_report.get("issues", []))
-        weak_scores = [k for k, v in critique_report.get("scores", {}).items() if v < settings.min_critic_score]
-
-        # Send the prompt for transparency
         await send_agent_prompt(
             session_id,
             "editor",
             prompt,
-            reasoning=f"Revising draft to fix {issues_count} validation issues and improve {len(weak_scores)} weak dimensions: {weak_scores}"
+            reasoning=f"Requesting targeted edits for {targets} issues and weak dimensions"
         )
 
-        revised_draft = await self._call_anthropic(prompt, max_tokens=16000)
-        revised_word_count = len(revised_draft.split())
+        # Edits are roughly a paragraph each: budget output by issue count
+        _, result = await self._call_json_agent(
+            prompt, max_tokens=min(16000, 1000 + 1000 * max(targets, 1)), agent="editor",
+            session_id=session_id, context=story_context, required=("edits",)
+        )
+        edits = result.get("edits") if isinstance(result, dict) else result
+        revised_draft = apply_edits(paragraphs, edits)
+
+        logger.info(f"Applied {len(edits)} editor edits to {len(paragraphs)} paragraphs for session {session_id}")
 
-        # Send partial draft with revision
+        revised_word_count = len(revised_draft.split())
         await send_partial_draft(
             session_id,
             revised_draft,
             revised_word_count,
-            progress_message=f"Revision completed: {revised_word_count} words"
+            progress_message=f"Revision completed: {revised_word_count} words ({len(edits)} edits)"
         )
 
-        # Send the response for transparency
-        await send_agent_response(
-            session_id,
-            "editor",
-            revised_draft[:1000] + "..." if len(revised_draft) > 1000 else revised_draft,
-            summary=f"Revised draft: {revised_word_count} words, addressed {issues_count} issues"
-        )
+        return revised_draft
 
-        await self.session_manager.set_agent_status(session_id, "editor", "completed")
+    def _story_context(self, plot_structure: Dict, characters: Dict, style_guide: str) -> str:
+        """
+        Build the stable story context shared by the sharded writer and the
+        validation-loop agents.
 
-        await send_agent_update(
-            session_id,
-            "editor",
-            "completed",
-            f"Fixed {issues_count} issues, improved {len(weak_scores)} weak sections"
+        The text must be byte-identical across calls for the prompt cache to
+        hit, so it only contains the planning artifacts (never the draft).
+        """
+        return f"""You are part of a multi-agent literary team writing a story in BRAZILIAN PORTUGUESE (pt-BR).
+The planning artifacts below are the reference for every revision of the story.
+
+**Plot Structure:**
+```json
+{json.dumps(plot_structure, indent=2)}
+```
+
+**Characters:**
+```json
+{json.dumps(characters, indent=2)}
+```
+
+**Style Guide:**
+{style_guide}
+"""
+
+    async def _report_usage(self, session_id: str, agent: str, response: LLMResponse) -> None:
+        """
+        Log and broadcast the token usage of a single agent call.
+
+        Args:
+            session_id: Session identifier
+            agent: Name of the agent
+            response: Completed LLM response
+        """
+        if response is None:
+            return
+
+        usage = response.usage
+        cost = usage_cost(response.model, usage)
+        observe_usage(agent, response.model, usage)
+
+        totals = None
+        if session_id:
+            totals = await self.session_manager.record_usage(session_id, agent or "unknown", usage, cost)
+            if session_id in self._session_usage:
+                self._session_usage[session_id].update(totals)
+
+        logger.info(
+            f"LLM usage for {agent or 'unknown'} ({session_id}): "
+            f"input={usage.get('input_tokens', 0)} output={usage.get('output_tokens', 0)} "
+            f"cache_read={usage.get('cache_read_input_tokens', 0)} "
+            f"cache_write={usage.get('cache_creation_input_tokens', 0)} cost=${cost:.4f}"
         )
 
-        return revised_draft
+        if session_id and agent:
+            await send_agent_usage(
+                session_id, agent, usage, model=response.model,
+                cost_usd=cost, session_cost_usd=totals["cost_usd"]
+            )
+
+    def _usage_totals(self, session_id: str) -> Dict[str, Any]:
+        """Tokens and cost spent by a session so far (ConvergencePolicy arguments)"""
+        usage = self._session_usage.get(session_id, {})
+        return {"tokens_used": usage.get("tokens", 0), "cost_usd": usage.get("cost_usd", 0.0)}
+
+    def _budget_model(self, session_id: str, model: str) -> str:
+        """
+        Model to call for a session, given its cost budget.
+
+        Once the session has spent budget_downgrade_ratio of its budget,
+        every agent is served by the cheaper fallback model.
+
+        Args:
+            session_id: Session identifier
+            model: Model the agent's route asks for
+
+        Returns:
+            The model, or settings.budget_fallback_model
+        """
+        budget = self._session_budgets.get(session_id)
+        usage = self._session_usage.get(session_id)
+        if not budget or usage is None or model == settings.budget_fallback_model:
+            return model
+
+        if usage["cost_usd"] < budget * settings.budget_downgrade_ratio:
+            return model
+
+        if not usage.get("downgraded"):
+            usage["downgraded"] = True
+            logger.warning(
+                f"Session {session_id} spent ${usage['cost_usd']:.2f} of its ${budget:.2f} budget, "
+                f"switching agents to {settings.budget_fallback_model}"
+            )
+        return settings.budget_fallback_model
 
     def _extract_json(self, response: str) -> Dict:
         """
@@ -658,7 +1590,6 @@ Output only the story content, no meta-commentary.
             pass
 
         # Try to extract from markdown code block
-        import re
 
         # Look for ```json ... ``` or ``` ... ```
         json_pattern = r'```(?:json)?\s*\n?(.*?)\n?```'
@@ -685,37 +1616,265 @@ Output only the story content, no meta-commentary.
         logger.error(f"Failed to extract JSON from response: {response[:500]}")
         raise json.JSONDecodeError("Could not extract valid JSON from response", response, 0)
 
-    async def _call_anthropic(self, prompt: str, max_tokens: int = 4096) -> str:
+    async def _call_anthropic(
+        self,
+        prompt: str,
+        max_tokens: int = 4096,
+        agent: str = None,
+        session_id: str = None,
+        context: str = None,
+        cache: bool = False,
+        model: str = None
+    ) -> str:
         """
         Call Anthropic API with Claude model.
 
+        The model, token cap and timeout come from the agent's route in the
+        model routing table. The call waits for capacity from the global
+        rate limiter before it is sent, transient errors are retried with
+        backoff, and calls of the hedged agents race a backup request when
+        they run slower than usual.
+
         Args:
             prompt: The prompt to send
             max_tokens: Maximum tokens in response
+            agent: Name of the calling agent
+            session_id: Session the call belongs to (for usage reporting)
+            context: Stable prefix sent with a prompt-cache breakpoint
+            cache: Serve/store the response from the shared response cache
+            model: Model overriding the agent's route (e.g. on escalation)
 
         Returns:
             Response text
         """
+        self._check_cancelled(session_id)
+
+        route = model_router.route(agent)
+        model = model or self._budget_model(session_id, route.model)
+        max_tokens = min(max_tokens, route.max_tokens or max_tokens)
+
         try:
-            # Use asyncio to run sync Anthropic client in async context
-            loop = asyncio.get_event_loop()
-
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.anthropic_client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=max_tokens,
-                    messages=[{"role": "user", "content": prompt}]
+            cache_key = None
+            if cache and settings.response_cache_enabled:
+                cache_key = response_cache.make_key(
+                    agent, prompt, model=model, max_tokens=max_tokens, context=context
                 )
+                cached = await response_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Response cache hit for {agent}")
+                    return cached
+
+            timeout = route.timeout_seconds or settings.agent_timeout_seconds
+
+            async def attempt() -> LLMResponse:
+                with trace_span("llm.complete", agent=agent, model=model) as span:
+                    async with rate_limiter.limit(
+                        estimate_tokens(prompt, context) + max_tokens,
+                        priority=AGENT_PRIORITIES.get(agent, PRIORITY_NORMAL)
+                    ) as reservation:
+                        span.set_attribute("rate_limit.wait_ms", reservation.waited_seconds * 1000)
+                        with observe_llm_call(agent, model):
+                            response = await self.transport.complete(
+                                prompt,
+                                model=model,
+                                max_tokens=max_tokens,
+                                timeout=timeout,
+                                context=context
+                            )
+                        reservation.record(response.usage)
+                        record_usage(span, response.usage)
+
+                # Every completed request is billed, including a hedge that
+                # lost the race: count it even if hedged() cancels us now
+                await asyncio.shield(self._report_usage(session_id, agent, response))
+                return response
+
+            call = attempt
+            if agent in settings.llm_hedge_agents:
+                call = functools.partial(hedged, attempt, key=f"{agent}:{model}")
+
+            response = await with_retries(call, description=agent or "unknown")
+
+            if cache_key is not None and response.stop_reason == "end_turn":
+                await response_cache.set(cache_key, response.text)
+
+            return response.text
+
+        except Exception as e:
+            logger.error(f"Error calling Anthropic API: {e}", exc_info=True)
+            raise
+
+    async def _call_json_agent(
+        self,
+        prompt: str,
+        max_tokens: int,
+        agent: str,
+        session_id: str,
+        context: str = None,
+        required: Tuple[str, ...] = ()
+    ) -> Tuple[str, Dict]:
+        """
+        Call an agent that answers in JSON, escalating on unusable output.
+
+        If the response is not valid JSON with the required keys and the
+        agent's route names an `escalate_to` model, the call is retried once
+        with that model. Without one, only unparseable JSON is an error.
+
+        Args:
+            prompt: The prompt to send
+            max_tokens: Maximum tokens in response
+            agent: Name of the calling agent
+            session_id: Session the call belongs to
+            context: Stable prefix sent with a prompt-cache breakpoint
+            required: Keys the JSON object must contain
+
+        Returns:
+            Tuple of (response text, parsed JSON)
+
+        Raises:
+            ValueError: If no model produced parseable JSON
+        """
+        route = model_router.route(agent)
+        model = self._budget_model(session_id, route.model)
+
+        while True:
+            response = await self._call_anthropic(
+                prompt, max_tokens=max_tokens, agent=agent, session_id=session_id,
+                context=context, model=model
+            )
+
+            try:
+                result = self._extract_json(response)
+            except ValueError as e:
+                result, problem = None, e
+            else:
+                missing = [key for key in required if not isinstance(result, dict) or key not in result]
+                problem = f"missing keys {missing}" if missing else None
+
+            if problem is None:
+                return response, result
+
+            # Near the cost budget, the fallback model's answer has to do
+            can_escalate = bool(route.escalate_to) and (
+                self._budget_model(session_id, route.escalate_to) == route.escalate_to
             )
+            if can_escalate and model != route.escalate_to:
+                logger.warning(f"Unusable {agent} output from {model} ({problem}), escalating to {route.escalate_to}")
+                model = route.escalate_to
+                continue
 
-            return response.content[0].text
+            if result is None:
+                raise problem
+            # Nothing stronger to try: let the caller make do, as before routing
+            return response, result
+
+    async def _stream_draft(
+        self,
+        prompt: str,
+        session_id: str,
+        progress_label: str,
+        max_tokens: int = 16000,
+        agent: str = None,
+        context: str = None
+    ) -> str:
+        """
+        Stream a draft-producing agent and forward it paragraph by paragraph.
+
+        Tokens are buffered until a paragraph break, then sent as an
+        append-only partial_draft delta. The first delta replaces whatever
+        draft the client is showing, so a revision starts from a clean slate.
+
+        Args:
+            prompt: The prompt to send
+            session_id: Session identifier
+            progress_label: Prefix for the progress message of each delta
+            max_tokens: Maximum tokens in response
+            agent: Name of the calling agent
+            context: Stable prefix sent with a prompt-cache breakpoint
+
+        Returns:
+            Full draft text
+        """
+        self._check_cancelled(session_id)
+
+        route = model_router.route(agent)
+        model = self._budget_model(session_id, route.model)
+
+        paragraphs = []
+        buffer = ""
+        word_count = 0
+
+        async def flush(chunk: str) -> None:
+            nonlocal word_count
+            word_count += len(chunk.split())
+            await send_partial_draft(
+                session_id,
+                chunk,
+                word_count,
+                progress_message=f"{progress_label}: {word_count} words",
+                append=bool(paragraphs)
+            )
+            paragraphs.append(chunk)
+
+        max_tokens = min(max_tokens, route.max_tokens or max_tokens)
+        timeout = route.timeout_seconds or settings.agent_timeout_seconds
+
+        async def attempt() -> LLMStream:
+            nonlocal buffer
+
+            with trace_span("llm.stream", agent=agent, model=model) as span:
+                async with rate_limiter.limit(
+                    estimate_tokens(prompt, context) + max_tokens,
+                    priority=AGENT_PRIORITIES.get(agent, PRIORITY_NORMAL)
+                ) as reservation:
+                    span.set_attribute("rate_limit.wait_ms", reservation.waited_seconds * 1000)
+                    with observe_llm_call(agent, model):
+                        stream = self.transport.stream(
+                            prompt,
+                            model=model,
+                            max_tokens=max_tokens,
+                            timeout=timeout,
+                            context=context
+                        )
+
+                        async for delta in stream:
+                            buffer += delta
+                            while "\n\n" in buffer:
+                                paragraph, buffer = buffer.split("\n\n", 1)
+                                await flush(paragraph + "\n\n")
+
+                        if buffer:
+                            await flush(buffer)
+
+                    if stream.response is not None:
+                        reservation.record(stream.response.usage)
+                        record_usage(span, stream.response.usage)
+                    return stream
+
+        try:
+            # Text already sent to the client cannot be taken back, so only
+            # failures before the first delta are retried
+            stream = await with_retries(
+                attempt,
+                description=agent or "unknown",
+                retryable=lambda error: not paragraphs and not buffer and is_retryable(error)
+            )
+
+            await self._report_usage(session_id, agent, stream.response)
+
+            return "".join(paragraphs).strip()
 
         except Exception as e:
-            logger.error(f"Error calling Anthropic API: {e}", exc_info=True)
+            logger.error(f"Error streaming from Anthropic API: {e}", exc_info=True)
             raise
 
+    def _check_cancelled(self, session_id: str) -> None:
+        """Raise GenerationCancelled if the session's run was cancelled"""
+        token = self._cancellations.get(session_id)
+        if token is not None:
+            token.raise_if_cancelled()
+
     async def _get_iteration_count(self, session_id: str) -> int:
         """Get current iteration count from session"""
-        session = await self.session_manager.get_session(session_id)
-        return session.get("current_iteration", 0) if session else 0
+        session = await self.session_manager.get_session_fields(session_id, "current_iteration")
+        return (session.get("current_iteration") or 0) if session else 0
@@ -0,0 +1,297 @@
+import functools
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+import redis
+from opentelemetry import baggage, context, propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.trace import Span, Status, StatusCode
+
+from app.config import settings
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Baggage entry carrying the session id to every span of a run, including
+# spans created in a worker from the context propagated in the job payload
+SESSION_BAGGAGE_KEY = "session.id"
+
+SESSION_TRACE_TTL_SECONDS = 60 * 60 * 24  # same as the session itself
+
+tracer = trace.get_tracer("literary-agent-system")
+
+_provider: Optional[TracerProvider] = None
+
+
+def _trace_key(session_id: str) -> str:
+    return f"session:{session_id}:trace"
+
+
+def _span_record(span: ReadableSpan) -> Dict[str, Any]:
+    """Flat JSON representation of a finished span"""
+    parent = span.parent.span_id if span.parent else None
+    return {
+        "trace_id": format(span.context.trace_id, "032x"),
+        "span_id": format(span.context.span_id, "016x"),
+        "parent_id": format(parent, "016x") if parent else None,
+        "name": span.name,
+        "service": span.resource.attributes.get("service.name"),
+        "start_ns": span.start_time,
+        "end_ns": span.end_time,
+        "duration_ms": (span.end_time - span.start_time) / 1e6,
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {})
+    }
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends finished spans to a local file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(json.dumps(_span_record(span), default=str) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning(f"Failed to write spans to {self.path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+
+class SessionTraceExporter(SpanExporter):
+    """
+    Stores the spans of each session in Redis (session:{id}:trace).
+
+    Backs the per-session waterfall endpoint, whichever process (API or
+    worker) produced the spans. Runs in the batch processor's thread, so
+    it uses its own synchronous client.
+    """
+
+    def __init__(self):
+        self.client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        by_session: Dict[str, List[str]] = {}
+        for span in spans:
+            session_id = (span.attributes or {}).get(SESSION_BAGGAGE_KEY)
+            if session_id:
+                by_session.setdefault(session_id, []).append(json.dumps(_span_record(span), default=str))
+
+        if not by_session:
+            return SpanExportResult.SUCCESS
+
+        try:
+            with self.client.pipeline(transaction=False) as pipe:
+                for session_id, records in by_session.items():
+                    pipe.rpush(_trace_key(session_id), *records)
+                    pipe.expire(_trace_key(session_id), SESSION_TRACE_TTL_SECONDS)
+                pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to store session spans: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        self.client.close()
+
+
+class SessionSpanProcessor(SpanProcessor):
+    """Tags every span with the session id found in the context's baggage"""
+
+    def on_start(self, span: Span, parent_context: Optional[context.Context] = None) -> None:
+        session_id = baggage.get_baggage(SESSION_BAGGAGE_KEY, parent_context)
+        if session_id:
+            span.set_attribute(SESSION_BAGGAGE_KEY, str(session_id))
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        # The base class returns None, which stops the flush of the
+        # processors registered after this one
+        return True
+
+
+def init_tracing(service_name: str) -> None:
+    """
+    Install the tracer provider and its exporters for this process.
+
+    Spans go to the JSON Lines file (settings.tracing_file), to Redis for
+    the per-session waterfall, and to an OTLP collector when
+    settings.tracing_otlp_endpoint is set and the exporter is installed.
+
+    Args:
+        service_name: Name of the process kind ("api" or "worker")
+    """
+    global _provider
+
+    if not settings.tracing_enabled or _provider is not None:
+        return
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": f"literary-agent-{service_name}"}))
+    _provider.add_span_processor(SessionSpanProcessor())
+    _provider.add_span_processor(BatchSpanProcessor(SessionTraceExporter()))
+
+    if settings.tracing_file:
+        _provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(settings.tracing_file)))
+
+    if settings.tracing_otlp_endpoint:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("TRACING_OTLP_ENDPOINT is set but opentelemetry-exporter-otlp is not installed")
+        else:
+            _provider.add_span_processor(
+                BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint))
+            )
+
+    trace.set_tracer_provider(_provider)
+    logger.info(f"Tracing enabled for {service_name}")
+
+
+def shutdown_tracing() -> None:
+    """Flush and stop the span exporters"""
+    global _provider
+
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+@contextmanager
+def trace_span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Run a block inside a child span of the current one.
+
+    Exceptions are recorded on the span; cancellations are not errors.
+    """
+    with tracer.start_as_current_span(
+        name,
+        attributes={key: value for key, value in attributes.items() if value is not None},
+        record_exception=False,
+        set_status_on_exception=False
+    ) as span:
+        try:
+            yield span
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR, f"{type(e).__name__}: {e}"))
+            raise
+
+
+@contextmanager
+def session_span(
+    name: str,
+    session_id: str,
+    carrier: Optional[Dict[str, str]] = None,
+    **attributes: Any
+) -> Iterator[Span]:
+    """
+    Run a block inside a span of a session's trace.
+
+    The session id is put in the context's baggage, so every span created
+    below (in this task or tasks it starts) is tagged with it.
+
+    Args:
+        name: Span name
+        session_id: Session identifier
+        carrier: Trace context propagated from another process (see
+            inject_context); continues that trace instead of the current one
+        **attributes: Span attributes
+    """
+    parent = propagate.extract(carrier) if carrier else context.get_current()
+    token = context.attach(baggage.set_baggage(SESSION_BAGGAGE_KEY, session_id, context=parent))
+
+    try:
+        with trace_span(name, **attributes) as span:
+            yield span
+    finally:
+        context.detach(token)
+
+
+def record_usage(span: Span, usage: Dict[str, int]) -> None:
+    """Set the token usage of an LLM call as span attributes"""
+    span.set_attributes({f"llm.{key}": value for key, value in (usage or {}).items() if value is not None})
+
+
+def inject_context() -> Dict[str, str]:
+    """Serialize the current trace context (and baggage) for another process"""
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+def traced(name: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorate a coroutine function to run inside a span"""
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with trace_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def get_session_waterfall(session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Build the span waterfall of a session.
+
+    Args:
+        session_id: Session identifier
+
+    Returns:
+        Spans in start order with their offset from the first span, depth
+        and duration, plus the total time per span name; None if the
+        session has no recorded spans
+    """
+    client = await get_redis()
+    records = [json.loads(record) for record in await client.lrange(_trace_key(session_id), 0, -1)]
+    if not records:
+        return None
+
+    records.sort(key=lambda record: record["start_ns"])
+    by_id = {record["span_id"]: record for record in records}
+    started = records[0]["start_ns"]
+    ended = max(record["end_ns"] for record in records)
+
+    def depth(record: Dict[str, Any]) -> int:
+        level = 0
+        while record["parent_id"] in by_id and level < 50:
+            record = by_id[record["parent_id"]]
+            level += 1
+        return level
+
+    summary: Dict[str, Dict[str, float]] = {}
+    for record in records:
+        entry = summary.setdefault(record["name"], {"count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += record["duration_ms"]
+
+    return {
+        "session_id": session_id,
+        "trace_ids": sorted({record["trace_id"] for record in records}),
+        "duration_ms": (ended - started) / 1e6,
+        "spans": [
+            {
+                "name": record["name"],
+                "service": record["service"],
+                "depth": depth(record),
+                "offset_ms": (record["start_ns"] - started) / 1e6,
+                "duration_ms": record["duration_ms"],
+                "status": record["status"],
+                "attributes": {
+                    key: value for key, value in record["attributes"].items() if key != SESSION_BAGGAGE_KEY
+                }
+            }
+            for record in records
+        ],
+        "summary": dict(sorted(summary.items(), key=lambda item: -item[1]["total_ms"]))
+    }
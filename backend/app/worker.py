@@ -0,0 +1,139 @@
+"""
+Story generation worker.
+
+Claims jobs from the Redis job queue and runs the generation pipeline,
+independently of the API processes. Run with:
+
+    python -m app.worker
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import Set
+
+from app.config import settings
+from app.models.story_request import StoryRequest
+from app.services.job_queue import Job, job_queue
+from app.services.llm_client import close_transport
+from app.services.metrics import start_metrics_server
+from app.services.event_bus import event_bus
+from app.services.redis_client import close_redis
+from app.services.session_manager import SessionManager
+from app.services.story_service import StoryGenerationService
+from app.services.tracing import init_tracing, shutdown_tracing
+
+logging.basicConfig(
+    level=logging.INFO if settings.debug else logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Runs up to `worker_concurrency` story generation jobs at a time"""
+
+    def __init__(self):
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self.story_service = StoryGenerationService()
+        self.session_manager = SessionManager()
+        self.slots = asyncio.Semaphore(settings.worker_concurrency)
+        self.tasks: Set[asyncio.Task] = set()
+        self.stopping = asyncio.Event()
+
+    async def run(self) -> None:
+        """Claim and run jobs until stopped"""
+        logger.info(f"Worker {self.name} started (concurrency={settings.worker_concurrency})")
+
+        while not self.stopping.is_set():
+            await self.slots.acquire()
+
+            try:
+                job = await job_queue.claim(self.name)
+            except Exception as e:
+                self.slots.release()
+                logger.error(f"Error claiming job: {e}", exc_info=True)
+                await asyncio.sleep(1)
+                continue
+
+            if job is None:
+                self.slots.release()
+                continue
+
+            task = asyncio.create_task(self.process(job))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+        # Jobs still running are not acked: another worker picks them up
+        # once their visibility timeout expires
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        logger.info(f"Worker {self.name} stopped")
+
+    async def process(self, job: Job) -> None:
+        """Run a single job, heartbeating while it is in progress"""
+        heartbeat = asyncio.create_task(self.heartbeat(job))
+
+        try:
+            if job.deliveries > settings.job_max_deliveries:
+                logger.error(f"Job {job.id} exceeded {settings.job_max_deliveries} deliveries")
+                await self.session_manager.fail_session(
+                    job.session_id, "Generation was interrupted too many times"
+                )
+            else:
+                request = StoryRequest(**job.payload["request"])
+                await self.story_service.generate_story(
+                    request, job.session_id, trace_context=job.payload.get("trace_context")
+                )
+
+            await job_queue.ack(job)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # generate_story already marked the session as failed
+            logger.error(f"Job {job.id} for session {job.session_id} failed: {e}")
+            await job_queue.ack(job)
+        finally:
+            heartbeat.cancel()
+            self.slots.release()
+
+    async def heartbeat(self, job: Job) -> None:
+        """Keep a job claimed while it is running"""
+        while True:
+            await asyncio.sleep(settings.job_heartbeat_seconds)
+            try:
+                await job_queue.heartbeat(job, self.name)
+            except Exception as e:
+                logger.warning(f"Heartbeat failed for job {job.id}: {e}")
+
+    def stop(self) -> None:
+        """Stop claiming new jobs"""
+        logger.info(f"Worker {self.name} stopping")
+        self.stopping.set()
+
+
+async def main() -> None:
+    worker = Worker()
+    start_metrics_server()
+    init_tracing("worker")
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await close_transport()
+        await event_bus.close()
+        await close_redis()
+        shutdown_tracing()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,409 @@
+"""
+End-to-end benchmark of the story generation pipeline.
+
+Runs concurrent sessions through StoryGenerationService, SessionManager,
+Redis and the websocket endpoint, with a simulated LLM in place of the
+Anthropic API, and reports throughput, per-phase and per-agent latency
+percentiles, websocket traffic and Redis operations per session. Needs a
+Redis server (REDIS_URL); use a dedicated database for clean numbers.
+
+Run from the backend directory:
+
+    python -m benchmarks.pipeline --sessions 20 --time-scale 0.1
+    python -m benchmarks.pipeline --sessions 50 --latency writer=lognormal:2:0.5 --json baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.config import settings
+from app.models.story_request import StoryRequest
+from app.api.routes.websocket import websocket_endpoint
+from app.services.event_bus import event_bus
+from app.services.llm_client import close_transport, set_transport
+from app.services.redis_client import close_redis, get_redis
+from app.services.story_service import StoryGenerationService
+from benchmarks.simulated_llm import SimulatedTransport, parse_distribution
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+BENCHMARK_REQUEST = {
+    "plot": (
+        "Um jovem bibliotecário descobre um livro amaldiçoado que revela "
+        "segredos sombrios sobre sua cidade."
+    ),
+    "author_style": "Carlos Ruiz Zafón",
+    "genre": "terror",
+    "target_audience": "adulto"
+}
+
+
+class BenchmarkWebSocket:
+    """
+    In-memory stand-in for a client websocket.
+
+    Implements the subset of the Starlette WebSocket used by the websocket
+    endpoint and records every message sent, with its arrival time and
+    encoded size.
+    """
+
+    def __init__(self):
+        self.messages: List[Tuple[float, Dict[str, Any]]] = []
+        self.bytes_sent = 0
+        self.connected = asyncio.Event()
+        self._closed = asyncio.Event()
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_json(self, data: Dict[str, Any]) -> None:
+        # Same encoding as starlette's WebSocket.send_json
+        self.bytes_sent += len(json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        self.messages.append((time.monotonic(), data))
+        if data.get("type") == "connection":
+            self.connected.set()
+
+    async def receive(self) -> Dict[str, Any]:
+        await self._closed.wait()
+        return {"type": "websocket.disconnect"}
+
+    async def close(self) -> None:
+        self._closed.set()
+
+    def events(self) -> List[Tuple[float, Dict[str, Any]]]:
+        """Broadcast events received, unwrapped"""
+        return [(at, message["data"]) for at, message in self.messages if message.get("type") == "broadcast"]
+
+
+@dataclass
+class SessionResult:
+    """Measurements of one benchmark session"""
+
+    session_id: str
+    status: str
+    seconds: float
+    first_draft_seconds: Optional[float] = None  # until the first partial_draft delta
+    phases: Dict[str, float] = field(default_factory=dict)  # seconds spent in each phase
+    agents: Dict[str, List[float]] = field(default_factory=dict)  # seconds per agent run
+    websocket_messages: int = 0
+    websocket_bytes: int = 0
+    iterations: int = 0
+    error: Optional[str] = None
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    """Count, mean and percentiles of a series"""
+    summary = {"count": len(values), "mean": sum(values) / len(values) if values else None}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = percentile(values, p)
+    return summary
+
+
+def phase_durations(started: float, ended: float, events: List[Tuple[float, Dict]]) -> Dict[str, float]:
+    """Time spent in each phase, from the progress events of a session"""
+    durations: Dict[str, float] = defaultdict(float)
+    current, since = "queued", started
+
+    for at, event in events:
+        phase = event.get("phase") if event.get("type") == "progress" else None
+        if phase and phase != current:
+            durations[current] += at - since
+            current, since = phase, at
+
+    durations[current] += ended - since
+    return dict(durations)
+
+
+def agent_durations(events: List[Tuple[float, Dict]]) -> Dict[str, List[float]]:
+    """Duration of each agent run, from its starting/completed updates"""
+    started: Dict[str, float] = {}
+    durations: Dict[str, List[float]] = defaultdict(list)
+
+    for at, event in events:
+        if event.get("type") != "agent_update":
+            continue
+        agent, status = event.get("agent"), event.get("status")
+        if status == "starting":
+            started.setdefault(agent, at)
+        elif status in ("completed", "failed") and agent in started:
+            durations[agent].append(at - started.pop(agent))
+
+    return dict(durations)
+
+
+async def redis_snapshot(client: redis.Redis) -> Optional[Dict[str, Any]]:
+    """Command counts and network bytes from INFO, or None if unsupported"""
+    try:
+        commands = await client.info("commandstats")
+        stats = await client.info("stats")
+    except redis.ResponseError as e:
+        logger.warning(f"Redis INFO unavailable, skipping Redis stats: {e}")
+        return None
+
+    return {
+        "commands": {name.replace("cmdstat_", "", 1): value["calls"] for name, value in commands.items()},
+        "net_input_bytes": stats.get("total_net_input_bytes", 0),
+        "net_output_bytes": stats.get("total_net_output_bytes", 0)
+    }
+
+
+def redis_delta(before: Optional[Dict], after: Optional[Dict], sessions: int) -> Optional[Dict[str, Any]]:
+    """Redis operations and bytes per session between two snapshots"""
+    if before is None or after is None or not sessions:
+        return None
+
+    commands = {
+        name: calls - before["commands"].get(name, 0)
+        for name, calls in after["commands"].items()
+        if name != "info" and calls > before["commands"].get(name, 0)
+    }
+    total = sum(commands.values())
+
+    return {
+        "ops_per_session": total / sessions,
+        "bytes_in_per_session": (after["net_input_bytes"] - before["net_input_bytes"]) / sessions,
+        "bytes_out_per_session": (after["net_output_bytes"] - before["net_output_bytes"]) / sessions,
+        "top_commands": dict(sorted(commands.items(), key=lambda item: -item[1])[:10])
+    }
+
+
+async def run_session(service: StoryGenerationService, request: StoryRequest) -> SessionResult:
+    """Run one session end to end, watched by a simulated websocket client"""
+    session_id = str(uuid.uuid4())
+    await service.session_manager.create_session(session_id, request.model_dump(mode="json"))
+
+    websocket = BenchmarkWebSocket()
+    watcher = asyncio.create_task(websocket_endpoint(websocket, session_id))
+    await websocket.connected.wait()
+
+    started = time.monotonic()
+    error = None
+    try:
+        await service.generate_story(request, session_id)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    ended = time.monotonic()
+
+    # The endpoint closes the socket once it has sent the final state
+    try:
+        await asyncio.wait_for(watcher, timeout=10)
+    except asyncio.TimeoutError:
+        await websocket.close()
+
+    session = await service.session_manager.get_session_fields(session_id, "status", "current_iteration")
+    events = websocket.events()
+    first_draft = next((at for at, event in events if event.get("type") == "partial_draft"), None)
+
+    return SessionResult(
+        session_id=session_id,
+        status=(session or {}).get("status", "unknown"),
+        seconds=ended - started,
+        first_draft_seconds=first_draft - started if first_draft else None,
+        phases=phase_durations(started, ended, events),
+        agents=agent_durations(events),
+        websocket_messages=len(websocket.messages),
+        websocket_bytes=websocket.bytes_sent,
+        iterations=(session or {}).get("current_iteration") or 0,
+        error=error
+    )
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the configured sessions and aggregate their measurements"""
+    responses = None
+    if args.responses:
+        with open(args.responses) as f:
+            responses = json.load(f)
+
+    transport = SimulatedTransport(
+        latency={agent: parse_distribution(spec) for agent, spec in args.latency},
+        tokens_per_second=args.tokens_per_second,
+        time_scale=args.time_scale,
+        error_rate=args.error_rate,
+        responses=responses,
+        seed=args.seed
+    )
+    set_transport(transport)
+
+    request = StoryRequest(**BENCHMARK_REQUEST, word_count_target=args.words)
+    service = StoryGenerationService()
+    slots = asyncio.Semaphore(args.concurrency or args.sessions)
+
+    async def limited() -> SessionResult:
+        async with slots:
+            return await run_session(service, request)
+
+    client = await get_redis()
+    before = await redis_snapshot(client)
+    started = time.monotonic()
+
+    results = await asyncio.gather(*(limited() for _ in range(args.sessions)))
+
+    elapsed = time.monotonic() - started
+    after = await redis_snapshot(client)
+
+    phases: Dict[str, List[float]] = defaultdict(list)
+    agents: Dict[str, List[float]] = defaultdict(list)
+    for result in results:
+        for phase, seconds in result.phases.items():
+            phases[phase].append(seconds)
+        for agent, runs in result.agents.items():
+            agents[agent].extend(runs)
+
+    statuses: Dict[str, int] = defaultdict(int)
+    for result in results:
+        statuses[result.status] += 1
+
+    return {
+        "config": {
+            "sessions": args.sessions,
+            "concurrency": args.concurrency or args.sessions,
+            "words": args.words,
+            "time_scale": args.time_scale,
+            "tokens_per_second": args.tokens_per_second,
+            "error_rate": args.error_rate,
+            "rate_limit": settings.llm_rate_limit_enabled,
+            "writer_mode": settings.writer_mode,
+            "editor_mode": settings.editor_mode
+        },
+        "elapsed_seconds": elapsed,
+        "sessions_per_minute": len(results) / elapsed * 60 if elapsed else None,
+        "statuses": dict(statuses),
+        "session_seconds": summarize([r.seconds for r in results]),
+        "first_draft_seconds": summarize([r.first_draft_seconds for r in results if r.first_draft_seconds]),
+        "phase_seconds": {phase: summarize(values) for phase, values in phases.items()},
+        "agent_seconds": {agent: summarize(values) for agent, values in sorted(agents.items())},
+        "llm_call_seconds": {
+            agent: summarize(values) for agent, values in sorted(transport.call_latencies.items())
+        },
+        "llm_calls": transport.calls,
+        "llm_errors": transport.errors,
+        "websocket": {
+            "messages_per_session": sum(r.websocket_messages for r in results) / len(results),
+            "bytes_per_session": sum(r.websocket_bytes for r in results) / len(results)
+        },
+        "redis": redis_delta(before, after, len(results)),
+        "errors": [r.error for r in results if r.error][:10],
+        "sessions_detail": [asdict(r) for r in results] if args.detail else None
+    }
+
+
+def _format_summary(summary: Dict[str, Optional[float]]) -> str:
+    values = " ".join(
+        f"p{p}={summary[f'p{p}']:.3f}s" if summary[f"p{p}"] is not None else f"p{p}=-"
+        for p in PERCENTILES
+    )
+    return f"n={summary['count']:<4} {values}"
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Print a benchmark report in a readable form"""
+    config = report["config"]
+    print(f"Sessions: {config['sessions']} (concurrency {config['concurrency']}, {config['words']} words, "
+          f"time scale {config['time_scale']}, rate limit {'on' if config['rate_limit'] else 'off'})")
+    print(f"Statuses: {report['statuses']}")
+    print(f"Elapsed: {report['elapsed_seconds']:.2f}s, throughput {report['sessions_per_minute']:.1f} sessions/min")
+    print(f"LLM calls: {report['llm_calls']} ({report['llm_errors']} simulated errors)")
+    print()
+    print(f"{'session':<24}{_format_summary(report['session_seconds'])}")
+    print(f"{'first draft delta':<24}{_format_summary(report['first_draft_seconds'])}")
+
+    print("\nPhases")
+    for phase, summary in report["phase_seconds"].items():
+        print(f"  {phase:<22}{_format_summary(summary)}")
+
+    print("\nAgents (end to end / simulated LLM)")
+    for agent, summary in report["agent_seconds"].items():
+        print(f"  {agent:<22}{_format_summary(summary)}")
+        llm = report["llm_call_seconds"].get(agent)
+        if llm:
+            print(f"  {'':<22}{_format_summary(llm)}")
+
+    websocket = report["websocket"]
+    print(f"\nWebsocket: {websocket['messages_per_session']:.0f} messages, "
+          f"{websocket['bytes_per_session'] / 1024:.1f} KiB per session")
+
+    redis_stats = report["redis"]
+    if redis_stats:
+        print(f"Redis: {redis_stats['ops_per_session']:.0f} ops, "
+              f"{redis_stats['bytes_in_per_session'] / 1024:.1f} KiB in, "
+              f"{redis_stats['bytes_out_per_session'] / 1024:.1f} KiB out per session")
+        print(f"  top commands: {redis_stats['top_commands']}")
+    else:
+        print("Redis: stats unavailable (server does not support INFO)")
+
+    for error in report["errors"]:
+        print(f"Error: {error}")
+
+
+def _agent_spec(value: str) -> Tuple[str, str]:
+    agent, sep, spec = value.partition("=")
+    if not sep:
+        agent, spec = "default", value
+    parse_distribution(spec)
+    return agent, spec
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the story pipeline against a simulated LLM")
+    parser.add_argument("--sessions", type=int, default=10, help="sessions to run")
+    parser.add_argument("--concurrency", type=int, default=0, help="sessions in flight at once (default: all)")
+    parser.add_argument("--words", type=int, default=5000, help="word_count_target of each story (min 5000)")
+    parser.add_argument(
+        "--latency", type=_agent_spec, action="append", default=[],
+        help="time to first token, [agent=]fixed:<s> | uniform:<lo>:<hi> | lognormal:<median>:<sigma> "
+             "(repeatable; without agent= sets the default)"
+    )
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="simulated output rate")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="multiplier applied to every simulated delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of LLM calls failing transiently")
+    parser.add_argument("--responses", help="JSON file of canned outputs per agent (e.g. {\"writer\": \"# ...\"})")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--rate-limit", action="store_true", help="keep the global LLM rate limiter on")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--detail", action="store_true", help="include per-session measurements in the JSON")
+    return parser.parse_args(argv)
+
+
+async def main(argv: List[str] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(name)s - %(message)s")
+
+    # Measure the orchestration, not the configured API limits
+    settings.llm_rate_limit_enabled = args.rate_limit
+
+    try:
+        report = await run_benchmark(args)
+    finally:
+        await close_transport()
+        await event_bus.close()
+        await close_redis()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,173 @@
+import asyncio
+import math
+import random
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import httpx
+from anthropic import APIConnectionError
+
+from app.services.llm_client import DEFAULT_MODEL, FakeTransport, LLMResponse, LLMStream
+
+# Rough characters per token of the canned outputs
+CHARS_PER_TOKEN = 4
+
+# Shortest pause taken while simulating generation; shorter delays are
+# accumulated so long outputs do not turn into thousands of tiny sleeps
+MIN_SLEEP_SECONDS = 0.005
+
+
+@dataclass
+class LatencyDistribution:
+    """Time-to-first-token distribution of a simulated agent call"""
+
+    kind: str  # "fixed", "uniform" or "lognormal"
+    a: float  # fixed value, uniform low bound or lognormal median (seconds)
+    b: float = 0.0  # uniform high bound or lognormal sigma
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        return rng.lognormvariate(math.log(self.a), self.b)
+
+
+def parse_distribution(spec: str) -> LatencyDistribution:
+    """
+    Parse a latency distribution spec.
+
+    Specs are "fixed:<s>", "uniform:<low>:<high>" or
+    "lognormal:<median>:<sigma>"; a bare number means fixed.
+
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    kind, *params = spec.split(":")
+    try:
+        if not params:
+            return LatencyDistribution("fixed", float(kind))
+        values = [float(p) for p in params]
+    except ValueError:
+        raise ValueError(f"Invalid latency distribution: {spec!r}") from None
+
+    if kind == "fixed" and len(values) == 1:
+        return LatencyDistribution("fixed", values[0])
+    if kind in ("uniform", "lognormal") and len(values) == 2 and values[0] > 0:
+        return LatencyDistribution(kind, values[0], values[1])
+    raise ValueError(f"Invalid latency distribution: {spec!r}")
+
+
+# Time to first token per agent, loosely modelled on production calls
+DEFAULT_LATENCY_PROFILE: Dict[str, LatencyDistribution] = {
+    "default": LatencyDistribution("lognormal", 2.0, 0.4),
+    "plot-architect": LatencyDistribution("lognormal", 3.0, 0.4),
+    "character-designer": LatencyDistribution("lognormal", 2.0, 0.4),
+    "style-master": LatencyDistribution("lognormal", 2.5, 0.4),
+    "writer": LatencyDistribution("lognormal", 1.5, 0.3),
+    "consistency-validator": LatencyDistribution("lognormal", 3.0, 0.5),
+    "literary-critic": LatencyDistribution("lognormal", 3.0, 0.5),
+    "editor": LatencyDistribution("lognormal", 2.0, 0.4)
+}
+
+
+class SimulatedTransport(FakeTransport):
+    """
+    FakeTransport with realistic timing, for benchmarks.
+
+    Each call waits a time to first token drawn from the agent's latency
+    distribution, then generates its canned output at `tokens_per_second`
+    (streamed calls emit deltas at that rate). All delays are multiplied
+    by `time_scale`, so a run can be compressed while keeping its shape.
+    A share of calls (`error_rate`) fails with a connection error before
+    the first token.
+    """
+
+    def __init__(
+        self,
+        latency: Dict[str, LatencyDistribution] = None,
+        tokens_per_second: float = 80.0,
+        time_scale: float = 1.0,
+        error_rate: float = 0.0,
+        responses: Optional[Dict[str, str]] = None,
+        seed: Optional[int] = None
+    ):
+        super().__init__(responses=responses)
+        self.latency = {**DEFAULT_LATENCY_PROFILE, **(latency or {})}
+        self.tokens_per_second = tokens_per_second
+        self.time_scale = time_scale
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+        self.call_latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors = 0
+
+    async def _first_token(self, agent: str) -> None:
+        """Wait for the first token, or fail the call"""
+        distribution = self.latency.get(agent) or self.latency["default"]
+        await asyncio.sleep(distribution.sample(self.rng) * self.time_scale)
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise APIConnectionError(
+                message="Simulated connection error",
+                request=httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+            )
+
+    def _generation_seconds(self, text: str) -> float:
+        return len(text) / CHARS_PER_TOKEN / self.tokens_per_second * self.time_scale
+
+    async def complete(
+        self,
+        prompt: str,
+        *,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = 4096,
+        timeout: Optional[float] = None,
+        context: Optional[str] = None
+    ) -> LLMResponse:
+        started = time.monotonic()
+        agent = self.agent_for(prompt)
+
+        await self._first_token(agent)
+        response = await super().complete(
+            prompt, model=model, max_tokens=max_tokens, timeout=timeout, context=context
+        )
+        await asyncio.sleep(self._generation_seconds(response.text))
+
+        self.call_latencies[agent].append(time.monotonic() - started)
+        return response
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = 4096,
+        timeout: Optional[float] = None,
+        context: Optional[str] = None
+    ) -> LLMStream:
+        async def events():
+            started = time.monotonic()
+            agent = self.agent_for(prompt)
+
+            await self._first_token(agent)
+            response = await super(SimulatedTransport, self).complete(
+                prompt, model=model, max_tokens=max_tokens, timeout=timeout, context=context
+            )
+
+            pending = 0.0
+            for token in re.findall(r"\S+\s*|\s+", response.text):
+                pending += self._generation_seconds(token)
+                if pending >= MIN_SLEEP_SECONDS:
+                    await asyncio.sleep(pending)
+                    pending = 0.0
+                yield token
+
+            self.call_latencies[agent].append(time.monotonic() - started)
+            yield response
+
+        return LLMStream(events())
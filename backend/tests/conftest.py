@@ -0,0 +1,5 @@
+import os
+
+# Required settings without defaults; no test talks to these services
+for name in ("ANTHROPIC_API_KEY", "DATABASE_URL", "DATABASE_URL_SYNC", "SECRET_KEY"):
+    os.environ.setdefault(name, "test")
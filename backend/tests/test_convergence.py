@@ -0,0 +1,12 @@
+from app.services.convergence import ConvergencePolicy
+
+
+def test_time_budget_counts_earlier_runs():
+    policy = ConvergencePolicy(time_budget_seconds=60, token_budget=0, cost_budget_usd=0)
+    assert policy.budget_reason() is None
+
+    resumed = ConvergencePolicy(
+        time_budget_seconds=60, token_budget=0, cost_budget_usd=0, elapsed_seconds=61
+    )
+    assert resumed.elapsed_seconds >= 61
+    assert resumed.budget_reason().startswith("time budget spent")
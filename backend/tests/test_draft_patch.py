@@ -0,0 +1,94 @@
+import pytest
+
+from app.services.draft_patch import (
+    PatchError,
+    apply_edits,
+    apply_text_delta,
+    diff_paragraphs,
+    join_paragraphs,
+    split_paragraphs,
+    text_delta
+)
+
+PARAGRAPHS = ["# Title", "First.", "Second.", "Third."]
+
+
+def test_split_paragraphs_ignores_blank_runs():
+    draft = "# Title\n\n\nFirst.\n  \nSecond.\n\n"
+    assert split_paragraphs(draft) == ["# Title", "First.", "Second."]
+    assert split_paragraphs(join_paragraphs(PARAGRAPHS)) == PARAGRAPHS
+
+
+def test_apply_edits_replace():
+    edits = [{"paragraph": "P3", "action": "replace", "text": "Second, revised."}]
+    assert split_paragraphs(apply_edits(PARAGRAPHS, edits)) == ["# Title", "First.", "Second, revised.", "Third."]
+
+
+def test_apply_edits_insert_after():
+    edits = [
+        {"paragraph": "P0", "action": "insert_after", "text": "Epigraph."},
+        {"paragraph": "[P2]", "action": "insert_after", "text": "First and a half."}
+    ]
+    assert split_paragraphs(apply_edits(PARAGRAPHS, edits)) == [
+        "Epigraph.", "# Title", "First.", "First and a half.", "Second.", "Third."
+    ]
+
+
+def test_apply_edits_delete():
+    edits = [{"paragraph": 3, "action": "delete"}]
+    assert split_paragraphs(apply_edits(PARAGRAPHS, edits)) == ["# Title", "First.", "Third."]
+
+
+@pytest.mark.parametrize("edits", [
+    [],
+    [{"paragraph": "P5", "action": "replace", "text": "Out of range."}],
+    [{"paragraph": "P0", "action": "replace", "text": "P0 only inserts."}],
+    [{"paragraph": "X1", "action": "delete"}],
+    [{"paragraph": "P2", "action": "rewrite", "text": "Unknown action."}],
+    [{"paragraph": "P2", "action": "replace", "text": ""}],
+    [{"paragraph": "P2", "action": "delete"}, {"paragraph": "P2", "action": "replace", "text": "Twice."}]
+])
+def test_apply_edits_rejects_invalid_edits(edits):
+    with pytest.raises(PatchError):
+        apply_edits(PARAGRAPHS, edits)
+
+
+def test_diff_paragraphs_replace():
+    diff = diff_paragraphs(PARAGRAPHS, ["# Title", "First.", "Second, revised.", "Third."])
+    assert diff.changed == [3]
+    assert diff.old_to_new == {1: 1, 2: 2, 4: 4}
+    assert not diff.identical
+
+
+def test_diff_paragraphs_insert():
+    diff = diff_paragraphs(PARAGRAPHS, ["# Title", "First.", "New.", "Second.", "Third."])
+    assert diff.changed == [3]
+    assert diff.old_to_new == {1: 1, 2: 2, 3: 4, 4: 5}
+
+
+def test_diff_paragraphs_delete_marks_neighbours():
+    diff = diff_paragraphs(PARAGRAPHS, ["# Title", "First.", "Third."])
+    assert diff.changed == [2, 3]
+    assert diff.old_to_new == {1: 1, 2: 2, 4: 3}
+    assert not diff.identical
+
+
+def test_diff_paragraphs_identical():
+    diff = diff_paragraphs(PARAGRAPHS, list(PARAGRAPHS))
+    assert diff.changed == []
+    assert diff.identical
+
+
+@pytest.mark.parametrize("old, new", [
+    ("# Title\n\nFirst.\n\nSecond.", "# Title\n\nFirst, revised.\n\nSecond."),
+    ("# Title\n\nFirst.", "# Title\n\nFirst.\n\nAdded.\n\nAnd more."),
+    ("# Title\n\nFirst.\n\nSecond.\n\nThird.", "# Title\n\nThird."),
+    ("", "Streamed so far"),
+    ("Line\r\nwith \u2028 separators", "Line\r\nwith \u2028 separators\nand an end\n"),
+    ("Same text", "Same text"),
+])
+def test_text_delta_round_trip(old, new):
+    delta = text_delta(old, new)
+    assert apply_text_delta(old, delta) == new
+    if old == new:
+        assert delta == []
@@ -0,0 +1,33 @@
+from app.services.draft_patch import diff_paragraphs
+from app.services.story_service import StoryGenerationService
+
+OLD = ["# Title", "First.", "Second.", "Third."]
+
+
+def test_issues_next_to_a_deletion_are_rechecked_not_carried():
+    service = StoryGenerationService()
+    diff = diff_paragraphs(OLD, ["# Title", "Second.", "Third."])  # P2 deleted
+    issues = [
+        {"severity": "high", "paragraphs": ["P3"], "description": "Next to the cut"},
+        {"severity": "low", "paragraphs": ["P4"], "description": "Untouched"},
+        {"severity": "high", "paragraphs": ["P2"], "description": "Deleted"}
+    ]
+
+    carried, rechecked = service._split_issues(issues, diff)
+
+    assert diff.changed == [1, 2]
+    assert carried == [{"severity": "low", "paragraphs": ["P3"], "description": "Untouched"}]
+    assert [issue["description"] for issue in rechecked] == ["Next to the cut", "Deleted"]
+
+
+def test_merged_status_ignores_resolved_rechecked_issues():
+    service = StoryGenerationService()
+    diff = diff_paragraphs(OLD, ["# Title", "Second.", "Third."])
+    carried, _ = service._split_issues(
+        [{"severity": "high", "paragraphs": ["P3"], "description": "Next to the cut"}], diff
+    )
+
+    merged = service._merge_validation({"status": "PASSED", "issues": []}, carried, diff)
+
+    assert merged["status"] == "PASSED"
+    assert merged["issues"] == []
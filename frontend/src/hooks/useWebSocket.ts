@@ -1,8 +1,27 @@
 import { useEffect, useRef, useState } from 'react';
-import { WebSocketMessage, AgentUpdate } from '@/types/story';
+import { WebSocketMessage, AgentUpdate, TextDelta } from '@/types/story';
 
 const WS_URL = process.env.NEXT_PUBLIC_WS_URL || 'ws://localhost:8000';
 
+const RECONNECT_MIN_DELAY_MS = 1000;
+const RECONNECT_MAX_DELAY_MS = 10000;
+
+// Apply a line delta (protocol v2) to the text it was computed against
+export function applyTextDelta(text: string, delta: TextDelta): string {
+  const lines = text.split('\n');
+  for (let i = delta.length - 1; i >= 0; i--) {
+    const [start, end, replacement] = delta[i];
+    lines.splice(start, end - start, ...replacement);
+  }
+  return lines.join('\n');
+}
+
+// Text the server's deltas apply to, with the seq of the event that produced it
+interface BaseText {
+  text: string;
+  seq: number;
+}
+
 export function useWebSocket(sessionId: string | null) {
   const [messages, setMessages] = useState<WebSocketMessage[]>([]);
   const [agentUpdates, setAgentUpdates] = useState<AgentUpdate[]>([]);
@@ -10,22 +29,71 @@ export function useWebSocket(sessionId: string | null) {
   const [progress, setProgress] = useState<number>(0);
   const [partialDraft, setPartialDraft] = useState<{ content: string; wordCount: number } | null>(null);
   const wsRef = useRef<WebSocket | null>(null);
+  // Sequence number of the last event received, to resume after a reconnect
+  const lastSeqRef = useRef<number>(0);
+  // Draft ("draft") and last prompt per agent ("prompt:<agent>"): bases of the deltas sent by the server
+  const textsRef = useRef<Record<string, BaseText>>({});
 
   useEffect(() => {
     if (!sessionId) return;
 
-    const ws = new WebSocket(`${WS_URL}/ws/${sessionId}`);
-    wsRef.current = ws;
+    lastSeqRef.current = 0;
+    textsRef.current = {};
+
+    let finished = false;
+    let resyncing = false;
+    let reconnectDelay = RECONNECT_MIN_DELAY_MS;
+    let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+
+    // Our copy of a text no longer matches the server's: ask for a snapshot (once)
+    const requestResync = () => {
+      const ws = wsRef.current;
+      if (resyncing || !ws || ws.readyState !== WebSocket.OPEN) return;
+      resyncing = true;
+      ws.send(JSON.stringify({ type: 'resync' }));
+    };
 
-    ws.onopen = () => {
-      setIsConnected(true);
-      console.log('WebSocket connected');
+    // Rebuild the full text of an update: deltas and appends name the seq of the
+    // text they apply to (base_seq); null if we hold another text
+    const updateText = (
+      base: string,
+      seq: number,
+      text: string | undefined,
+      delta: TextDelta | undefined,
+      baseSeq: number | undefined
+    ): string | null => {
+      const previous = textsRef.current[base];
+      let current = text ?? '';
+      if (baseSeq !== undefined) {
+        if (!previous || previous.seq !== baseSeq) {
+          console.warn(`Cannot apply update to ${base}: text of seq ${baseSeq} missing, resyncing`);
+          requestResync();
+          return null;
+        }
+        current = delta ? applyTextDelta(previous.text, delta) : previous.text + current;
+      }
+      textsRef.current[base] = { text: current, seq };
+      return current;
     };
 
-    ws.onmessage = (event) => {
-      const message: WebSocketMessage = JSON.parse(event.data);
-      console.log('WebSocket message received:', message);
-      setMessages((prev) => [...prev, message]);
+    const handleMessage = (message: WebSocketMessage) => {
+      // Handle snapshot: events were trimmed or we resynced, start over from the session state
+      if (message.type === 'snapshot') {
+        resyncing = false;
+        lastSeqRef.current = message.seq ?? lastSeqRef.current;
+        textsRef.current = { ...(message.texts || {}) };
+        const content = textsRef.current.draft?.text ?? message.draft?.content;
+        if (content !== undefined) {
+          setPartialDraft({ content, wordCount: content.split(/\s+/).length });
+        }
+        return;
+      }
+
+      // Skip events already received before a reconnect
+      if (message.type === 'broadcast' && message.seq !== undefined) {
+        if (message.seq <= lastSeqRef.current) return;
+        lastSeqRef.current = message.seq;
+      }
 
       // Handle broadcast messages (unwrap the data)
       let actualMessage = message;
@@ -33,6 +101,35 @@ export function useWebSocket(sessionId: string | null) {
         actualMessage = { ...message.data, type: message.data.type || message.type };
       }
 
+      // Handle agent_prompt: rebuild prompts sent as a delta against the agent's previous one
+      if (actualMessage.type === 'agent_prompt' && actualMessage.agent) {
+        const prompt = updateText(
+          `prompt:${actualMessage.agent}`,
+          message.seq ?? 0,
+          actualMessage.prompt,
+          actualMessage.prompt_delta,
+          actualMessage.base_seq
+        );
+        actualMessage = { ...actualMessage, prompt: prompt ?? undefined };
+      }
+
+      // Handle partial_draft: append-only deltas while streaming, line deltas for revisions
+      if (actualMessage.type === 'partial_draft') {
+        const content = updateText(
+          'draft',
+          message.seq ?? 0,
+          actualMessage.partial_content,
+          actualMessage.partial_content_delta,
+          actualMessage.base_seq
+        );
+        if (content !== null) {
+          setPartialDraft({ content, wordCount: actualMessage.word_count || 0 });
+        }
+      }
+
+      console.log('WebSocket message received:', actualMessage);
+      setMessages((prev) => [...prev, message.type === 'broadcast' ? { ...message, data: actualMessage } : message]);
+
       // Handle agent_update: Basic status update
       if (actualMessage.type === 'agent_update' && actualMessage.agent) {
         setAgentUpdates((prev) => [
@@ -83,14 +180,6 @@ export function useWebSocket(sessionId: string | null) {
         });
       }
 
-      // Handle partial_draft: Real-time draft content
-      if (actualMessage.type === 'partial_draft') {
-        setPartialDraft({
-          content: actualMessage.partial_content || '',
-          wordCount: actualMessage.word_count || 0,
-        });
-      }
-
       // Handle validation_issue: Individual issue found
       if (actualMessage.type === 'validation_issue') {
         console.log('Validation issue found:', actualMessage.issue);
@@ -102,25 +191,52 @@ export function useWebSocket(sessionId: string | null) {
         setProgress(actualMessage.progress_percent);
       }
 
-      // Handle final message - but DON'T close the connection yet
+      // Handle final message: the server closes the connection, don't reconnect
       if (actualMessage.type === 'final') {
         console.log('Story generation completed:', actualMessage);
-        // Connection will be closed by the server
+        finished = true;
       }
     };
 
-    ws.onerror = (error) => {
-      console.error('WebSocket error:', error);
+    const connect = () => {
+      // Resume after the last event received (replayed by the server)
+      const ws = new WebSocket(`${WS_URL}/ws/${sessionId}?last_seq=${lastSeqRef.current}`);
+      wsRef.current = ws;
+
+      ws.onopen = () => {
+        resyncing = false;
+        setIsConnected(true);
+        reconnectDelay = RECONNECT_MIN_DELAY_MS;
+        console.log('WebSocket connected');
+      };
+
+      ws.onmessage = (event) => {
+        handleMessage(JSON.parse(event.data));
+      };
+
+      ws.onerror = (error) => {
+        console.error('WebSocket error:', error);
+      };
+
+      ws.onclose = () => {
+        setIsConnected(false);
+        console.log('WebSocket disconnected');
+
+        if (!finished && wsRef.current === ws) {
+          reconnectTimer = setTimeout(connect, reconnectDelay);
+          reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_MAX_DELAY_MS);
+        }
+      };
     };
 
-    ws.onclose = () => {
-      setIsConnected(false);
-      console.log('WebSocket disconnected');
-    };
+    connect();
 
     return () => {
       // Only close if the component is unmounting
-      if (ws.readyState === WebSocket.OPEN || ws.readyState === WebSocket.CONNECTING) {
+      const ws = wsRef.current;
+      wsRef.current = null;
+      if (reconnectTimer) clearTimeout(reconnectTimer);
+      if (ws && (ws.readyState === WebSocket.OPEN || ws.readyState === WebSocket.CONNECTING)) {
         ws.close();
       }
     };
@@ -31,6 +31,7 @@ export interface StoryRequest {
   genre: Genre;
   target_audience: TargetAudience;
   word_count_target?: number;
+  max_cost_usd?: number;
 }
 
 export interface ValidationIssue {
@@ -40,6 +41,7 @@ export interface ValidationIssue {
   description: string;
   evidence?: string;
   suggestion: string;
+  paragraphs?: string[];
 }
 
 export interface ValidationReport {
@@ -54,6 +56,7 @@ export interface ValidationReport {
     low: number;
   };
   unresolved_threads?: string[];
+  revalidated_paragraphs?: string[];
 }
 
 export interface CritiqueScores {
@@ -101,12 +104,22 @@ export interface Session {
   drafts: Draft[];
   final_draft: string | null;
   approved: boolean;
+  stop_reason?: string;
+  best_version?: number;
   error?: string;
   metadata?: Record<string, any>;
+  usage?: SessionUsage;
 }
 
+// Line delta: lines [start, end) of the previous text are replaced by `lines`
+export type TextDelta = [number, number, string[]][];
+
 export interface WebSocketMessage {
-  type: "connection" | "update" | "agent_update" | "progress" | "validation" | "broadcast" | "final" | "error" | "agent_response" | "partial_draft" | "validation_issue" | "agent_prompt";
+  type: "connection" | "update" | "agent_update" | "progress" | "validation" | "broadcast" | "final" | "error" | "agent_response" | "partial_draft" | "validation_issue" | "agent_prompt" | "agent_usage" | "snapshot";
+  // Protocol v2: events carry a per-session sequence number
+  v?: number;
+  seq?: number;
+  protocol?: number;
   status?: string;
   session_id?: string;
   message?: string;
@@ -124,9 +137,39 @@ export interface WebSocketMessage {
   prompt?: string;
   response?: string;
   partial_content?: string;
+  partial_content_delta?: TextDelta;
+  prompt_delta?: TextDelta;
+  // Seq of the text a delta or append applies to
+  base_seq?: number;
+  draft?: Draft | null;
+  // Snapshot: texts later deltas apply to ("draft", "prompt:<agent>")
+  texts?: Record<string, { text: string; seq: number }>;
+  append?: boolean;
   word_count?: number;
   issue?: ValidationIssue;
   reasoning?: string;
+  usage?: TokenUsage;
+  model?: string;
+  cost_usd?: number;
+  session_cost_usd?: number;
+}
+
+export interface TokenUsage {
+  input_tokens: number;
+  output_tokens: number;
+  cache_creation_input_tokens?: number;
+  cache_read_input_tokens?: number;
+}
+
+export interface UsageTotals extends TokenUsage {
+  calls: number;
+  cost_usd: number;
+}
+
+export interface SessionUsage {
+  total: UsageTotals;
+  agents: Record<string, UsageTotals>;
+  budget_usd: number;
 }
 
 export interface AgentUpdate {